@@ -0,0 +1,233 @@
+# benchmarks/bench_api.py
+"""
+Suite de benchmarks de la API: siembra un dataset sintético, recorre cada
+endpoint con un cliente ASGI en proceso (engine de Docker falso) y mide
+throughput y latencias p50/p95/p99.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_api.py --projects 50 --services 10 --containers 3
+    python benchmarks/bench_api.py --out benchmarks/results/main.json
+    python benchmarks/bench_api.py --baseline benchmarks/results/main.json --max-regression 0.25
+
+Con ``--baseline`` sale con código 1 si el p95 de algún escenario empeora más
+que ``--max-regression`` (fracción) respecto al archivo de referencia.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+# el entorno se fija antes de importar la app (settings se leen al importar)
+_TMP = tempfile.mkdtemp(prefix="kontrolker-bench-")
+os.environ.setdefault("DB_URL", f"sqlite:///{_TMP}/bench.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("EVENTS_DOCKER_WATCH", "false")
+os.environ.setdefault("ADMISSION_QUEUE_MAX", "100000")
+
+# (método, url, body) para la iteración i
+RequestFactory = Callable[[int], Tuple[str, str, Optional[dict]]]
+
+
+def seed(n_projects: int, n_services: int, n_containers: int) -> Dict[str, List[int]]:
+    """Inserta el dataset con INSERTs masivos; devuelve los ids creados."""
+    from sqlalchemy import insert, select
+
+    from app.db.session import SessionLocal
+    from app.models import Container, Project, ResourceLabel, Service
+
+    now = datetime.utcnow()
+    envs = ["prod", "staging", "dev"]
+    with SessionLocal() as db:
+        db.execute(insert(Project), [
+            {"name": f"bench-{p}", "description": "bench", "labels": {"env": envs[p % 3], "team": f"t{p % 7}"},
+             "created_at": now, "updated_at": now}
+            for p in range(n_projects)
+        ])
+        project_ids = list(db.scalars(select(Project.id).order_by(Project.id)))
+        db.execute(insert(ResourceLabel), [
+            {"kind": "project", "resource_id": pid, "key": k, "value": v}
+            for i, pid in enumerate(project_ids)
+            for k, v in (("env", envs[i % 3]), ("team", f"t{i % 7}"))
+        ])
+        db.execute(insert(Service), [
+            {"project_id": pid, "name": f"svc-{s}", "image": "nginx:latest",
+             "ports": [], "env": {"MODE": "bench"}, "resources": {"cpu": 0.5, "memory_mb": 256},
+             "labels": {"tier": "web"}, "created_at": now, "updated_at": now}
+            for pid in project_ids for s in range(n_services)
+        ])
+        services = list(db.execute(select(Service.id, Service.project_id).order_by(Service.id)))
+        if n_containers:
+            db.execute(insert(Container), [
+                {"docker_id": f"seed{sid:08d}{c:04d}", "name": f"seed-{sid}-{c}", "image": "nginx:latest",
+                 "project_id": pid, "service_id": sid, "status": "running", "labels": {"tier": "web"},
+                 "created_at": now, "updated_at": now}
+                for sid, pid in services for c in range(n_containers)
+            ])
+        container_ids = list(db.scalars(select(Container.id).order_by(Container.id)))
+        db.commit()
+    return {
+        "projects": project_ids,
+        "services": [sid for sid, _ in services],
+        "containers": container_ids,
+    }
+
+
+def scenarios(ids: Dict[str, List[int]]) -> Dict[str, RequestFactory]:
+    p, s, c = ids["projects"], ids["services"], ids["containers"]
+    pid = p[len(p) // 2]
+    api = "/api/v1"
+    return {
+        "projects.list": lambda i: ("GET", f"{api}/projects", None),
+        "projects.list_selector": lambda i: ("GET", f"{api}/projects?selector=env=prod,team=t3", None),
+        "projects.get": lambda i: ("GET", f"{api}/projects/{p[i % len(p)]}", None),
+        "projects.topology": lambda i: ("GET", f"{api}/projects/{pid}/topology", None),
+        "services.list_project": lambda i: ("GET", f"{api}/services?project_id={p[i % len(p)]}", None),
+        "services.get": lambda i: ("GET", f"{api}/services/{s[i % len(s)]}", None),
+        "services.create": lambda i: ("POST", f"{api}/services", {
+            "project_id": pid, "name": f"new-{i}", "image": "redis:7", "env": {"A": "1"},
+        }),
+        "services.update": lambda i: ("PATCH", f"{api}/services/{s[i % len(s)]}", {"env": {"I": str(i)}}),
+        "containers.list_service": lambda i: ("GET", f"{api}/containers?service_id={s[i % len(s)]}", None),
+        "containers.get": lambda i: ("GET", f"{api}/containers/{c[i % len(c)]}", None),
+        "containers.create": lambda i: ("POST", f"{api}/containers", {"service_id": s[i % len(s)]}),
+        "containers.restart": lambda i: ("POST", f"{api}/containers/{c[i % len(c)]}/restart", None),
+        "events.list": lambda i: ("GET", f"{api}/events?project_id={pid}&limit=100", None),
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_scenario(client, factory: RequestFactory, requests: int, warmup: int) -> dict:
+    for i in range(warmup):
+        method, url, body = factory(10_000_000 + i)
+        client.request(method, url, json=body)
+
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(requests):
+        method, url, body = factory(i)
+        t0 = time.perf_counter()
+        resp = client.request(method, url, json=body)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if resp.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def compare(results: dict, baseline_path: Path, max_regression: float) -> List[str]:
+    baseline = json.loads(baseline_path.read_text())["results"]
+    failures = []
+    for name, current in results.items():
+        ref = baseline.get(name)
+        if not ref or not ref.get("p95_ms"):
+            continue
+        change = (current["p95_ms"] - ref["p95_ms"]) / ref["p95_ms"]
+        marker = "REGRESSION" if change > max_regression else ""
+        print(f"  {name:<28} p95 {ref['p95_ms']:8.2f} -> {current['p95_ms']:8.2f} ms ({change:+.0%}) {marker}")
+        if marker:
+            failures.append(name)
+    return failures
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--services", type=int, default=10, help="services por project")
+    parser.add_argument("--containers", type=int, default=3, help="contenedores por service")
+    parser.add_argument("--requests", type=int, default=200, help="requests medidos por escenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="correr solo estos escenarios")
+    parser.add_argument("--engine-latency-ms", type=float, default=0.0, help="latencia simulada de Docker")
+    parser.add_argument("--out", type=Path, default=None, help="archivo JSON de resultados")
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    import fake_engine
+    fake_engine.install(latency_sec=args.engine_latency_ms / 1000)
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    results: Dict[str, dict] = {}
+    with TestClient(app) as client:
+        ids = seed(args.projects, args.services, args.containers)
+        for name, factory in scenarios(ids).items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = r = run_scenario(client, factory, args.requests, args.warmup)
+            print(
+                f"{name:<28} {r['rps']:9.1f} req/s  p50 {r['p50_ms']:7.2f}  "
+                f"p95 {r['p95_ms']:7.2f}  p99 {r['p99_ms']:7.2f} ms  errors {r['errors']}"
+            )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": {
+                "projects": args.projects,
+                "services_per_project": args.services,
+                "containers_per_service": args.containers,
+            },
+            "requests": args.requests,
+            "engine_latency_ms": args.engine_latency_ms,
+        },
+        "results": results,
+    }
+    out = args.out or ROOT / "benchmarks" / "results" / f"api-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"results -> {out}")
+
+    if args.baseline:
+        print(f"comparando contra {args.baseline}")
+        failures = compare(results, args.baseline, args.max_regression)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
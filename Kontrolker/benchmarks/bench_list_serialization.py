@@ -0,0 +1,108 @@
+# benchmarks/bench_list_serialization.py
+"""
+Compara la serialización de listados: ruta Pydantic (response_model) vs ruta orjson.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_list_serialization.py --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.core.serialization import _ndjson_chunks, fetch_rows  # noqa: E402
+from app.models import Base, Container, Project  # noqa: E402
+from app.schemas import ContainerRead  # noqa: E402
+
+
+def seed(db, rows: int) -> None:
+    now = datetime.utcnow()
+    db.add(Project(name="bench", labels={}, created_at=now, updated_at=now))
+    db.flush()
+    db.bulk_insert_mappings(
+        Container,
+        [
+            {
+                "docker_id": f"{i:064x}",
+                "name": f"bench-{i}",
+                "image": "nginx:latest",
+                "project_id": 1,
+                "status": "running" if i % 3 else "exited",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(rows)
+        ],
+    )
+    db.commit()
+
+
+def pydantic_path(db) -> bytes:
+    # equivalente a lo que hace FastAPI con response_model=List[ContainerRead]
+    adapter = TypeAdapter(List[ContainerRead])
+    rows = db.query(Container).filter(Container.deleted_at.is_(None)).all()
+    value = adapter.validate_python(rows, from_attributes=True)
+    return json.dumps(adapter.dump_python(value, mode="json")).encode()
+
+
+def orjson_path(db) -> bytes:
+    import orjson
+
+    q = db.query(Container).filter(Container.deleted_at.is_(None))
+    return orjson.dumps(fetch_rows(q, Container, ContainerRead))
+
+
+def ndjson_path(db) -> bytes:
+    q = db.query(Container).filter(Container.deleted_at.is_(None))
+    return b"".join(_ndjson_chunks(fetch_rows(q, Container, ContainerRead)))
+
+
+def run(fn, Session, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        with Session() as db:
+            started = time.perf_counter()
+            fn(db)
+            best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        seed(db, args.rows)
+
+    baseline = None
+    for label, fn in [("pydantic", pydantic_path), ("orjson", orjson_path), ("ndjson", ndjson_path)]:
+        secs = run(fn, Session, args.repeat)
+        baseline = baseline or secs
+        print(
+            f"{label:<9} {secs * 1000:8.1f} ms  {args.rows / secs:10.0f} rows/s  "
+            f"x{baseline / secs:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_startup.py
+"""
+Mide el arranque en frío de un worker: importar ``app.main`` y correr el lifespan
+(init de esquema + tareas de fondo) en un proceso nuevo cada vez.
+
+Uso (desde la raíz del proyecto):
+
+    python benchmarks/bench_startup.py --runs 5 --target-ms 1500
+
+Sale con código 1 si la mediana supera el objetivo.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import app.main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app):
+    t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "lifespan_ms": (t2 - t1) * 1000}))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        "DB_URL": f"sqlite:///{tmp}/bench.db",
+        "LOG_LEVEL": "WARNING",
+    }
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, str(SRC)],
+            env=env, cwd=tmp, check=True, capture_output=True, text=True,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    imports = statistics.median(s["import_ms"] for s in samples)
+    lifespan = statistics.median(s["lifespan_ms"] for s in samples)
+    total = imports + lifespan
+    print(f"import   p50 {imports:8.1f} ms")
+    print(f"lifespan p50 {lifespan:8.1f} ms")
+    print(f"total    p50 {total:8.1f} ms  (objetivo {args.target_ms:.0f} ms)")
+    sys.exit(0 if total <= args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
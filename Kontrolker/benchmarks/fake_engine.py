@@ -0,0 +1,56 @@
+# benchmarks/fake_engine.py
+"""
+Engine de Docker falso para benchmarks: mismas firmas que ``app.engines.docker``
+pero sin daemon, así se mide solo la API y la DB.
+"""
+import itertools
+import threading
+import time
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+
+# latencia simulada del daemon (segundos); 0 = medir solo overhead propio
+LATENCY_SEC = 0.0
+
+
+def _next_id() -> int:
+    with _lock:
+        return next(_ids)
+
+
+def install(latency_sec: float = 0.0) -> None:
+    global LATENCY_SEC
+    LATENCY_SEC = latency_sec
+    from app.engines import docker as dk
+
+    def create_from_spec(spec):
+        time.sleep(LATENCY_SEC)
+        n = _next_id()
+        return dk.CreateResult(
+            docker_id=f"{n:064x}",
+            name=spec.name or f"bench-{n}",
+            status="running",
+            cli_hint=spec.cli_hint,
+        )
+
+    def create_and_start(**kwargs):
+        return create_from_spec(dk.compile_spec(**kwargs))
+
+    def noop(container_id, *args, **kwargs):
+        time.sleep(LATENCY_SEC)
+
+    dk.create_and_start = create_and_start
+    dk.create_from_spec = create_from_spec
+    dk.start = noop
+    dk.stop = noop
+    dk.restart = noop
+    dk.remove = noop
+    dk.ping = lambda timeout: None
+    dk.ensure_image = lambda image: None
+    dk.logs = lambda container_id, since=None: b""
+    dk.stats = lambda container_id: {"cpu_stats": {}, "memory_stats": {}}
+    dk.list_containers = lambda *, all_=False, filters=None: [
+        {"Id": cid, "State": "running", "Status": "Up"} for cid in (filters or {}).get("id", [])
+    ]
+    dk.inspect = lambda container_id: {"Id": container_id, "State": {"Status": "running"}}
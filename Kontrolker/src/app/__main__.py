@@ -0,0 +1,40 @@
+# src/app/__main__.py
+"""
+Entry point para producción con varios workers::
+
+    python -m app --workers 4
+
+El esquema se crea una vez en este proceso, antes de lanzar los workers, y se
+les avisa por variable de entorno para que no repitan ``create_all``.
+"""
+import argparse
+import os
+
+import uvicorn
+
+from app.core.config import settings
+from app.db.init import SCHEMA_READY_ENV, init_db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app", description="Kontrolker API")
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS)
+    args = parser.parse_args()
+
+    if settings.DB_INIT_ON_STARTUP:
+        init_db()
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_config=None,  # los workers usan setup_logging (JSON + cola)
+    )
+
+
+if __name__ == "__main__":
+    main()
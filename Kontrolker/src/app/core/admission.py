@@ -0,0 +1,238 @@
+# src/app/core/admission.py
+"""
+Admission control para operaciones pesadas contra dockerd.
+
+Cada tipo de operación (pull, create, stop...) y cada project tienen un límite
+de concurrencia con una cola de espera acotada:
+
+- hay cupo: pasa de inmediato;
+- no hay cupo y la cola tiene lugar: espera hasta ``ADMISSION_WAIT_TIMEOUT_SEC``
+  (si se vence, 503);
+- la cola está llena: 429 al instante.
+
+Quien espera ocupa un hilo del threadpool de AnyIO (40 por defecto) que
+comparten todos los endpoints sync. Por eso, además de la cola de cada
+limitador, hay un tope global de esperas (``ADMISSION_WAITERS_MAX``). Al
+arrancar se recorta a la mitad del threadpool: las lecturas nunca se quedan
+sin hilos por creates y starts encolados. Pasado el tope, 429 al instante.
+
+Los limitadores por project se crean al primer uso y se descartan cuando
+ningún request los tiene ni los espera, así no crecen con cada project que
+alguna vez hizo una operación.
+
+Ambos rechazos llevan ``Retry-After`` estimado con el tiempo medio que se
+ocupa un cupo, así una ráfaga no empuja al daemon a timeouts para todos.
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, Optional
+
+from app.core.config import settings
+
+log = logging.getLogger("core.admission")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, limiter: str, reason: str, retry_after: int):
+        self.status_code = status_code
+        self.limiter = limiter
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{limiter}: {reason}")
+
+
+class WaiterBudget:
+    """Hilos que pueden quedar bloqueados esperando cupo, sumando todos los limitadores."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.waiting = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self.waiting >= self.limit:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            return True
+
+    def exit(self) -> None:
+        with self._lock:
+            self.waiting -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"limit": self.limit, "waiting": self.waiting, "rejected": self.rejected}
+
+
+class Limiter:
+    def __init__(self, name: str, limit: int, queue_max: int, budget: WaiterBudget):
+        self.name = name
+        self.limit = limit
+        self.queue_max = queue_max
+        self.budget = budget
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        # métricas
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.hold_ms_total = 0.0
+        self.released = 0
+
+    def _retry_after(self) -> int:
+        avg_hold = (self.hold_ms_total / self.released / 1000) if self.released else 1.0
+        return max(1, math.ceil(avg_hold * (self.waiting + 1) / self.limit))
+
+    def acquire(self, timeout: float) -> float:
+        """Ocupa un cupo; devuelve cuánto esperó (s) o lanza AdmissionRejected."""
+        with self._cond:
+            if self.active < self.limit and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return 0.0
+            if self.waiting >= self.queue_max:
+                self.rejected += 1
+                raise AdmissionRejected(429, self.name, "queue full", self._retry_after())
+            if not self.budget.enter():
+                self.rejected += 1
+                raise AdmissionRejected(429, self.name, "too many waiting requests", self._retry_after())
+
+            started = time.perf_counter()
+            deadline = time.monotonic() + timeout
+            self.waiting += 1
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self.active < self.limit:
+                            break
+                        self.timed_out += 1
+                        raise AdmissionRejected(503, self.name, "wait timeout", self._retry_after())
+            finally:
+                self.waiting -= 1
+                self.budget.exit()
+            waited = time.perf_counter() - started
+            self.active += 1
+            self.admitted += 1
+            self.wait_ms_total += waited * 1000
+            self.wait_ms_max = max(self.wait_ms_max, waited * 1000)
+            return waited
+
+    def release(self, held_sec: float) -> None:
+        with self._cond:
+            self.active -= 1
+            self.released += 1
+            self.hold_ms_total += held_sec * 1000
+            self._cond.notify()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "queue_max": self.queue_max,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_ms_avg": round(self.wait_ms_total / self.admitted, 2) if self.admitted else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 2),
+                "hold_ms_avg": round(self.hold_ms_total / self.released, 2) if self.released else 0.0,
+            }
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        project_limit: int,
+        queue_max: int,
+        timeout_sec: float,
+        waiters_max: int,
+    ):
+        self.queue_max = queue_max
+        self.timeout_sec = timeout_sec
+        self.project_limit = project_limit
+        self.waiters = WaiterBudget(waiters_max)
+        self._ops = {op: Limiter(op, n, queue_max, self.waiters) for op, n in limits.items() if n > 0}
+        self._projects: Dict[int, Limiter] = {}
+        self._users: Dict[int, int] = {}   # requests que tienen o esperan el limitador del project
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _project(self, project_id: int) -> Iterator[Limiter]:
+        """Limitador del project mientras se usa; el último en soltarlo lo descarta."""
+        with self._lock:
+            limiter = self._projects.get(project_id)
+            if limiter is None:
+                limiter = self._projects[project_id] = Limiter(
+                    f"project:{project_id}", self.project_limit, self.queue_max, self.waiters,
+                )
+            self._users[project_id] = self._users.get(project_id, 0) + 1
+        try:
+            yield limiter
+        finally:
+            with self._lock:
+                self._users[project_id] -= 1
+                if not self._users[project_id]:
+                    del self._users[project_id]
+                    del self._projects[project_id]
+
+    def fit_threadpool(self, threads: int) -> None:
+        """Recorta el tope de esperas a la mitad del threadpool que atiende los endpoints sync."""
+        cap = max(1, threads // 2)
+        if self.waiters.limit > cap:
+            log.warning(
+                "ADMISSION_WAITERS_MAX=%s capped to %s (threadpool has %s threads)",
+                self.waiters.limit, cap, threads,
+            )
+            self.waiters.limit = cap
+
+    @contextmanager
+    def acquire(self, op: str, project_id: Optional[int] = None) -> Iterator[None]:
+        """
+        Cupo para ``op`` (y para ``project_id`` si aplica). Operaciones sin
+        límite configurado pasan directo.
+        """
+        with ExitStack() as stack:
+            limiters = []
+            if project_id is not None and self.project_limit > 0:
+                limiters.append(stack.enter_context(self._project(project_id)))
+            if op in self._ops:
+                limiters.append(self._ops[op])
+            for limiter in limiters:
+                limiter.acquire(self.timeout_sec)
+                started = time.perf_counter()
+                stack.callback(lambda lim=limiter, t0=started: lim.release(time.perf_counter() - t0))
+            yield
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            projects = {
+                str(pid): lim.snapshot()
+                for pid, lim in self._projects.items()
+                if lim.active or lim.waiting
+            }
+        return {
+            "waiters": self.waiters.snapshot(),
+            "operations": {op: lim.snapshot() for op, lim in self._ops.items()},
+            "projects": projects,
+        }
+
+
+admission = AdmissionController(
+    limits=settings.ADMISSION_LIMITS,
+    project_limit=settings.ADMISSION_PROJECT_LIMIT,
+    queue_max=settings.ADMISSION_QUEUE_MAX,
+    timeout_sec=settings.ADMISSION_WAIT_TIMEOUT_SEC,
+    waiters_max=settings.ADMISSION_WAITERS_MAX,
+)
@@ -1,18 +1,118 @@
 # src/app/core/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, AnyUrl
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     # ---- Configuración de tu app (tipado + defaults) ----
     ENV: str = Field(default="dev")
     DB_URL: str = Field(default="sqlite:///./kontrolker.db")
+    API_HOST: str = Field(default="127.0.0.1")
     API_PORT: int = Field(default=8000)
+    WORKERS: int = Field(default=1)
     DEBUG: bool = Field(default=True)
+    LOG_LEVEL: str = Field(default="INFO")
+    LOG_JSON: bool = Field(default=True)   # False = formato texto para desarrollo
 
     # (Ejemplo de campo opcional)
     DOCKER_HOST: Optional[str] = None
 
+    # ---- Administración ----
+    ADMIN_TOKEN: Optional[str] = None    # sin token, los endpoints /admin quedan deshabilitados
+
+    # ---- Profiling por request (opt-in) ----
+    PROFILE_SAMPLE_RATE: float = Field(default=0.0)   # fracción de requests perfilados al azar
+    PROFILE_INTERVAL_MS: float = Field(default=5.0)   # periodo de muestreo de stacks
+    PROFILE_KEEP: int = Field(default=50)             # perfiles guardados en memoria
+
+    # ---- Varias réplicas (leases en la DB) ----
+    REPLICA_ID: Optional[str] = None                 # por defecto hostname:pid:aleatorio
+    LEASE_TTL_SEC: float = Field(default=15)         # sin renovar en este tiempo, otra réplica toma el lease
+    LEASE_RENEW_SEC: float = Field(default=5)        # latido y renovación
+
+    # ---- Arranque ----
+    DB_INIT_ON_STARTUP: bool = Field(default=True)   # False si se corre `python -m app.db.init` aparte
+    DB_INIT_LOCK: Optional[str] = None               # por defecto, en el directorio temporal
+
+    # ---- Health checks (prober en segundo plano) ----
+    HEALTH_INTERVAL_SEC: float = Field(default=5.0)
+    HEALTH_DOCKER_TIMEOUT_SEC: float = Field(default=3.0)
+    HEALTH_DOCKER_SLOW_MS: float = Field(default=500.0)   # más lento = degraded
+    HEALTH_STALE_AFTER_SEC: float = Field(default=30.0)   # cache más vieja = no ready
+
+    # ---- Admission control (llamadas pesadas a Docker) ----
+    # concurrencia máxima por tipo de operación; JSON en el .env, p.ej. {"pull": 2, "create": 4}
+    ADMISSION_LIMITS: Dict[str, int] = Field(
+        default_factory=lambda: {"pull": 2, "create": 4, "start": 8, "stop": 8, "remove": 8}
+    )
+    ADMISSION_PROJECT_LIMIT: int = Field(default=4)      # operaciones simultáneas por project (0 = sin límite)
+    ADMISSION_QUEUE_MAX: int = Field(default=32)         # en espera por limitador; más = 429
+    ADMISSION_WAIT_TIMEOUT_SEC: float = Field(default=10.0)  # espera máxima; más = 503
+    ADMISSION_WAITERS_MAX: int = Field(default=16)       # en espera entre todos los limitadores; más = 429
+
+    # ---- Historial de eventos de contenedores ----
+    EVENTS_BATCH_SIZE: int = Field(default=200)          # filas por commit
+    EVENTS_FLUSH_INTERVAL_SEC: float = Field(default=1.0)
+    EVENTS_QUEUE_MAX: int = Field(default=10_000)        # si se llena, se descartan
+    EVENTS_RETENTION_DAYS: int = Field(default=30)
+    EVENTS_RETENTION_INTERVAL_SEC: float = Field(default=3600)
+    EVENTS_DOCKER_WATCH: bool = Field(default=False)     # escuchar `docker events`
+    EVENTS_DEDUPE_WINDOW_SEC: float = Field(default=5.0)  # eco de Docker de una acción de la API; 0 = guardar ambos
+
+    # ---- Resiliencia frente a dockerd ----
+    DOCKER_RETRY_ATTEMPTS: int = Field(default=3)        # intentos totales en errores transitorios
+    DOCKER_RETRY_BASE_MS: float = Field(default=200)     # backoff exponencial con full jitter
+    DOCKER_RETRY_MAX_MS: float = Field(default=5000)
+    DOCKER_RETRY_DEADLINE_SEC: float = Field(default=30) # tope total de tiempo esperando entre intentos
+    BREAKER_FAILURE_THRESHOLD: int = Field(default=5)    # fallas seguidas para abrir el circuito
+    BREAKER_RESET_SEC: float = Field(default=30)         # tiempo abierto antes de la llamada de prueba
+
+    # ---- Puertos del host ----
+    PORTS_AUTO_RANGE_START: int = Field(default=20000)   # rango para host port 0 (auto)
+    PORTS_AUTO_RANGE_END: int = Field(default=29999)
+
+    # ---- Specs compiladas de services ----
+    SPEC_CACHE_SIZE: int = Field(default=1024)   # revisiones de Service en el LRU; 0 = sin cache
+
+    # ---- Rolling updates ----
+    ROLLOUT_POLL_INTERVAL_SEC: float = Field(default=0.5)   # cada cuánto se mira si un lote quedó listo
+    ROLLOUT_HISTORY: int = Field(default=100)               # rollouts terminados que se pueden consultar
+
+    # ---- Apply declarativo ----
+    APPLY_MAX_PARALLEL: int = Field(default=8)   # services en paralelo dentro de una ola
+
+    # ---- Garbage collection ----
+    GC_INTERVAL_SEC: float = Field(default=900)
+    GC_EXITED_TTL_HOURS: float = Field(default=24)     # contenedores detenidos más viejos se borran; 0 = nunca
+    GC_PURGE_AFTER_DAYS: float = Field(default=7)      # filas soft-deleted más viejas se borran de verdad
+    GC_BATCH_SIZE: int = Field(default=500)            # filas/contenedores por lote
+    GC_IMAGES: bool = Field(default=True)              # borrar imágenes que ya no usa ningún service
+    GC_ARCHIVE_DIR: Optional[str] = None               # si se define, las filas purgadas se guardan en JSONL
+
+    # ---- Logs de contenedores (opt-in) ----
+    LOGS_ENABLED: bool = Field(default=False)
+    LOGS_DIR: str = Field(default="./logs")                    # compartido si hay varias réplicas
+    LOGS_SYNC_INTERVAL_SEC: float = Field(default=10)
+    LOGS_COLLECT_WORKERS: int = Field(default=8)               # contenedores leídos en paralelo
+    LOGS_BLOCK_BYTES: int = Field(default=64 * 1024)           # bloque comprimido (granularidad del índice)
+    LOGS_SEGMENT_BYTES: int = Field(default=8 * 1024 * 1024)   # rotación de segmentos
+    LOGS_MAX_BYTES_PER_CONTAINER: int = Field(default=64 * 1024 * 1024)  # 0 = sin límite
+    LOGS_RETENTION_DAYS: float = Field(default=7)              # 0 = sin límite
+    LOGS_RETENTION_INTERVAL_SEC: float = Field(default=3600)
+
+    # ---- Historial de CPU/memoria (opt-in) ----
+    STATS_ENABLED: bool = Field(default=False)
+    STATS_INTERVAL_SEC: float = Field(default=10)      # una pasada de `docker stats` por intervalo
+    STATS_COLLECT_WORKERS: int = Field(default=16)     # contenedores consultados en paralelo
+
+    # ---- Idempotency-Key en POST de creación ----
+    IDEMPOTENCY_TTL_HOURS: float = Field(default=24)             # cuánto se guarda la respuesta de una key
+    IDEMPOTENCY_LOCK_TIMEOUT_SEC: float = Field(default=600)     # una key en curso más vieja se da por abandonada
+    IDEMPOTENCY_PURGE_INTERVAL_SEC: float = Field(default=3600)
+
+    # ---- Cuotas por project ----
+    QUOTA_REPAIR_INTERVAL_SEC: float = Field(default=600)  # recalcular contadores (drift)
+
     # ---- De dónde leer las variables (.env) ----
     model_config = SettingsConfigDict(
         env_file=".env",           # lee automáticamente tu .env en la raíz
@@ -0,0 +1,106 @@
+# src/app/core/health.py
+"""
+Health checks servidos desde cache.
+
+Un hilo prueba DB y Docker cada ``HEALTH_INTERVAL_SEC`` y guarda resultado,
+latencia y hora. ``/livez``, ``/readyz`` y ``/health`` solo leen esa cache, así
+que un balanceador que pregunta muy seguido no genera carga en la DB ni en dockerd.
+"""
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.engines import docker as dk
+
+log = logging.getLogger("core.health")
+
+OK = "ok"
+DEGRADED = "degraded"
+DOWN = "down"
+
+
+@dataclass
+class ProbeResult:
+    status: str                    # ok | degraded | down
+    latency_ms: float
+    checked_at: datetime
+    error: Optional[str] = None
+
+
+def _check_db() -> None:
+    with SessionLocal() as s:
+        s.execute(text("SELECT 1"))
+
+
+def _check_docker() -> None:
+    dk.ping(timeout=settings.HEALTH_DOCKER_TIMEOUT_SEC)
+
+
+class HealthProber:
+    def __init__(self, interval_sec: float, docker_slow_ms: float, stale_after_sec: float):
+        self.docker_slow_ms = docker_slow_ms
+        self.stale_after_sec = stale_after_sec
+        self._results: Dict[str, ProbeResult] = {}
+        self._lock = threading.Lock()
+        self._task = PeriodicTask("health-prober", interval_sec, self.probe, initial_delay_sec=0)
+
+    def start(self) -> None:
+        self._task.start()
+
+    def stop(self) -> None:
+        self._task.stop()
+
+    def _run_check(self, name: str, fn: Callable[[], None], slow_ms: Optional[float]) -> ProbeResult:
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            latency = (time.perf_counter() - started) * 1000
+            log.warning("Health check %s failed: %s", name, e)
+            return ProbeResult(DOWN, round(latency, 2), datetime.utcnow(), str(e))
+        latency = (time.perf_counter() - started) * 1000
+        status = DEGRADED if slow_ms is not None and latency > slow_ms else OK
+        return ProbeResult(status, round(latency, 2), datetime.utcnow())
+
+    def probe(self) -> None:
+        results = {
+            "db": self._run_check("db", _check_db, None),
+            "docker": self._run_check("docker", _check_docker, self.docker_slow_ms),
+        }
+        with self._lock:
+            self._results = results
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: asdict(r) for name, r in self._results.items()}
+
+    def readiness(self) -> tuple[bool, str]:
+        """(ready, motivo). Degraded sigue siendo ready: lento no es caído."""
+        with self._lock:
+            results = dict(self._results)
+        if not results:
+            return False, "starting"
+        oldest = min(r.checked_at for r in results.values())
+        if (datetime.utcnow() - oldest).total_seconds() > self.stale_after_sec:
+            return False, "stale"
+        down = [name for name, r in results.items() if r.status == DOWN]
+        if down:
+            return False, f"{','.join(down)} down"
+        if any(r.status == DEGRADED for r in results.values()):
+            return True, DEGRADED
+        return True, OK
+
+
+prober = HealthProber(
+    interval_sec=settings.HEALTH_INTERVAL_SEC,
+    docker_slow_ms=settings.HEALTH_DOCKER_SLOW_MS,
+    stale_after_sec=settings.HEALTH_STALE_AFTER_SEC,
+)
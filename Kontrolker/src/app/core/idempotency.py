@@ -0,0 +1,257 @@
+# src/app/core/idempotency.py
+"""
+``Idempotency-Key`` para los POST de creación (projects, services, containers
+y sus variantes ``/bulk``).
+
+Un cliente que reintenta un POST que le dio timeout (p.ej. un contenedor cuyo
+pull tardó) manda la misma key y recibe la respuesta original, sin volver a
+ejecutar el endpoint ni tocar Docker:
+
+- la primera vez se inserta la fila de la key "en curso" (la PK hace de lock
+  entre réplicas) y al terminar se guarda status + body comprimido por
+  ``IDEMPOTENCY_TTL_HOURS``; solo se guardan respuestas 2xx, con cualquier
+  otra la key se libera y el reintento vuelve a ejecutarse;
+- misma key con otro request (método, ruta, query o body distintos) -> 422;
+- misma key mientras el original sigue corriendo -> 409 con ``Retry-After``;
+  una key en curso más vieja que ``IDEMPOTENCY_LOCK_TIMEOUT_SEC`` se da por
+  abandonada (réplica caída) y se puede volver a tomar.
+
+Middleware ASGI puro como ``RequestIDMiddleware``; los accesos a la DB van al
+threadpool para no bloquear el event loop. Las keys vencidas se borran en
+lotes con ``purger``.
+"""
+import hashlib
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.leases import manager as leases
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+log = logging.getLogger("core.idempotency")
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+_HEADER_KEY = HEADER.lower().encode("latin-1")
+_MAX_LEN = 255
+PURGE_BATCH = 1000
+
+# endpoints de creación; el resto de los POST (start, stop, apply...) ya son
+# idempotentes por naturaleza o pasan por el coordinador de operaciones
+CREATE_PATHS = frozenset(
+    f"/api/v1/{resource}{suffix}"
+    for resource in ("projects", "services", "containers")
+    for suffix in ("", "/bulk")
+)
+
+
+@dataclass
+class Stored:
+    fingerprint: str
+    status_code: Optional[int]   # None = en curso
+    content_type: Optional[str]
+    body: Optional[bytes]
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in (method.encode(), path.encode(), query, body):
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def claim(key: str, fp: str) -> Optional[Stored]:
+    """Toma ``key`` para este request (None) o devuelve lo que ya hay guardado."""
+    with SessionLocal() as db:
+        for _ in range(2):
+            now = datetime.utcnow()
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now))
+            try:
+                db.execute(insert(IdempotencyKey).values(
+                    key=key,
+                    fingerprint=fp,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SEC),
+                ))
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+            row = db.execute(
+                select(
+                    IdempotencyKey.fingerprint,
+                    IdempotencyKey.status_code,
+                    IdempotencyKey.content_type,
+                    IdempotencyKey.body,
+                ).where(IdempotencyKey.key == key)
+            ).first()
+            if row is not None:
+                fp_stored, status_code, content_type, body = row
+                return Stored(fp_stored, status_code, content_type, zlib.decompress(body) if body else None)
+            # la borró otro (vencida) entre el insert y el select: otra vuelta
+    raise RuntimeError(f"Could not claim idempotency key {key!r}")
+
+
+def complete(key: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+            .values(
+                status_code=status_code,
+                content_type=content_type,
+                body=zlib.compress(body),
+                expires_at=datetime.utcnow() + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+            )
+        )
+        db.commit()
+
+
+def release(key: str) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)))
+        db.commit()
+
+
+def purge_expired() -> int:
+    """Borra keys vencidas en lotes pequeños, cada uno en su propia transacción."""
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            keys = (
+                select(IdempotencyKey.key)
+                .where(IdempotencyKey.expires_at <= datetime.utcnow())
+                .limit(PURGE_BATCH)
+            )
+            deleted = db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(keys))).rowcount
+            leases.fence(db, "idempotency-purge")
+            db.commit()
+            total += deleted
+            if deleted < PURGE_BATCH:
+                break
+    if total:
+        log.info("Purged %s expired idempotency keys", total)
+    return total
+
+
+purger = PeriodicTask(
+    "idempotency-purge",
+    settings.IDEMPOTENCY_PURGE_INTERVAL_SEC,
+    purge_expired,
+    gate=leases.gate("idempotency-purge"),
+)
+
+
+async def _send_json(send: Send, status_code: int, detail: str, headers: List[Tuple[bytes, bytes]] = ()) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in CREATE_PATHS:
+            await self.app(scope, receive, send)
+            return
+        key = None
+        for name, value in scope["headers"]:
+            if name == _HEADER_KEY:
+                key = value.decode("latin-1").strip()
+                break
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > _MAX_LEN:
+            await _send_json(send, 400, f"{HEADER} must be 1-{_MAX_LEN} characters")
+            return
+
+        # el body se lee entero para el fingerprint y se le vuelve a entregar a la app
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # el cliente se desconectó
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fp = fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+
+        stored = await run_in_threadpool(claim, key, fp)
+        if stored is not None:
+            if stored.fingerprint != fp:
+                await _send_json(send, 422, f"{HEADER} was already used with a different request")
+            elif stored.status_code is None:
+                await _send_json(
+                    send, 409, f"A request with this {HEADER} is still in progress",
+                    [(b"retry-after", b"1")],
+                )
+            else:
+                await send({
+                    "type": "http.response.start",
+                    "status": stored.status_code,
+                    "headers": [
+                        (b"content-type", (stored.content_type or "application/json").encode("latin-1")),
+                        (b"content-length", str(len(stored.body or b"")).encode()),
+                        (REPLAYED_HEADER.lower().encode(), b"true"),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": stored.body or b""})
+            return
+
+        replayed = False
+
+        async def replay_receive() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        content_type: Optional[str] = None
+        response: List[bytes] = []
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await run_in_threadpool(release, key)
+            raise
+        if 200 <= status_code < 300:
+            await run_in_threadpool(complete, key, status_code, content_type, b"".join(response))
+        else:
+            await run_in_threadpool(release, key)
@@ -0,0 +1,285 @@
+# src/app/core/leases.py
+"""
+Elección de líder por lease en la DB (SQLite y PostgreSQL), para correr varias
+réplicas de la API sin que cada una ejecute los loops de fondo.
+
+- Cada loop singleton (``gc``, ``quota-repair``...) tiene una fila en
+  ``leases``. Tomarla o renovarla es un UPDATE condicional (``holder = yo`` o
+  ``expires_at < ahora``), atómico en ambas bases; al cambiar de dueño sube el
+  ``fencing_token``.
+- Localmente una réplica se considera líder solo hasta un margen antes de que
+  el lease venza, así deja de trabajar antes de que otra pueda tomarlo.
+- ``fence(db, name)`` comprueba en la misma transacción que el lease sigue
+  siendo nuestro con el mismo token: una réplica que quedó colgada y perdió el
+  lease no llega a commitear.
+- Todas las réplicas laten en ``replicas``; ``owns(key)`` reparte trabajo por
+  clave (p.ej. service_id) entre las vivas con rendezvous hashing.
+
+Los vencimientos usan el reloj de cada réplica: ``LEASE_TTL_SEC`` debe ser
+bastante mayor que el desfase entre hosts.
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+log = logging.getLogger("core.leases")
+
+
+class LeaseLost(Exception):
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"Lease '{name}' is not held by this replica")
+
+
+@dataclass
+class _Held:
+    token: int
+    valid_until: float  # time.monotonic()
+
+
+def _default_replica_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LeaseManager:
+    def __init__(self, replica_id: str, ttl_sec: float, renew_sec: float):
+        self.replica_id = replica_id
+        self.ttl_sec = ttl_sec
+        self.renew_sec = renew_sec
+        self._names: List[str] = []
+        self._held: Dict[str, _Held] = {}
+        self._members: List[str] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- ciclo de vida --
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def register(self, name: str) -> None:
+        """Declara un loop singleton que esta réplica quiere poder correr."""
+        with self._lock:
+            if name not in self._names:
+                self._names.append(name)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self.tick()  # que el primer loop ya sepa si es líder
+        self._thread = threading.Thread(target=self._run, name="leases", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._release_all()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.renew_sec):
+            self.tick()
+
+    # -- consultas --
+
+    def is_leader(self, name: str) -> bool:
+        """Sin el manager corriendo (scripts, una sola réplica sin lifespan) todo es local."""
+        if not self.running:
+            return True
+        with self._lock:
+            held = self._held.get(name)
+        return held is not None and held.valid_until > time.monotonic()
+
+    def gate(self, name: str) -> Callable[[], bool]:
+        self.register(name)
+        return lambda: self.is_leader(name)
+
+    def token(self, name: str) -> Optional[int]:
+        with self._lock:
+            held = self._held.get(name)
+        return held.token if held else None
+
+    def members(self) -> List[str]:
+        with self._lock:
+            return list(self._members) or [self.replica_id]
+
+    def owns(self, key) -> bool:
+        """Rendezvous hashing: cada clave tiene un dueño estable entre las réplicas vivas."""
+        members = self.members()
+        if len(members) == 1:
+            return members[0] == self.replica_id
+
+        def score(member: str) -> bytes:
+            return hashlib.blake2b(f"{member}\x00{key}".encode(), digest_size=8).digest()
+
+        return max(members, key=score) == self.replica_id
+
+    def fence(self, db: Session, name: str) -> None:
+        """
+        Comprueba, dentro de la transacción de ``db``, que el lease sigue siendo
+        nuestro con el mismo token; si no, ``LeaseLost``. Llamar antes del commit.
+        """
+        if not self.running:
+            return
+        from app.models.leases import Lease
+
+        token = self.token(name)
+        held = db.execute(
+            select(Lease.name)
+            .where(
+                Lease.name == name,
+                Lease.holder == self.replica_id,
+                Lease.fencing_token == token,
+                Lease.expires_at > datetime.utcnow(),
+            )
+            .with_for_update()
+        ).first()
+        if token is None or held is None:
+            raise LeaseLost(name)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replica_id": self.replica_id,
+                "members": list(self._members),
+                "leases": {
+                    name: {
+                        "leader": name in self._held and self._held[name].valid_until > now,
+                        "token": self._held[name].token if name in self._held else None,
+                    }
+                    for name in self._names
+                },
+            }
+
+    # -- renovación --
+
+    def tick(self) -> None:
+        from app.db.session import SessionLocal
+
+        try:
+            with SessionLocal() as db:
+                self._heartbeat(db)
+                for name in list(self._names):
+                    self._renew_or_acquire(db, name)
+        except Exception:
+            log.exception("Lease renewal failed")
+
+    def _heartbeat(self, db: Session) -> None:
+        from app.models.leases import Replica
+
+        now = datetime.utcnow()
+        updated = db.execute(
+            update(Replica).where(Replica.id == self.replica_id).values(last_seen=now)
+        ).rowcount
+        if not updated:
+            db.execute(insert(Replica).values(
+                id=self.replica_id,
+                hostname=socket.gethostname(),
+                pid=os.getpid(),
+                started_at=now,
+                last_seen=now,
+            ))
+        # las réplicas muertas hace rato se borran (cualquiera puede hacerlo)
+        db.execute(delete(Replica).where(Replica.last_seen < now - timedelta(seconds=self.ttl_sec * 10)))
+        db.commit()
+        members = sorted(db.scalars(
+            select(Replica.id).where(Replica.last_seen >= now - timedelta(seconds=self.ttl_sec))
+        ))
+        with self._lock:
+            self._members = members
+
+    def _renew_or_acquire(self, db: Session, name: str) -> None:
+        from app.models.leases import Lease
+
+        started = time.monotonic()
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.ttl_sec)
+
+        # 1) renovar si ya es nuestro y no venció
+        renewed = db.execute(
+            update(Lease)
+            .where(Lease.name == name, Lease.holder == self.replica_id, Lease.expires_at >= now)
+            .values(expires_at=expires)
+        ).rowcount
+        # 2) si no, tomarlo si venció (o si es nuestro pero venció: nuevo token igual)
+        acquired = 0
+        if not renewed:
+            acquired = db.execute(
+                update(Lease)
+                .where(Lease.name == name, Lease.expires_at < now)
+                .values(
+                    holder=self.replica_id,
+                    fencing_token=Lease.fencing_token + 1,
+                    expires_at=expires,
+                    acquired_at=now,
+                )
+            ).rowcount
+        # 3) si la fila no existe, crearla
+        if not renewed and not acquired:
+            exists = db.execute(select(Lease.name).where(Lease.name == name)).first()
+            if exists is None:
+                try:
+                    db.execute(insert(Lease).values(
+                        name=name, holder=self.replica_id, fencing_token=1,
+                        expires_at=expires, acquired_at=now,
+                    ))
+                    acquired = 1
+                except IntegrityError:  # otra réplica la creó en paralelo
+                    db.rollback()
+        db.commit()
+
+        if renewed or acquired:
+            token = db.execute(select(Lease.fencing_token).where(Lease.name == name)).scalar_one()
+            margin = max(self.renew_sec, self.ttl_sec / 3)
+            with self._lock:
+                if acquired:
+                    log.info("Acquired lease %s (token %s)", name, token)
+                self._held[name] = _Held(token=token, valid_until=started + self.ttl_sec - margin)
+        else:
+            with self._lock:
+                if self._held.pop(name, None) is not None:
+                    log.warning("Lost lease %s", name)
+
+    def _release_all(self) -> None:
+        """Al apagar: vencer nuestros leases y borrar el latido para que otra réplica siga ya."""
+        from app.db.session import SessionLocal
+        from app.models.leases import Lease, Replica
+
+        with self._lock:
+            self._held.clear()
+        try:
+            with SessionLocal() as db:
+                db.execute(
+                    update(Lease)
+                    .where(Lease.holder == self.replica_id)
+                    .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+                )
+                db.execute(delete(Replica).where(Replica.id == self.replica_id))
+                db.commit()
+        except Exception:
+            log.exception("Could not release leases")
+
+
+manager = LeaseManager(
+    settings.REPLICA_ID or _default_replica_id(),
+    settings.LEASE_TTL_SEC,
+    settings.LEASE_RENEW_SEC,
+)
@@ -1,14 +1,81 @@
 # src/app/core/logging.py
+import atexit
+import copy
 import logging
+import queue
 import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
-def setup_logging(level: int = logging.INFO) -> None:
-    fmt = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(logging.Formatter(fmt))
+import orjson
+
+from .request_id import request_id_var
+
+TEXT_FMT = "%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s"
+
+# atributos estándar de LogRecord; lo demás viene de `extra=` y va al JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id",
+    "color_message",  # uvicorn: copia del mensaje con códigos ANSI
+}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                payload[key] = value
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return orjson.dumps(payload, default=str).decode()
+
+
+class _ContextQueueHandler(QueueHandler):
+    """
+    Captura el request_id en el hilo que loguea (el contextvar no viaja al hilo
+    del listener) y deja el mensaje ya resuelto para que sea seguro encolarlo.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.request_id = request_id_var.get() or "-"
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: int = logging.INFO, json_logs: bool = True) -> None:
+    """
+    Los handlers de la app solo encolan; un QueueListener escribe a stdout en su
+    propio hilo, así un stdout lento nunca bloquea un request.
+    """
+    global _listener
     root = logging.getLogger()
     root.setLevel(level)
     # evita handlers duplicados en reload
-    if not root.handlers:
-        root.addHandler(handler)
-        
\ No newline at end of file
+    if any(isinstance(h, _ContextQueueHandler) for h in root.handlers):
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if json_logs else logging.Formatter(TEXT_FMT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root.addHandler(_ContextQueueHandler(log_queue))
@@ -0,0 +1,267 @@
+# src/app/core/profiling.py
+"""
+Profiling opt-in por request, para diagnosticar en producción sin redeploy.
+
+Se activa con ``X-Profile: 1`` + ``X-Admin-Token`` válido, o al azar con
+``PROFILE_SAMPLE_RATE``. Mientras dura el request:
+
+- un hilo muestrea los stacks cada ``PROFILE_INTERVAL_MS`` (stacks colapsados,
+  formato flamegraph ``a;b;c N``);
+- cada query SQL se registra con su duración.
+
+El perfil se guarda en memoria (últimos ``PROFILE_KEEP``) y se consulta en
+``/admin/profiles/{id}``; la respuesta trae ``X-Profile-Id`` y ``Server-Timing``.
+
+El muestreo se limita a los hilos registrados por ``ProfiledRoute`` mientras
+corre el handler (el hilo del threadpool en los sync, el del event loop en los
+async) y a stacks con código de ``app``. En handlers async pueden colarse
+muestras de otras corrutinas del mismo loop. El log de SQL sí es exacto por
+request.
+"""
+import functools
+import inspect
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.admin import ADMIN_HEADER, is_admin_token
+from app.core.config import settings
+from app.db.session import engine
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_APP_DIR = str(Path(__file__).resolve().parents[1])
+_SELF = __file__
+_MAX_SQL = 500          # queries guardadas por perfil
+_MAX_STACK_DEPTH = 64
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+@dataclass
+class RequestProfile:
+    id: str
+    method: str
+    path: str
+    started_at: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    status_code: Optional[int] = None
+    samples: Counter = field(default_factory=Counter)
+    sample_count: int = 0
+    sql: List[dict] = field(default_factory=list)
+    sql_count: int = 0
+    sql_ms: float = 0.0
+    threads: Set[int] = field(default_factory=set)   # hilos que están corriendo el handler
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "status_code": self.status_code,
+            "sql_count": self.sql_count,
+            "sql_ms": round(self.sql_ms, 2),
+            "samples": self.sample_count,
+        }
+
+    def to_dict(self, top: int = 50) -> dict:
+        return {
+            **self.summary(),
+            "interval_ms": settings.PROFILE_INTERVAL_MS,
+            "stacks": [
+                {"stack": stack, "count": n} for stack, n in self.samples.most_common(top)
+            ],
+            "sql": self.sql,
+        }
+
+
+class ProfileStore:
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._items: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._items[profile.id] = profile
+            while len(self._items) > self.keep:
+                self._items.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._items.get(profile_id)
+
+    def list(self) -> List[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._items.values()))
+
+
+store = ProfileStore(settings.PROFILE_KEEP)
+
+
+# ---------- SQL ----------
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._kk_started = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None:
+        return
+    elapsed = (time.perf_counter() - getattr(context, "_kk_started", time.perf_counter())) * 1000
+    profile.sql_count += 1
+    profile.sql_ms += elapsed
+    if len(profile.sql) < _MAX_SQL:
+        profile.sql.append({"sql": statement, "ms": round(elapsed, 3), "executemany": executemany})
+
+
+# ---------- Stacks ----------
+
+def _collapse(frame) -> Optional[str]:
+    parts: List[str] = []
+    has_app = False
+    while frame is not None and len(parts) < _MAX_STACK_DEPTH:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename == _SELF:
+            # el wrapper de _bind_thread y los hooks de SQL no aportan al stack
+            frame = frame.f_back
+            continue
+        if filename.startswith(_APP_DIR):
+            has_app = True
+            name = filename[len(_APP_DIR) + 1:]
+        else:
+            name = Path(filename).name
+        parts.append(f"{name}:{code.co_name}")
+        frame = frame.f_back
+    if not has_app:
+        return None
+    return ";".join(reversed(parts))
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: RequestProfile, interval_sec: float):
+        super().__init__(name=f"profiler-{profile.id[:8]}", daemon=True)
+        self.profile = profile
+        self.interval_sec = interval_sec
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval_sec):
+            for tid, frame in sys._current_frames().items():
+                if tid == me or tid not in self.profile.threads:
+                    continue
+                stack = _collapse(frame)
+                if stack is None:
+                    continue
+                self.profile.samples[stack] += 1
+                self.profile.sample_count += 1
+
+
+# ---------- Registro de hilos ----------
+
+def _bind_thread(endpoint):
+    """Envuelve el endpoint para que registre su hilo en el perfil en curso mientras corre."""
+    if getattr(endpoint, "_kk_bound", False):
+        return endpoint  # include_router vuelve a crear la ruta con el endpoint ya envuelto
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            tid = threading.get_ident()
+            profile.threads.add(tid)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.threads.discard(tid)
+        async_wrapper._kk_bound = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()  # el threadpool copia el contexto del request
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        tid = threading.get_ident()
+        profile.threads.add(tid)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            # el hilo vuelve al pool y puede tomar otro request
+            profile.threads.discard(tid)
+    wrapper._kk_bound = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """``route_class`` de los routers: el sampler solo mira los hilos de sus handlers."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _bind_thread(endpoint), **kwargs)
+
+
+# ---------- Middleware ----------
+
+def _should_profile(headers: Headers) -> bool:
+    if headers.get(PROFILE_HEADER) in ("1", "true") and is_admin_token(headers.get(ADMIN_HEADER)):
+        return True
+    rate = settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _should_profile(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(id=uuid.uuid4().hex, method=scope["method"], path=scope["path"])
+        sampler = _Sampler(profile, settings.PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers[PROFILE_ID_HEADER] = profile.id
+                headers.append(
+                    "Server-Timing",
+                    f'app;dur={(time.perf_counter() - started) * 1000:.1f}, '
+                    f'db;dur={profile.sql_ms:.1f};desc="{profile.sql_count} queries"',
+                )
+            await send(message)
+
+        token = _current.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            sampler.stopped.set()
+            _current.reset(token)
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            store.add(profile)
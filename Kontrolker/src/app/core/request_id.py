@@ -1,16 +1,55 @@
 # src/app/core/request_id.py
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 HEADER = "X-Request-ID"
+_HEADER_KEY = HEADER.lower().encode("latin-1")
+_MAX_LEN = 128  # ids entrantes más largos se ignoran (van a los logs)
+
+# id del request en curso; lo leen los logs sin tener que pasar el Request
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+class RequestIDMiddleware:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware): no crea una tarea extra por
+    request ni envuelve el body, así que no interfiere con StreamingResponse.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for key, value in scope["headers"]:
+            if key == _HEADER_KEY:
+                rid = value.decode("latin-1")
+                break
+        if not rid or len(rid) > _MAX_LEN:
+            rid = str(uuid.uuid4())
+
+        # mismo lugar que antes: request.state.request_id
+        scope.setdefault("state", {})["request_id"] = rid
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[HEADER] = rid
+            await send(message)
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        rid = request.headers.get(HEADER) or str(uuid.uuid4())
-        # inyecta en scope para usarlo en logs si quieres
-        request.state.request_id = rid
-        response: Response = await call_next(request)
-        response.headers[HEADER] = rid
-        return response
+        token = request_id_var.set(rid)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
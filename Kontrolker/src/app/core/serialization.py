@@ -0,0 +1,140 @@
+# src/app/core/serialization.py
+"""
+Ruta rápida de serialización para endpoints de listado.
+
+Con ``response_model=List[...]`` cada fila se hidrata como objeto ORM, se valida
+con Pydantic y se vuelve a serializar. Para filas que salen de nuestra propia DB
+eso es trabajo redundante: aquí se consultan solo las columnas que expone el
+schema de lectura y se serializan directo con orjson. El ``response_model`` se
+mantiene en los routers para la documentación OpenAPI.
+
+Con ``?fields=id,name`` (sparse fieldsets) la proyección se reduce a esos
+campos: las columnas JSON que no se piden ni se leen de la DB.
+"""
+import copy
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Query as QueryParam, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Query
+from starlette.responses import Response, StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_ROWS = 500
+
+
+Fields = Optional[Tuple[str, ...]]
+
+_IMMUTABLE = (str, bytes, int, float, bool, type(None), tuple, frozenset)
+
+
+def _fresh_default(field) -> Callable[[], Any]:
+    """Default de ``field`` construido de nuevo en cada llamada (listas, dicts...)."""
+    if field.default_factory is not None:
+        return field.default_factory
+    default = field.default
+    return lambda: copy.deepcopy(default)
+
+
+@lru_cache(maxsize=None)
+def _projection(
+    model, schema, fields: Fields = None,
+) -> Tuple[tuple, Tuple[str, ...], Dict[str, Any], Tuple[Tuple[str, Callable[[], Any]], ...]]:
+    """
+    Columnas a consultar + plantilla con el orden y defaults del schema. La
+    plantilla se comparte entre filas, así que solo lleva defaults inmutables;
+    los mutables van aparte y se construyen por fila.
+    """
+    wanted = [name for name in schema.model_fields if fields is None or name in fields]
+    table_cols = model.__table__.columns
+    columns = tuple(table_cols[name] for name in wanted if name in table_cols)
+    names = tuple(col.key for col in columns)
+    if not columns:
+        # solo campos fuera de la tabla (p.ej. ?fields=cli_hint): se consulta la PK
+        # para contar filas, pero no sale en la respuesta
+        columns = tuple(model.__table__.primary_key.columns)
+    # campos que no viven en la tabla (p.ej. cli_hint) salen con su default
+    template: Dict[str, Any] = {}
+    fresh: List[Tuple[str, Callable[[], Any]]] = []
+    for name in wanted:
+        field = schema.model_fields[name]
+        template[name] = None
+        if name in names or field.is_required():
+            continue
+        if field.default_factory is None and isinstance(field.default, _IMMUTABLE):
+            template[name] = field.default
+        else:
+            fresh.append((name, _fresh_default(field)))
+    return columns, names, template, tuple(fresh)
+
+
+def parse_fields(raw: Optional[str], schema) -> Fields:
+    """``"name,id"`` -> ``("id", "name")`` (orden del schema); 422 si alguno no existe."""
+    if not raw:
+        return None
+    wanted = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = wanted - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(schema.model_fields)}",
+        )
+    return tuple(name for name in schema.model_fields if name in wanted) or None
+
+
+def sparse_fields(schema) -> Callable[..., Fields]:
+    """Dependencia con el query param ``fields`` validado contra ``schema``."""
+    def dependency(
+        fields: Optional[str] = QueryParam(
+            default=None,
+            description=f"Campos a devolver, separados por coma: {', '.join(schema.model_fields)}",
+            examples=["id,name"],
+        ),
+    ) -> Fields:
+        return parse_fields(fields, schema)
+    return dependency
+
+
+def fetch_rows(query: Query, model, schema, fields: Fields = None) -> List[Dict[str, Any]]:
+    """Ejecuta ``query`` proyectando solo las columnas de ``schema`` y devuelve dicts."""
+    columns, names, template, fresh = _projection(model, schema, fields)
+    out: List[Dict[str, Any]] = []
+    for row in query.with_entities(*columns).all():
+        item = template.copy()
+        item.update(zip(names, row))
+        for name, make in fresh:
+            item[name] = make()
+        out.append(item)
+    return out
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_chunks(items: List[Dict[str, Any]]) -> Iterator[bytes]:
+    for start in range(0, len(items), NDJSON_CHUNK_ROWS):
+        chunk = items[start:start + NDJSON_CHUNK_ROWS]
+        yield b"\n".join(orjson.dumps(item) for item in chunk) + b"\n"
+
+
+def item_response(query: Query, model, schema, fields: Fields) -> Optional[Response]:
+    """Un solo registro proyectado a ``fields``; None si ``query`` no devuelve filas."""
+    items = fetch_rows(query.limit(1), model, schema, fields)
+    return ORJSONResponse(content=items[0]) if items else None
+
+
+def list_response(request: Request, query: Query, model, schema, fields: Fields = None) -> Response:
+    """
+    Respuesta de listado sin validación Pydantic por fila.
+
+    Por defecto devuelve un array JSON; con ``Accept: application/x-ndjson``
+    responde en streaming, un objeto por línea. Las filas se leen completas antes
+    de responder porque la sesión de DB se cierra al terminar el endpoint.
+    """
+    items = fetch_rows(query, model, schema, fields)
+    if wants_ndjson(request):
+        return StreamingResponse(_ndjson_chunks(items), media_type=NDJSON_MEDIA_TYPE)
+    return ORJSONResponse(content=items)
@@ -0,0 +1,59 @@
+# src/app/core/tasks.py
+import logging
+import threading
+from typing import Callable, Optional
+
+log = logging.getLogger("core.tasks")
+
+
+class PeriodicTask:
+    """
+    Ejecuta ``fn`` cada ``interval_sec`` segundos en un hilo daemon.
+    Los errores se registran y no detienen el ciclo. Con ``gate`` (p.ej.
+    ``leases.manager.gate("gc")``) cada ejecución se salta si devuelve False.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval_sec: float,
+        fn: Callable[[], None],
+        *,
+        initial_delay_sec: Optional[float] = None,
+        gate: Optional[Callable[[], bool]] = None,
+    ):
+        self.name = name
+        self.interval_sec = interval_sec
+        self.fn = fn
+        self.gate = gate
+        # por defecto la primera ejecución espera un intervalo completo
+        self.initial_delay_sec = interval_sec if initial_delay_sec is None else initial_delay_sec
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> None:
+        if self.gate is not None and not self.gate():
+            return
+        try:
+            self.fn()
+        except Exception:
+            log.exception("Periodic task %s failed", self.name)
+
+    def _run(self) -> None:
+        delay = self.initial_delay_sec
+        while not self._stop.wait(delay):
+            self.run_once()
+            delay = self.interval_sec
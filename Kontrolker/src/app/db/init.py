@@ -0,0 +1,73 @@
+# src/app/db/init.py
+"""
+Creación del esquema una sola vez aunque arranquen varios workers.
+
+``init_db`` toma un lock de archivo antes de ``migrations.upgrade``: el primer
+proceso crea las tablas, agrega las columnas nuevas a las existentes e indexa
+las labels de filas anteriores a ``resource_labels``; los demás esperan y
+encuentran todo listo. También se puede correr como paso previo al
+despliegue::
+
+    python -m app.db.init
+"""
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.core.config import settings
+
+log = logging.getLogger("db.init")
+
+# el entry point multi-worker lo marca tras inicializar en el proceso padre
+SCHEMA_READY_ENV = "KONTROLKER_SCHEMA_READY"
+
+
+@contextmanager
+def _file_lock(path: Path):
+    with open(path, "a+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK se rinde tras ~10s; seguimos esperando
+                    time.sleep(0.1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def init_db(force: bool = False) -> None:
+    if not force and os.environ.get(SCHEMA_READY_ENV) == "1":
+        return
+
+    # imports aquí: quien solo quiere saber si hace falta inicializar no paga los modelos
+    from app.db.migrations import upgrade
+    from app.db.session import engine
+
+    lock_path = Path(settings.DB_INIT_LOCK or Path(tempfile.gettempdir()) / "kontrolker-db-init.lock")
+    started = time.perf_counter()
+    with _file_lock(lock_path):
+        backfilled = upgrade(engine)
+    if backfilled:
+        log.info("Indexed labels of %s pre-existing resources", backfilled)
+    log.info("Schema ready in %.1f ms", (time.perf_counter() - started) * 1000)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    init_db(force=True)
@@ -0,0 +1,107 @@
+# src/app/db/migrations.py
+"""
+Migraciones del esquema sin Alembic.
+
+``create_all`` crea las tablas que faltan pero nunca agrega columnas a una
+tabla que ya existe, así que cada columna nueva en una tabla existente va en
+``MIGRATIONS`` con el DEFAULT que reciben las filas viejas. ``migrate`` mira
+las columnas reales con ``inspect`` y solo corre los ``ALTER TABLE ... ADD
+COLUMN`` que faltan: es idempotente y se puede correr en cada arranque.
+
+``missing_columns`` compara los modelos con la DB; ``upgrade`` falla si después
+de migrar queda alguna, así una columna nueva sin su migración rompe el
+arranque con un mensaje claro y no en el primer query.
+"""
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("db.migrations")
+
+
+class AddColumn(NamedTuple):
+    id: str                  # <request>_<tabla>_<columna>, solo para los logs
+    table: str
+    column: str
+    default: Optional[str]   # DEFAULT en SQL para las filas existentes (obligatorio si es NOT NULL)
+
+
+MIGRATIONS: Tuple[AddColumn, ...] = (
+    AddColumn("029_services_labels", "services", "labels", "'{}'"),
+    AddColumn("029_containers_labels", "containers", "labels", "'{}'"),
+    # NULL = sin reserva; las cuotas cuentan 0 para los contenedores viejos
+    AddColumn("038_containers_cpu", "containers", "cpu", None),
+    AddColumn("038_containers_memory_mb", "containers", "memory_mb", None),
+    # NULL = sin puertos reservados; ``ports.rebuild`` ignora esas filas
+    AddColumn("039_containers_ports", "containers", "ports", None),
+    # NULL = creado antes del hash: el redeploy lo cuenta como desactualizado
+    AddColumn("045_services_spec_hash", "services", "spec_hash", None),
+    AddColumn("045_containers_spec_hash", "containers", "spec_hash", None),
+)
+
+
+def migrate(engine: Engine) -> List[str]:
+    """Agrega las columnas de ``MIGRATIONS`` que falten; devuelve los ids aplicados."""
+    from app.models import Base
+
+    applied: List[str] = []
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        tables = set(insp.get_table_names())
+        columns = {table: {c["name"] for c in insp.get_columns(table)} for table in tables}
+        for step in MIGRATIONS:
+            # una tabla que no existe la crea create_all completa
+            if step.table not in tables or step.column in columns[step.table]:
+                continue
+            col = Base.metadata.tables[step.table].c[step.column]
+            ddl = f"ALTER TABLE {step.table} ADD COLUMN {step.column} {col.type.compile(dialect=engine.dialect)}"
+            if step.default is not None:
+                ddl += f" DEFAULT {step.default}"
+            if not col.nullable:
+                ddl += " NOT NULL"
+            conn.execute(text(ddl))
+            columns[step.table].add(step.column)
+            applied.append(step.id)
+    for step_id in applied:
+        log.info("Applied migration %s", step_id)
+    return applied
+
+
+def missing_columns(engine: Engine) -> List[str]:
+    """``tabla.columna`` de los modelos que no están en la DB (tablas existentes)."""
+    from app.models import Base
+
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    missing: List[str] = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        present = {c["name"] for c in insp.get_columns(table.name)}
+        missing += [f"{table.name}.{col.name}" for col in table.columns if col.name not in present]
+    return missing
+
+
+def upgrade(engine: Engine) -> int:
+    """
+    Deja el esquema al día: tablas nuevas, columnas nuevas y el índice de
+    labels de filas anteriores a ``resource_labels``. Devuelve cuántos
+    recursos se indexaron.
+    """
+    from sqlalchemy.orm import Session
+
+    from app.models import Base
+    from app.services.labels import backfill_labels
+
+    Base.metadata.create_all(bind=engine)
+    migrate(engine)
+    missing = missing_columns(engine)
+    if missing:
+        raise RuntimeError(
+            f"Schema is missing columns without a migration: {', '.join(missing)} "
+            "(add them to app.db.migrations.MIGRATIONS)"
+        )
+    with Session(engine) as db:
+        return backfill_labels(db)
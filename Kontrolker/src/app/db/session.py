@@ -2,13 +2,17 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-# 👇 para dev
-SQLALCHEMY_DATABASE_URL = "sqlite:///./kontrolker.db"
+from app.core.config import settings
+
+# 👇 viene de DB_URL (.env); por defecto "sqlite:///./kontrolker.db" para dev
+SQLALCHEMY_DATABASE_URL = settings.DB_URL
 # si lo corres desde otro directorio, quizá quieras: "sqlite:///src_app/kontrolker.db"
 
+# create_engine no abre conexiones: la primera se abre con el primer query
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},  # 👈 necesario en SQLite
+    # 👈 necesario en SQLite
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {},
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
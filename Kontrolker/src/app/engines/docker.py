@@ -1,23 +1,30 @@
 # src/app/engines/docker.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import hashlib
 import time
 import logging
 import shlex
 
-import docker
-from docker.errors import APIError, ImageNotFound, DockerException
+import orjson
+
+# El SDK de docker (requests, urllib3...) se importa al crear el primer cliente,
+# no al importar este módulo: el arranque de cada worker no lo paga.
+if TYPE_CHECKING:
+    import docker
+
+from app.core.admission import admission
+from app.engines import resilience
+from app.engines.resilience import NO_RETRY
 
 log = logging.getLogger("engines.docker")
 
 # Guardrails
 DENY_MOUNTS_PREFIXES = ["/", "/etc", "/var/run/docker.sock"]
 DEFAULT_RESTART_POLICY = {"Name": "no"}
-
-# Auto-pull
-AUTO_PULL_RETRIES = 2
-AUTO_PULL_BACKOFF_SEC = 2.0
+# label de Docker con el hash de la spec efectiva (ver ``spec_digest``)
+SPEC_HASH_LABEL = "kontrolker.spec-hash"
 
 @dataclass
 class CreateResult:
@@ -26,6 +33,29 @@ class CreateResult:
     status: str
     cli_hint: str  # 👈 nuevo
 
+@dataclass(frozen=True)
+class ContainerSpec:
+    """
+    Definición ya validada y traducida al formato del API de Docker. Se arma
+    una vez con ``compile_spec`` y se reutiliza en cada create; el HostConfig
+    se guarda por versión de API del cliente.
+    """
+    image: str
+    name: Optional[str]
+    environment: Dict[str, str]
+    host_config_args: Dict[str, object]
+    cli_hint: str
+    spec_hash: str
+    labels: Dict[str, str]   # labels de Docker, ya con SPEC_HASH_LABEL
+    _host_configs: Dict[str, dict] = field(default_factory=dict, compare=False, repr=False)
+
+    def host_config(self, client: docker.DockerClient) -> dict:
+        version = client.api.api_version
+        host_config = self._host_configs.get(version)
+        if host_config is None:
+            host_config = self._host_configs[version] = client.api.create_host_config(**self.host_config_args)
+        return host_config
+
 def _validate_mounts_safe(mounts: List[Tuple[str, str]] | None):
     if not mounts:
         return
@@ -39,8 +69,26 @@ def _validate_privileged(privileged: bool | None):
         raise ValueError("Running containers with --privileged is not allowed")
 
 def get_client() -> docker.DockerClient:
+    import docker
     return docker.from_env()
 
+_ping_client: docker.DockerClient | None = None
+
+def ping(timeout: float) -> None:
+    """
+    Ping al daemon con un cliente reutilizado y timeout corto (para health checks).
+    El cliente se descarta si falla, para reconectar en el siguiente intento.
+    """
+    global _ping_client
+    if _ping_client is None:
+        import docker
+        _ping_client = docker.from_env(timeout=timeout)
+    try:
+        _ping_client.ping()
+    except Exception:
+        _ping_client = None
+        raise
+
 def _build_cli_hint(
     *, image: str, name: Optional[str], ports: Dict[str, int] | None,
     env: Dict[str, str] | None, cpu: float | None, memory_mb: int | None,
@@ -65,88 +113,192 @@ def _build_cli_hint(
     return " ".join(parts)
 
 def _ensure_image(client: docker.DockerClient, image: str):
+    from docker.errors import APIError, ImageNotFound, DockerException
     try:
-        client.images.get(image)
+        resilience.call("images", lambda: client.images.get(image))
         log.info("Image present: %s", image)
         return
     except ImageNotFound:
-        last_err: Exception | None = None
-        for attempt in range(1 + AUTO_PULL_RETRIES):
-            try:
-                log.info("Pulling image (attempt %s/%s): %s", attempt+1, 1+AUTO_PULL_RETRIES, image)
-                client.images.pull(image)
-                log.info("Image pulled: %s", image)
-                return
-            except (APIError, DockerException) as e:
-                last_err = e
-                log.error("Pull failed: %s (attempt %s)", e, attempt+1)
-                time.sleep(AUTO_PULL_BACKOFF_SEC * (attempt + 1))
-        raise ValueError(f"Could not pull image '{image}': {last_err}") from last_err
+        pass
     except (APIError, DockerException) as e:
         raise ValueError(f"Docker error while checking image '{image}': {e}") from e
 
-def create_and_start(
+    # los pulls son lo más caro para dockerd: cupo propio, que se suelta
+    # mientras se espera el siguiente intento
+    try:
+        log.info("Pulling image: %s", image)
+        resilience.call(
+            "pull",
+            lambda: client.images.pull(image),
+            slot=lambda: admission.acquire("pull"),
+        )
+        log.info("Image pulled: %s", image)
+    except (APIError, DockerException) as e:
+        raise ValueError(f"Could not pull image '{image}': {e}") from e
+
+def ensure_image(image: str) -> None:
+    """Pull de la imagen si el daemon no la tiene (p.ej. antes de un rollout)."""
+    from docker.errors import DockerException
+    try:
+        client = resilience.call("connect", get_client)
+    except DockerException as e:
+        raise ValueError(f"Cannot connect to Docker: {e}") from e
+    _ensure_image(client, image)
+
+def spec_digest(image: str, environment: Dict[str, str], host_config_args: Dict[str, object]) -> str:
+    """
+    Hash canónico de lo que Docker recibe (claves ordenadas): dos specs con el
+    mismo hash producen contenedores equivalentes. El nombre no entra.
+    """
+    canonical = orjson.dumps(
+        {"image": image, "env": environment, "host_config": host_config_args},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+def compile_spec(
     *, image: str, name: Optional[str], ports: Dict[str, int] | None,
     env: Dict[str, str] | None, cpu: float | None, memory_mb: int | None,
     mounts: List[Tuple[str, str]] | None = None, privileged: bool | None = None,
-) -> CreateResult:
+    labels: Dict[str, str] | None = None,
+) -> ContainerSpec:
     _validate_privileged(privileged)
     _validate_mounts_safe(mounts)
+    environment = dict(env or {})
+    host_config_args = {
+        "port_bindings": dict(ports or {}),
+        "binds": [f"{h}:{c}" for (h, c) in (mounts or [])],
+        "privileged": False,
+        "mem_limit": f"{memory_mb}m" if memory_mb else None,
+        "nano_cpus": int(cpu * 1e9) if cpu else None,
+        "restart_policy": DEFAULT_RESTART_POLICY,
+    }
+    spec_hash = spec_digest(image, environment, host_config_args)
+    return ContainerSpec(
+        image=image,
+        name=name,
+        environment=environment,
+        host_config_args=host_config_args,
+        spec_hash=spec_hash,
+        labels={**(labels or {}), SPEC_HASH_LABEL: spec_hash},
+        cli_hint=_build_cli_hint(
+            image=image, name=name, ports=ports, env=env,
+            cpu=cpu, memory_mb=memory_mb, mounts=mounts
+        ),
+    )
 
-    client = get_client()
-    started = time.time()
-
-    _ensure_image(client, image)
-
-    cli_hint = _build_cli_hint(
+def create_and_start(
+    *, image: str, name: Optional[str], ports: Dict[str, int] | None,
+    env: Dict[str, str] | None, cpu: float | None, memory_mb: int | None,
+    mounts: List[Tuple[str, str]] | None = None, privileged: bool | None = None,
+) -> CreateResult:
+    spec = compile_spec(
         image=image, name=name, ports=ports, env=env,
-        cpu=cpu, memory_mb=memory_mb, mounts=mounts
+        cpu=cpu, memory_mb=memory_mb, mounts=mounts, privileged=privileged,
     )
+    return create_from_spec(spec)
+
+def create_from_spec(spec: ContainerSpec) -> CreateResult:
+    from docker.errors import APIError, DockerException
+    started = time.time()
 
     try:
-        host_config = client.api.create_host_config(
-            port_bindings=ports or {},
-            binds=[f"{h}:{c}" for (h, c) in (mounts or [])],
-            privileged=False,
-            mem_limit=f"{memory_mb}m" if memory_mb else None,
-            nano_cpus=int(cpu * 1e9) if cpu else None,
-            restart_policy=DEFAULT_RESTART_POLICY,
-        )
-        container = client.api.create_container(
-            image=image, name=name, environment=env or {}, host_config=host_config, detach=True
+        client = resilience.call("connect", get_client)
+    except DockerException as e:
+        raise ValueError(f"Cannot connect to Docker: {e}") from e
+    _ensure_image(client, spec.image)
+
+    docker_id = None
+    try:
+        host_config = spec.host_config(client)
+        # create no es idempotente (el nombre quedaría tomado): sin reintentos
+        container = resilience.call(
+            "create",
+            lambda: client.api.create_container(
+                image=spec.image, name=spec.name, environment=spec.environment,
+                labels=spec.labels, host_config=host_config, detach=True,
+            ),
+            retry=NO_RETRY,
         )
         docker_id = container.get("Id")
-        client.api.start(docker_id)
-        info = client.api.inspect_container(docker_id)
+        resilience.call("start", lambda: client.api.start(docker_id))
+        info = resilience.call("inspect", lambda: client.api.inspect_container(docker_id))
         status = info["State"]["Status"]
 
         log.info("Container created: id=%s name=%s image=%s status=%s duration=%.2fs",
-                 docker_id, info["Name"].lstrip("/"), image, status, time.time()-started)
-        return CreateResult(docker_id=docker_id, name=info["Name"].lstrip("/"), status=status, cli_hint=cli_hint)
+                 docker_id, info["Name"].lstrip("/"), spec.image, status, time.time()-started)
+        return CreateResult(docker_id=docker_id, name=info["Name"].lstrip("/"), status=status, cli_hint=spec.cli_hint)
 
     except (APIError, DockerException) as e:
         msg = getattr(e, "explanation", None) or str(e)
         log.error("Docker create/start error: %s", msg)
+        if docker_id:
+            # creado pero sin arrancar (p.ej. puerto ocupado): nadie más lo conoce
+            try:
+                resilience.call("remove", lambda: client.api.remove_container(docker_id, force=True))
+            except (APIError, DockerException):
+                log.exception("Could not remove container %s after failed start", docker_id)
         raise ValueError(msg) from e
 
 def inspect(container_id: str) -> dict:
-    return get_client().api.inspect_container(container_id)
+    return resilience.call("inspect", lambda: get_client().api.inspect_container(container_id))
 
 def list_containers(*, all_: bool = False, filters: dict | None = None) -> List[dict]:
-    return get_client().api.containers(all=all_, filters=filters or {})
+    return resilience.call("list", lambda: get_client().api.containers(all=all_, filters=filters or {}))
 
 def start(container_id: str):
-    get_client().api.start(container_id)
+    resilience.call("start", lambda: get_client().api.start(container_id))
     log.info("Container started: %s", container_id)
 
 def stop(container_id: str):
-    get_client().api.stop(container_id)
+    resilience.call("stop", lambda: get_client().api.stop(container_id))
     log.info("Container stopped: %s", container_id)
 
 def restart(container_id: str):
-    get_client().api.restart(container_id)
+    resilience.call("restart", lambda: get_client().api.restart(container_id))
     log.info("Container restarted: %s", container_id)
 
-def remove(container_id: str):
-    get_client().api.remove_container(container_id)
+def remove(container_id: str, force: bool = False, missing_ok: bool = False):
+    from docker.errors import NotFound
+
+    try:
+        resilience.call("remove", lambda: get_client().api.remove_container(container_id, force=force))
+    except NotFound:
+        if not missing_ok:
+            raise
+        return
     log.info("Container removed: %s", container_id)
+
+def remove_image(image: str) -> bool:
+    """Borra la imagen si nadie la usa; False si no existe o está en uso."""
+    from docker.errors import APIError, ImageNotFound
+
+    try:
+        resilience.call("images", lambda: get_client().api.remove_image(image))
+    except ImageNotFound:
+        return False
+    except APIError as e:
+        if e.status_code == 409:  # la usa algún contenedor
+            return False
+        raise
+    log.info("Image removed: %s", image)
+    return True
+
+def logs(container_id: str, *, since: float | None = None) -> bytes:
+    """stdout+stderr con timestamps RFC3339 al inicio de cada línea."""
+    return resilience.call(
+        "logs",
+        lambda: get_client().api.logs(
+            container_id, stdout=True, stderr=True, timestamps=True, since=since or None, stream=False,
+        ),
+    )
+
+def stats(container_id: str) -> dict:
+    """Una muestra de ``docker stats`` sin esperar a la siguiente (one-shot)."""
+    return resilience.call(
+        "stats", lambda: get_client().api.stats(container_id, stream=False, one_shot=True),
+    )
+
+def events(*, filters: dict | None = None):
+    """Stream de eventos de Docker ya decodificados; se cancela con ``.close()``."""
+    return resilience.call("events", lambda: get_client().api.events(decode=True, filters=filters or {}))
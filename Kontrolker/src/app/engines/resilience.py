@@ -0,0 +1,230 @@
+# src/app/engines/resilience.py
+"""
+Reintentos y circuit breakers para las llamadas al daemon de Docker.
+
+- ``RetryPolicy``: backoff exponencial con *full jitter* (espera aleatoria
+  entre 0 y ``base * 2**intento``, con tope) y un presupuesto total de tiempo,
+  así una ráfaga de fallas no reintenta sincronizada contra el daemon.
+- ``CircuitBreaker`` por endpoint (pull, create, start...): tras
+  ``BREAKER_FAILURE_THRESHOLD`` fallas transitorias seguidas se abre y las
+  llamadas fallan al instante con ``CircuitOpen`` (503 + Retry-After) durante
+  ``BREAKER_RESET_SEC``; después deja pasar una llamada de prueba (half-open)
+  y según resulte se cierra o vuelve a abrir.
+
+Solo cuentan como fallas los errores transitorios (conexión, timeouts, 5xx):
+un 404 o 409 significa que el daemon responde bien.
+
+Los handlers son síncronos (threadpool), así que la espera entre intentos
+ocupa el hilo del request. Por eso, dentro de un request (hay request id), el
+presupuesto de reintentos de cada llamada se acota a
+``ADMISSION_WAIT_TIMEOUT_SEC``, lo mismo que el request está dispuesto a
+esperar un cupo. Los loops de fondo usan ``DOCKER_RETRY_DEADLINE_SEC``
+completo. La espera tampoco ocupa un cupo de admission control y, con el
+breaker abierto, no hay espera alguna.
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.request_id import get_request_id
+
+log = logging.getLogger("engines.resilience")
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, endpoint: str, retry_after: int):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(f"Docker endpoint '{endpoint}' unavailable (circuit open)")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Errores en los que vale la pena reintentar (y que cuentan para el breaker)."""
+    try:
+        import requests
+        from docker.errors import APIError, DockerException, NotFound
+    except ImportError:  # sin SDK no hay errores de Docker que clasificar
+        return False
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, NotFound):
+        return False
+    if isinstance(exc, APIError):
+        return exc.status_code is None or exc.status_code >= 500
+    # from_env() sin daemon, socket inexistente, etc.
+    return isinstance(exc, DockerException)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int
+    base_delay_sec: float
+    max_delay_sec: float
+    deadline_sec: float
+
+    def delays(self) -> Iterator[float]:
+        """Esperas entre intentos (full jitter); una menos que ``attempts``."""
+        for attempt in range(self.attempts - 1):
+            cap = min(self.max_delay_sec, self.base_delay_sec * (2 ** attempt))
+            yield random.uniform(0, cap)
+
+
+DEFAULT_RETRY = RetryPolicy(
+    attempts=settings.DOCKER_RETRY_ATTEMPTS,
+    base_delay_sec=settings.DOCKER_RETRY_BASE_MS / 1000,
+    max_delay_sec=settings.DOCKER_RETRY_MAX_MS / 1000,
+    deadline_sec=settings.DOCKER_RETRY_DEADLINE_SEC,
+)
+NO_RETRY = RetryPolicy(attempts=1, base_delay_sec=0, max_delay_sec=0, deadline_sec=0)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout_sec: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0           # transitorias seguidas
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def _retry_after(self) -> int:
+        remaining = self.reset_timeout_sec - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout_sec:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, self._retry_after())
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, 1)
+                self._probe_in_flight = True
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                log.info("Circuit %s closed", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def on_failure(self, exc: BaseException) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            if not is_transient(exc):
+                # el daemon respondió: si era la prueba, el circuito se cierra
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                    self.failures = 0
+                return
+            self.failures += 1
+            self.last_error = str(exc) or type(exc).__name__
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    log.warning("Circuit %s opened after %s failures: %s", self.name, self.failures, self.last_error)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self.state
+            if state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_sec:
+                state = HALF_OPEN  # la próxima llamada será la de prueba
+            return {
+                "state": state,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+class BreakerRegistry:
+    def __init__(self, failure_threshold: int, reset_timeout_sec: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    endpoint, self.failure_threshold, self.reset_timeout_sec,
+                )
+            return breaker
+
+    def any_open(self) -> bool:
+        return any(b["state"] == OPEN for b in self.snapshot().values())
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.snapshot() for b in breakers}
+
+
+breakers = BreakerRegistry(settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SEC)
+
+
+def retry_budget(retry: RetryPolicy) -> float:
+    """Segundos que una llamada puede pasar reintentando; menos si bloquea un request."""
+    if get_request_id() is None:
+        return retry.deadline_sec
+    return min(retry.deadline_sec, settings.ADMISSION_WAIT_TIMEOUT_SEC)
+
+
+def call(
+    endpoint: str,
+    fn: Callable[[], T],
+    *,
+    retry: RetryPolicy = DEFAULT_RETRY,
+    slot: Optional[Callable[[], object]] = None,
+) -> T:
+    """
+    Ejecuta ``fn`` bajo el breaker de ``endpoint`` reintentando los errores
+    transitorios según ``retry``. ``slot`` (p.ej. ``lambda: admission.acquire("pull")``)
+    se toma en cada intento y se suelta durante la espera entre intentos.
+    Sin tiempo para otro intento dentro de ``retry_budget`` se propaga el error.
+    """
+    breaker = breakers.get(endpoint)
+    deadline = time.monotonic() + retry_budget(retry)
+    delays = retry.delays()
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        try:
+            if slot is None:
+                result = fn()
+            else:
+                with slot():
+                    result = fn()
+        except Exception as e:
+            breaker.on_failure(e)
+            delay = next(delays, None)
+            if not is_transient(e) or delay is None or time.monotonic() + delay > deadline:
+                raise
+            log.warning("Docker %s failed (attempt %s), retrying in %.2fs: %s", endpoint, attempt, delay, e)
+            time.sleep(delay)
+            continue
+        breaker.on_success()
+        return result
@@ -1,22 +1,103 @@
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, APIRouter
+from anyio import to_thread
+from fastapi import FastAPI, APIRouter, Request
 from fastapi.staticfiles import StaticFiles
-from starlette.responses import FileResponse, JSONResponse
-from sqlalchemy import text
+from fastapi.responses import ORJSONResponse
+from starlette.responses import FileResponse
+from .core import health, idempotency
+from .core.admission import AdmissionRejected, admission
+from .core.leases import manager as leases
+from .core.config import settings
 from .core.logging import setup_logging
+from .core.profiling import ProfilingMiddleware
 from .core.request_id import RequestIDMiddleware
-from .db.session import engine, SessionLocal
-from .models import Base
-from .routers import projects_router, services_router, containers_router
+from .db.init import init_db
+from .engines.resilience import CircuitOpen, breakers
+from .routers import (
+    projects_router,
+    services_router,
+    containers_router,
+    events_router,
+    admin_router,
+)
+from .services import events, gc, logstore, ports, quotas, specs, stats
+from .services.ports import PortUnavailable
+from .services.quotas import QuotaExceeded
 from .routers.containers import router as containers_router
-import docker
 
-setup_logging()
-app = FastAPI(title="Kontrolker API")
-app.add_middleware(RequestIDMiddleware)
+setup_logging(level=logging.getLevelName(settings.LOG_LEVEL.upper()), json_logs=settings.LOG_JSON)
 
-# crea tablas
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DB_INIT_ON_STARTUP:
+        init_db()
+    ports.rebuild()
+    admission.fit_threadpool(to_thread.current_default_thread_limiter().total_tokens)
+    leases.start()  # antes que los loops: así saben de entrada si son líderes
+    health.prober.start()
+    events.writer.start()
+    events.retention.start()
+    quotas.repair.start()
+    gc.collector.start()
+    idempotency.purger.start()
+    if settings.LOGS_ENABLED:
+        logstore.collector.start()
+        logstore.retention.start()
+    if settings.STATS_ENABLED:
+        stats.collector.start()
+    if settings.EVENTS_DOCKER_WATCH:
+        events.docker_watcher.start()
+    yield
+    events.docker_watcher.stop()
+    stats.collector.stop()
+    logstore.retention.stop()
+    logstore.collector.stop()
+    idempotency.purger.stop()
+    gc.collector.stop()
+    quotas.repair.stop()
+    events.retention.stop()
+    events.writer.stop()  # vacía lo pendiente antes de salir
+    health.prober.stop()
+    leases.stop()  # suelta los leases para que otra réplica siga sin esperar el TTL
+
+
+app = FastAPI(title="Kontrolker API", lifespan=lifespan)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"Docker busy ({exc.limiter}: {exc.reason}), retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request: Request, exc: CircuitOpen):
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(QuotaExceeded)
+async def quota_exceeded_handler(request: Request, exc: QuotaExceeded):
+    return ORJSONResponse(status_code=403, content={"detail": str(exc)})
+
+
+@app.exception_handler(PortUnavailable)
+async def port_unavailable_handler(request: Request, exc: PortUnavailable):
+    return ORJSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+app.add_middleware(idempotency.IdempotencyMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestIDMiddleware)  # el último agregado es el más externo
 
 # static opcional...
 # (lo que ya tenías)
@@ -25,27 +106,50 @@ api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(projects_router, tags=["Projects"])
 api_router.include_router(services_router, tags=["Services"])
 api_router.include_router(containers_router, tags=["Containers"])
+api_router.include_router(events_router, tags=["Events"])
 app.include_router(api_router)
+app.include_router(admin_router)
+
+# async: solo leen la cache, no vale la pena pasar por el threadpool
+@app.get("/livez", summary="Liveness: el proceso responde")
+async def livez():
+    return {"status": "ok"}
 
-@app.get("/health", summary="DB + Docker health")
-def health():
-    ok_db = False
-    ok_docker = False
-    try:
-        with SessionLocal() as s:
-            s.execute(text("SELECT 1"))
-            ok_db = True
-    except Exception:
-        ok_db = False
-
-    try:
-        docker.from_env().ping()
-        ok_docker = True
-    except Exception:
-        ok_docker = False
 
+@app.get("/readyz", summary="Readiness desde cache (DB + Docker)")
+async def readyz():
+    ready, reason = health.prober.readiness()
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "status": reason, "checks": health.prober.snapshot()},
+    )
+
+
+@app.get("/health", summary="DB + Docker health (desde cache)")
+async def health_check():
+    checks = health.prober.snapshot()
+    ok_db = checks.get("db", {}).get("status") in (health.OK, health.DEGRADED)
+    ok_docker = checks.get("docker", {}).get("status") in (health.OK, health.DEGRADED)
     status_code = 200 if (ok_db and ok_docker) else 503
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
-        content={"db": ok_db, "docker": ok_docker}
+        content={
+            "db": ok_db,
+            "docker": ok_docker,
+            "checks": checks,
+            # un circuito abierto no tumba el health: el proceso sigue sirviendo lecturas
+            "breakers": breakers.snapshot(),
+        },
     )
+
+
+@app.get("/metrics", summary="Métricas internas (admission control, circuit breakers, leases, puertos, specs, stats)")
+async def metrics():
+    return ORJSONResponse(content={
+        "admission": admission.snapshot(),
+        "breakers": breakers.snapshot(),
+        "leases": leases.snapshot(),
+        "ports": ports.allocator().snapshot(),
+        "specs": specs.cache.snapshot(),
+        "stats": stats.store.snapshot(),
+    })
@@ -2,5 +2,15 @@ from app.db.session import Base
 from .project import Project
 from .service import Service
 from .containers import Container
+from .labels import ResourceLabel
+from .events import ContainerEvent
+from .quotas import ProjectQuota
+from .leases import Lease, Replica
+from .idempotency import IdempotencyKey
+from sqlalchemy.orm import configure_mappers
 
-__all__ = ["Base", "Project", "Service", "Container"]
+# resuelve los backrefs (Project.services, Service.containers...) para poder
+# usarlos en opciones de carga como selectinload desde el primer request
+configure_mappers()
+
+__all__ = ["Base", "Project", "Service", "Container", "ResourceLabel", "ContainerEvent", "ProjectQuota", "Lease", "Replica", "IdempotencyKey"]
@@ -1,6 +1,6 @@
 # src/app/models/container.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -16,6 +16,16 @@ class Container(Base):
     service_id = Column(Integer, ForeignKey("services.id"), nullable=True, index=True)
 
     status = Column(String(64), nullable=False, default="created")
+    labels = Column(JSON, nullable=False, default=dict)
+    # solo contenedores inline: {"80/tcp": 8080}; los de un service usan los del service
+    ports = Column(JSON, nullable=True)
+
+    # recursos reservados contra la cuota del project (se liberan al borrar)
+    cpu = Column(Float, nullable=True)
+    memory_mb = Column(Integer, nullable=True)
+
+    # hash de la spec del service con que se creó; distinto al del service = desactualizado
+    spec_hash = Column(String(32), nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,33 @@
+# src/app/models/events.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.db.session import Base
+
+
+class ContainerEvent(Base):
+    """
+    Historial append-only de transiciones de contenedores. Sin FKs a propósito:
+    el historial sobrevive a los contenedores borrados y las escrituras en lote
+    no pagan validación de llaves.
+    """
+    __tablename__ = "container_events"
+
+    id = Column(Integer, primary_key=True)
+    container_id = Column(Integer, nullable=True)
+    docker_id = Column(String(128), nullable=True)
+    service_id = Column(Integer, nullable=True)
+    project_id = Column(Integer, nullable=True)
+
+    action = Column(String(32), nullable=False)        # create, start, stop, die, restart...
+    from_status = Column(String(64), nullable=True)
+    to_status = Column(String(64), nullable=True)
+    source = Column(String(16), nullable=False, default="api")  # api | docker
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_container_events_created_at", "created_at"),
+        Index("ix_container_events_container_time", "container_id", "created_at"),
+        Index("ix_container_events_service_time", "service_id", "created_at"),
+        Index("ix_container_events_project_time", "project_id", "created_at"),
+    )
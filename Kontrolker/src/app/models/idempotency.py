@@ -0,0 +1,22 @@
+# src/app/models/idempotency.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from app.db.session import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Respuesta guardada de un POST de creación con ``Idempotency-Key``.
+    ``status_code`` NULL = request en curso; ``expires_at`` es el plazo de ese
+    bloqueo mientras corre y el TTL de la respuesta una vez terminado.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(32), nullable=False)   # blake2b de método + ruta + body
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    body = Column(LargeBinary, nullable=True)           # comprimido con zlib
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,25 @@
+# src/app/models/labels.py
+from sqlalchemy import Column, Integer, String, Index, UniqueConstraint
+from app.db.session import Base
+
+
+class ResourceLabel(Base):
+    """
+    Copia normalizada (una fila por llave) de la columna JSON ``labels`` de
+    projects, services y containers. Existe solo para poder filtrar por
+    selectores en la DB usando índices; la fuente de verdad sigue siendo el JSON.
+    """
+    __tablename__ = "resource_labels"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(16), nullable=False)          # project | service | container
+    resource_id = Column(Integer, nullable=False)
+    key = Column(String(100), nullable=False)
+    value = Column(String(255), nullable=False)
+
+    __table_args__ = (
+        # una llave por recurso; también sirve para borrar/leer por recurso
+        UniqueConstraint("kind", "resource_id", "key", name="uq_resource_labels_resource_key"),
+        # índice cubriente para `key=value` / `key in (...)` / `key` (exists)
+        Index("ix_resource_labels_lookup", "kind", "key", "value", "resource_id"),
+    )
@@ -0,0 +1,29 @@
+# src/app/models/leases.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.session import Base
+
+
+class Lease(Base):
+    """
+    Lease de un loop singleton (gc, quota-repair...). ``fencing_token`` sube cada
+    vez que cambia de dueño: quien escribe con un token viejo sabe que lo perdió.
+    """
+    __tablename__ = "leases"
+
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(128), nullable=False)
+    fencing_token = Column(Integer, nullable=False, default=1)
+    expires_at = Column(DateTime, nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Replica(Base):
+    """Latido de cada réplica viva; define entre quiénes se reparte el trabajo."""
+    __tablename__ = "replicas"
+
+    id = Column(String(128), primary_key=True)
+    hostname = Column(String(255), nullable=True)
+    pid = Column(Integer, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_seen = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
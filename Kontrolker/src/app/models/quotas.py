@@ -0,0 +1,25 @@
+# src/app/models/quotas.py
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from app.db.session import Base
+
+
+class ProjectQuota(Base):
+    """
+    Límites por project y contadores de uso mantenidos de forma incremental
+    (se actualizan en la misma transacción que crea/borra contenedores).
+    Un límite NULL significa sin tope. Sin fila = project sin cuota.
+    """
+    __tablename__ = "project_quotas"
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+
+    max_cpu = Column(Float, nullable=True)
+    max_memory_mb = Column(Integer, nullable=True)
+    max_containers = Column(Integer, nullable=True)
+
+    used_cpu = Column(Float, nullable=False, default=0.0)
+    used_memory_mb = Column(Integer, nullable=False, default=0)
+    used_containers = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
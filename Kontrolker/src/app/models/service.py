@@ -24,6 +24,9 @@ class Service(Base):
     ports = Column(JSON, nullable=False, default=list)
     env = Column(JSON, nullable=False, default=dict)
     resources = Column(JSON, nullable=True)
+    labels = Column(JSON, nullable=False, default=dict)
+    # hash de la spec efectiva (services.specs.spec_hash); sus contenedores llevan el mismo
+    spec_hash = Column(String(32), nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
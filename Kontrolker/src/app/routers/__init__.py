@@ -1,5 +1,7 @@
 from .projects import router as projects_router
 from .services import router as services_router
 from .containers import router as containers_router
+from .events import router as events_router
+from .admin import router as admin_router
 
-__all__ = ["projects_router", "services_router", "containers_router"]
+__all__ = ["projects_router", "services_router", "containers_router", "events_router", "admin_router"]
@@ -0,0 +1,52 @@
+# src/app/routers/admin.py
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.admin import require_admin
+from app.core.profiling import ProfiledRoute, store
+from app.services import gc
+
+router = APIRouter(
+    route_class=ProfiledRoute,
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get(
+    "/profiles",
+    summary="Perfiles de requests recientes",
+    description="Resumen de los últimos requests perfilados (más recientes primero).",
+)
+def list_profiles() -> List[dict]:
+    return [p.summary() for p in store.list()]
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="Detalle de un perfil",
+    description="Stacks colapsados (formato flamegraph) y log de SQL del request.",
+    responses={404: {"description": "Profile not found"}},
+)
+def get_profile(
+    profile_id: str,
+    top: int = Query(default=50, ge=1, le=1000, description="Cuántos stacks devolver"),
+) -> dict:
+    profile = store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.to_dict(top=top)
+
+
+@router.post(
+    "/gc",
+    summary="Correr una pasada del GC ahora",
+    description=(
+        "Contenedores de projects borrados, contenedores detenidos vencidos, imágenes "
+        "sin uso y purga de filas soft-deleted. Devuelve lo que hizo cada paso."
+    ),
+)
+def run_gc() -> dict:
+    return gc.collect()
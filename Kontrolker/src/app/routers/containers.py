@@ -1,10 +1,16 @@
 # src/app/routers/containers.py
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Query, status, Depends, Body
+from fastapi import APIRouter, HTTPException, Query, Request, status, Depends, Body
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
+from app.core.profiling import ProfiledRoute
+from app.core.serialization import Fields, item_response, list_response, sparse_fields
+from app.core.admission import admission
+from app.core.config import settings
 from app.db.deps import get_db
 from app.models.containers import Container
 from app.models.service import Service
@@ -12,11 +18,19 @@ from app.models.project import Project
 from app.schemas import (
     ContainerCreateFromService,
     ContainerCreateInline,
+    ContainerLogs,
     ContainerRead,
+    StatsSummary,
 )
 from app.engines import docker as dk
+from app.services import deploy, events, logstore, quotas, stats
+from app.services import ports as host_ports
+from app.services.ports import PortUnavailable
+from app.services.operations import OperationConflict, coordinator
+from app.services.labels import KIND_CONTAINER, apply_selector
 
 router = APIRouter(
+    route_class=ProfiledRoute,
     prefix="/containers",
     tags=["Containers"],
 )
@@ -43,11 +57,59 @@ def _ensure_service_exists(db: Session, service_id: int) -> Service:
     return svc
 
 
+def _run_operation(db: Session, row: Container, op: str, fn) -> None:
+    """
+    Ejecuta la operación bajo el coordinador por docker_id. Si otra petición
+    idéntica ya está en curso, no se llama a Docker: se recarga la fila que
+    escribió esa petición.
+    """
+    def leader():
+        db.refresh(row)  # pudo cambiar mientras esperábamos turno
+        fn()
+
+    try:
+        _, was_leader = coordinator.run(row.docker_id, op, leader)
+    except OperationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not was_leader:
+        db.refresh(row)
+
+
+@contextmanager
+def _ports_claimed(row: Container):
+    """
+    Vuelve a reservar los puertos inline antes de arrancar (``stop`` los liberó).
+    Si Docker falla, el contenedor no quedó corriendo y se liberan.
+    """
+    if not row.ports:
+        yield
+        return
+    owner = host_ports.container_owner(row.id)
+    alloc = host_ports.allocator()
+    held = all(alloc.owner_of(port) == owner for port in row.ports.values())
+    try:
+        alloc.claim(owner, row.ports.values())
+    except PortUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        yield
+    except BaseException:
+        if not held:
+            alloc.release(owner)
+        raise
+
+
 @router.post(
     "",
     response_model=ContainerRead,
     status_code=status.HTTP_201_CREATED,
     summary="Crear y arrancar contenedor (desde service_id o spec inline)",
+    responses={
+        403: {"description": "Cuota del project excedida"},
+        409: {"description": "Puerto del host ocupado o sin puertos libres"},
+        429: {"description": "Cola de admisión llena (ver Retry-After)"},
+        503: {"description": "Timeout esperando cupo para Docker (ver Retry-After)"},
+    },
     description=(
         "Si envías { service_id }, crea el contenedor usando la definición del Service. "
         "Si envías la spec inline (image, ports, env, etc.), crea sin depender de un Service."
@@ -62,59 +124,38 @@ def create_container(
         service_id = getattr(body, "service_id", None) or body.service_id
         svc = _ensure_service_exists(db, service_id)
 
-        # mapeo de puertos: list[{host, container}] -> {"<container>/tcp": host}
-        ports_map = {f'{p["container"]}/tcp': p["host"] for p in (svc.ports or [])}
-
         try:
-            res = dk.create_and_start(
-                image=svc.image,
-                name=None,
-                ports=ports_map,
-                env=svc.env or {},
-                cpu=(svc.resources or {}).get("cpu") if svc.resources else None,
-                memory_mb=(svc.resources or {}).get("memory_mb") if svc.resources else None,
-                mounts=None,
-                privileged=False,
-            )
+            return deploy.create_from_service(db, svc)
         except ValueError as e:
             raise HTTPException(status_code=422, detail=str(e))
 
-        now = datetime.utcnow()
-        row = Container(
-            docker_id=res.docker_id,
-            name=res.name,
-            image=svc.image,
-            status=res.status,
-            project_id=svc.project_id,
-            service_id=svc.id,
-            created_at=now,
-            updated_at=now,
-            deleted_at=None,
-        )
-        db.add(row)
-        db.commit()
-        db.refresh(row)
-        return row
-
     # B) spec inline
     inline: ContainerCreateInline = body  # type: ignore
 
     if inline.project_id:
         _ensure_project_exists(db, inline.project_id)
+        quotas.check(db, inline.project_id, inline.cpu, inline.memory_mb)
 
+    port_owner = host_ports.pending_owner()
+    bindings = host_ports.claim_bindings(port_owner, inline.ports)
     try:
-        res = dk.create_and_start(
-            image=inline.image,
-            name=inline.name,
-            ports=inline.ports or {},
-            env=inline.env or {},
-            cpu=inline.cpu,
-            memory_mb=inline.memory_mb,
-            mounts=inline.mounts or [],
-            privileged=False,
-        )
+        with admission.acquire("create", project_id=inline.project_id):
+            res = dk.create_and_start(
+                image=inline.image,
+                name=inline.name,
+                ports=bindings,
+                env=inline.env or {},
+                cpu=inline.cpu,
+                memory_mb=inline.memory_mb,
+                mounts=inline.mounts or [],
+                privileged=False,
+            )
     except ValueError as e:
+        host_ports.allocator().release(port_owner)
         raise HTTPException(status_code=422, detail=str(e))
+    except BaseException:
+        host_ports.allocator().release(port_owner)
+        raise
 
     now = datetime.utcnow()
     row = Container(
@@ -124,25 +165,30 @@ def create_container(
         status=res.status,
         project_id=inline.project_id,
         service_id=inline.service_id,
+        labels=inline.labels,
+        ports=bindings,
+        cpu=inline.cpu,
+        memory_mb=inline.memory_mb,
         created_at=now,
         updated_at=now,
         deleted_at=None,
     )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-    return row
+    return deploy.save_created(db, row, port_owner)
 
 
 @router.get(
     "",
     response_model=List[ContainerRead],
-    summary="Listar contenedores (filtros: project_id, service_id, status)",
+    summary="Listar contenedores (filtros: project_id, service_id, status, selector)",
+    description="Con `Accept: application/x-ndjson` responde en streaming, un contenedor por línea.",
 )
 def list_containers(
+    request: Request,
     project_id: Optional[int] = Query(default=None),
     service_id: Optional[int] = Query(default=None),
     status_: Optional[str] = Query(default=None, alias="status"),
+    selector: Optional[str] = Query(default=None, description="Selector de labels (p.ej. tier=web)"),
+    fields: Fields = Depends(sparse_fields(ContainerRead)),
     db: Session = Depends(get_db),
 ):
     q = db.query(Container).filter(Container.deleted_at.is_(None))
@@ -152,7 +198,12 @@ def list_containers(
         q = q.filter(Container.service_id == service_id)
     if status_ is not None:
         q = q.filter(Container.status == status_)
-    return q.all()
+    if selector:
+        try:
+            q = apply_selector(q, Container.id, KIND_CONTAINER, selector)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return list_response(request, q, Container, ContainerRead, fields)
 
 
 @router.get(
@@ -160,7 +211,17 @@ def list_containers(
     response_model=ContainerRead,
     summary="Inspeccionar contenedor",
 )
-def inspect_container(container_id: int, db: Session = Depends(get_db)):
+def inspect_container(
+    container_id: int,
+    fields: Fields = Depends(sparse_fields(ContainerRead)),
+    db: Session = Depends(get_db),
+):
+    if fields:
+        q = db.query(Container).filter(Container.id == container_id, Container.deleted_at.is_(None))
+        response = item_response(q, Container, ContainerRead, fields)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        return response
     row = (
         db.query(Container)
         .filter(Container.id == container_id, Container.deleted_at.is_(None))
@@ -171,10 +232,80 @@ def inspect_container(container_id: int, db: Session = Depends(get_db)):
     return row
 
 
+@router.get(
+    "/{container_id}/logs",
+    response_model=ContainerLogs,
+    summary="Logs guardados del contenedor (también de los ya borrados)",
+    description=(
+        "Lee el almacén de logs (requiere `LOGS_ENABLED`). Solo se descomprimen los bloques "
+        "del rango `since`/`until`; `grep` filtra por texto exacto. Con `refresh=true` primero "
+        "se bajan de Docker las líneas aún no recolectadas."
+    ),
+    responses={404: {"description": "Container not found o recolección de logs deshabilitada"}},
+)
+def container_logs(
+    container_id: int,
+    since: Optional[datetime] = Query(default=None, description="Desde (incluido); sin zona = UTC"),
+    until: Optional[datetime] = Query(default=None, description="Hasta (incluido); sin zona = UTC"),
+    grep: Optional[str] = Query(default=None, min_length=1, description="Texto que debe contener la línea"),
+    limit: int = Query(default=1000, ge=1, le=10_000),
+    refresh: bool = Query(default=False),
+    db: Session = Depends(get_db),
+):
+    if not settings.LOGS_ENABLED:
+        raise HTTPException(status_code=404, detail="Log collection is disabled")
+    # sin filtrar deleted_at: los logs sobreviven al contenedor
+    row = db.get(Container, container_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if refresh and row.deleted_at is None and row.status == "running":
+        logstore.drain(row)
+
+    lines, truncated = logstore.store.query(
+        container_id,
+        since=logstore.to_ns(since) if since else None,
+        until=logstore.to_ns(until) if until else None,
+        grep=grep,
+        limit=limit,
+    )
+    return ORJSONResponse(content={
+        "container_id": container_id,
+        "lines": [{"ts": logstore.from_ns(ts), "line": text} for ts, text in lines],
+        "truncated": truncated,
+    })
+
+
+@router.get(
+    "/{container_id}/stats",
+    response_model=StatsSummary,
+    summary="Historial de CPU y memoria del contenedor",
+    description=(
+        "avg/p95/max de CPU (%) y memoria (MB) entre `since` y `until` (por defecto la "
+        "última hora). La resolución se elige sola según el rango, o con `tier`. "
+        "Requiere `STATS_ENABLED`."
+    ),
+    responses={404: {"description": "No encontrado o recolección de stats deshabilitada"}},
+)
+def container_stats(
+    container_id: int,
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    tier: Optional[str] = Query(default=None, pattern=stats.TIER_PATTERN),
+    db: Session = Depends(get_db),
+):
+    if not settings.STATS_ENABLED:
+        raise HTTPException(status_code=404, detail="Stats collection is disabled")
+    # también de contenedores ya borrados
+    if db.get(Container, container_id) is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return stats.summarize("container", container_id, [container_id], since, until, tier)
+
+
 @router.post(
     "/{container_id}/start",
     response_model=ContainerRead,
     summary="Start",
+    responses={409: {"description": "Operación contradictoria en curso sobre el contenedor"}},
 )
 def start_container(container_id: int, db: Session = Depends(get_db)):
     row = (
@@ -184,11 +315,19 @@ def start_container(container_id: int, db: Session = Depends(get_db)):
     )
     if not row:
         raise HTTPException(status_code=404, detail="Not found")
-    dk.start(row.docker_id)
-    row.status = "running"
-    row.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(row)
+
+    def _start():
+        with _ports_claimed(row):
+            with admission.acquire("start", project_id=row.project_id):
+                dk.start(row.docker_id)
+        previous = row.status
+        row.status = "running"
+        row.updated_at = datetime.utcnow()
+        db.commit()
+        db.refresh(row)
+        events.record(row, "start", from_status=previous)
+
+    _run_operation(db, row, "start", _start)
     return row
 
 
@@ -196,6 +335,7 @@ def start_container(container_id: int, db: Session = Depends(get_db)):
     "/{container_id}/stop",
     response_model=ContainerRead,
     summary="Stop",
+    responses={409: {"description": "Operación contradictoria en curso sobre el contenedor"}},
 )
 def stop_container(container_id: int, db: Session = Depends(get_db)):
     row = (
@@ -205,11 +345,11 @@ def stop_container(container_id: int, db: Session = Depends(get_db)):
     )
     if not row:
         raise HTTPException(status_code=404, detail="Not found")
-    dk.stop(row.docker_id)
-    row.status = "exited"
-    row.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(row)
+
+    def _stop():
+        deploy.stop_container(db, row)
+
+    _run_operation(db, row, "stop", _stop)
     return row
 
 
@@ -217,6 +357,7 @@ def stop_container(container_id: int, db: Session = Depends(get_db)):
     "/{container_id}/restart",
     response_model=ContainerRead,
     summary="Restart",
+    responses={409: {"description": "Operación contradictoria en curso sobre el contenedor"}},
 )
 def restart_container(container_id: int, db: Session = Depends(get_db)):
     row = (
@@ -226,11 +367,19 @@ def restart_container(container_id: int, db: Session = Depends(get_db)):
     )
     if not row:
         raise HTTPException(status_code=404, detail="Not found")
-    dk.restart(row.docker_id)
-    row.status = "running"
-    row.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(row)
+
+    def _restart():
+        with _ports_claimed(row):
+            with admission.acquire("start", project_id=row.project_id):
+                dk.restart(row.docker_id)
+        previous = row.status
+        row.status = "running"
+        row.updated_at = datetime.utcnow()
+        db.commit()
+        db.refresh(row)
+        events.record(row, "restart", from_status=previous)
+
+    _run_operation(db, row, "restart", _restart)
     return row
 
 
@@ -254,7 +403,16 @@ def delete_container(container_id: int, db: Session = Depends(get_db)):
             detail="Container must be stopped before delete",
         )
 
-    dk.remove(row.docker_id)
-    row.deleted_at = datetime.utcnow()
-    db.commit()
+    def _remove():
+        # _run_operation recargó la fila: un start concurrente pudo terminar antes
+        if row.deleted_at is not None:
+            raise HTTPException(status_code=404, detail="Not found")
+        if row.status == "running":
+            raise HTTPException(
+                status_code=409,
+                detail="Container must be stopped before delete",
+            )
+        deploy.remove_container(db, row)
+
+    _run_operation(db, row, "remove", _remove)
     return None
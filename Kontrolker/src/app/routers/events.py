@@ -0,0 +1,95 @@
+# src/app/routers/events.py
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.profiling import ProfiledRoute
+from app.core.serialization import Fields, list_response, sparse_fields
+from app.db.deps import get_db
+from app.models.events import ContainerEvent
+from app.schemas import ContainerEventCounts, ContainerEventRead
+
+router = APIRouter(
+    route_class=ProfiledRoute,
+    prefix="/events",
+    tags=["Events"],
+)
+
+
+def _filtered(
+    db: Session,
+    container_id: Optional[int],
+    service_id: Optional[int],
+    project_id: Optional[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+):
+    q = db.query(ContainerEvent)
+    if container_id is not None:
+        q = q.filter(ContainerEvent.container_id == container_id)
+    if service_id is not None:
+        q = q.filter(ContainerEvent.service_id == service_id)
+    if project_id is not None:
+        q = q.filter(ContainerEvent.project_id == project_id)
+    if since is not None:
+        q = q.filter(ContainerEvent.created_at >= since)
+    if until is not None:
+        q = q.filter(ContainerEvent.created_at < until)
+    return q
+
+
+@router.get(
+    "",
+    response_model=List[ContainerEventRead],
+    summary="Historial de eventos de contenedores",
+    description=(
+        "Eventos más recientes primero. Filtra por contenedor, service o project y por rango "
+        "de tiempo `[since, until)` (UTC). Para paginar, usa el `created_at` del último "
+        "evento recibido como `until` de la siguiente página."
+    ),
+)
+def list_events(
+    request: Request,
+    container_id: Optional[int] = Query(default=None),
+    service_id: Optional[int] = Query(default=None),
+    project_id: Optional[int] = Query(default=None),
+    action: Optional[str] = Query(default=None, examples=["restart"]),
+    source: Optional[str] = Query(default=None, description="api | docker"),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=1000),
+    fields: Fields = Depends(sparse_fields(ContainerEventRead)),
+    db: Session = Depends(get_db),
+):
+    q = _filtered(db, container_id, service_id, project_id, since, until)
+    if action is not None:
+        q = q.filter(ContainerEvent.action == action)
+    if source is not None:
+        q = q.filter(ContainerEvent.source == source)
+    q = q.order_by(ContainerEvent.created_at.desc(), ContainerEvent.id.desc()).limit(limit)
+    return list_response(request, q, ContainerEvent, ContainerEventRead, fields)
+
+
+@router.get(
+    "/counts",
+    response_model=ContainerEventCounts,
+    summary="Conteo de eventos por acción",
+    description="P.ej. cuántas veces se reinició un service la última semana.",
+)
+def count_events(
+    container_id: Optional[int] = Query(default=None),
+    service_id: Optional[int] = Query(default=None),
+    project_id: Optional[int] = Query(default=None),
+    source: Optional[str] = Query(default=None, description="api | docker"),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    q = _filtered(db, container_id, service_id, project_id, since, until)
+    if source is not None:
+        q = q.filter(ContainerEvent.source == source)
+    rows = q.with_entities(ContainerEvent.action, func.count()).group_by(ContainerEvent.action).all()
+    return ContainerEventCounts(since=since, until=until, counts={action: n for action, n in rows})
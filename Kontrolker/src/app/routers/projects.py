@@ -2,14 +2,43 @@
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Body
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 
+from app.core.profiling import ProfiledRoute
+from app.core.config import settings
+from app.core.serialization import Fields, item_response, list_response, sparse_fields
 from app.db.deps import get_db
+from app.engines import docker as dk
+from app.models.containers import Container
 from app.models.project import Project
-from app.schemas import ProjectCreate, ProjectRead, ProjectUpdate
+from app.models.service import Service
+from app.schemas import (
+    ApplyResult,
+    BulkCreate,
+    BulkItemError,
+    ProjectBulkResult,
+    ProjectCreate,
+    ProjectQuotaRead,
+    ProjectQuotaUpdate,
+    ProjectRead,
+    ProjectTopology,
+    ProjectUpdate,
+    RedeployResult,
+    StatsSummary,
+)
+from app.schemas.topology import ContainerLiveState
+from app.models.quotas import ProjectQuota
+from app.services import apply, quotas, redeploy, stats
+from app.services import ports as host_ports
+from app.services.apply import SpecError
+from app.services.labels import KIND_PROJECT, apply_selector, index_new_labels, sync_labels
 
 router = APIRouter(
+    route_class=ProfiledRoute,
     prefix="/projects",
     tags=["Projects"],
 )
@@ -84,14 +113,8 @@ def create_project(
     ),
     db: Session = Depends(get_db),
 ):
-    existing = (
-        db.query(Project)
-        .filter(
-            Project.name == payload.name,
-            Project.deleted_at.is_(None),
-        )
-        .first()
-    )
+    # el nombre es único también contra los soft-deleted (hasta que el GC los purga)
+    existing = db.query(Project.id).filter(Project.name == payload.name).first()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -108,16 +131,123 @@ def create_project(
         deleted_at=None,
     )
     db.add(proj)
+    db.flush()
+    index_new_labels(db, KIND_PROJECT, {proj.id: proj.labels})
     db.commit()
     db.refresh(proj)
     return proj
 
 
+@router.post(
+    "/bulk",
+    response_model=ProjectBulkResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Crear varios Projects en una sola transacción",
+    description=(
+        "Valida todo el lote, detecta conflictos de nombre con una sola consulta e inserta "
+        "los ítems válidos con un único INSERT. Los ítems inválidos se devuelven en `errors` "
+        "con su índice. Con `atomic=true` cualquier error cancela el lote completo (422); "
+        "si ningún ítem es válido también se responde 422."
+    ),
+    responses={
+        409: {"description": "Conflicto de nombre concurrente; no se creó nada"},
+        422: {"description": "Lote inválido o sin ningún ítem creable (errores por ítem en detail)"},
+    },
+)
+def create_projects_bulk(
+    payload: BulkCreate,
+    atomic: bool = Query(default=False, description="Todo o nada"),
+    db: Session = Depends(get_db),
+):
+    errors: List[BulkItemError] = []
+    valid: List[tuple[int, ProjectCreate]] = []
+    seen: set[str] = set()
+
+    for index, item in enumerate(payload.items):
+        try:
+            data = ProjectCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append(BulkItemError(
+                index=index,
+                name=item.get("name") if isinstance(item.get("name"), str) else None,
+                detail=e.errors(include_url=False, include_context=False),
+            ))
+            continue
+        if data.name in seen:
+            errors.append(BulkItemError(index=index, name=data.name, detail="Duplicated name in batch"))
+            continue
+        seen.add(data.name)
+        valid.append((index, data))
+
+    # conflictos contra la DB en una sola consulta; el índice único de name incluye
+    # a los soft-deleted, así que también cuentan (si no, el INSERT falla entero)
+    taken = {
+        name: deleted_at is not None
+        for name, deleted_at in db.query(Project.name, Project.deleted_at).filter(Project.name.in_(seen))
+    } if seen else {}
+    if taken:
+        errors.extend(
+            BulkItemError(
+                index=index,
+                name=data.name,
+                detail=(
+                    "Project name is still held by a deleted project"
+                    if taken[data.name] else "Project name must be unique"
+                ),
+            )
+            for index, data in valid
+            if data.name in taken
+        )
+        valid = [(index, data) for index, data in valid if data.name not in taken]
+
+    errors.sort(key=lambda err: err.index)
+    if (atomic and errors) or not valid:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[err.model_dump() for err in errors],
+        )
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "name": data.name,
+            "description": data.description,
+            "labels": data.labels,
+            "created_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+        }
+        for _index, data in valid
+    ]
+    try:
+        # se leen antes del commit para no re-consultar cada fila expirada;
+        # sin sort_by_parameter_order para que SQLite no degrade a un INSERT por fila
+        by_name = {
+            proj.name: ProjectRead.model_validate(proj)
+            for proj in db.scalars(insert(Project).returning(Project), rows)
+        }
+        index_new_labels(db, KIND_PROJECT, {p.id: p.labels for p in by_name.values()})
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Project name must be unique",
+        )
+    return ProjectBulkResult(
+        created=[by_name[data.name] for _index, data in valid],
+        errors=errors,
+    )
+
+
 @router.get(
     "",
     response_model=List[ProjectRead],
     summary="Listar Projects",
-    description="Lista todos los proyectos activos (no eliminados).",
+    description=(
+        "Lista todos los proyectos activos (no eliminados), filtrables por selector de labels. "
+        "Con `Accept: application/x-ndjson` responde en streaming, un proyecto por línea."
+    ),
     responses={
         200: {
             "description": "Listado de proyectos",
@@ -139,17 +269,29 @@ def create_project(
     },
 )
 def list_projects(
+    request: Request,
     name: Optional[str] = Query(
         default=None,
         description="Filtro opcional por nombre exacto",
         examples=["mi-backend"],
     ),
+    selector: Optional[str] = Query(
+        default=None,
+        description="Selector de labels: `env=prod,owner!=x,tier in (a,b),team,!legacy`",
+        examples=["env=prod,owner=plat-devops"],
+    ),
+    fields: Fields = Depends(sparse_fields(ProjectRead)),
     db: Session = Depends(get_db),
 ):
     q = db.query(Project).filter(Project.deleted_at.is_(None))
     if name is not None:
         q = q.filter(Project.name == name)
-    return q.all()
+    if selector:
+        try:
+            q = apply_selector(q, Project.id, KIND_PROJECT, selector)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return list_response(request, q, Project, ProjectRead, fields)
 
 
 @router.get(
@@ -161,11 +303,238 @@ def list_projects(
         404: {"description": "Project not found"},
     },
 )
-def get_project(project_id: int, db: Session = Depends(get_db)):
+def get_project(
+    project_id: int,
+    fields: Fields = Depends(sparse_fields(ProjectRead)),
+    db: Session = Depends(get_db),
+):
+    if fields:
+        q = db.query(Project).filter(Project.id == project_id, Project.deleted_at.is_(None))
+        response = item_response(q, Project, ProjectRead, fields)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return response
     project = _ensure_project_exists(db, project_id)
     return project
 
 
+@router.get(
+    "/{project_id}/topology",
+    response_model=ProjectTopology,
+    summary="Topología del Project (services + contenedores)",
+    description=(
+        "Devuelve el proyecto, sus services y los contenedores de cada uno en una sola "
+        "respuesta, cargados con un número fijo de consultas sin importar el tamaño. "
+        "Con `live=true` agrega el estado real de Docker usando una sola llamada filtrada."
+    ),
+    responses={
+        200: {"description": "Topología del proyecto"},
+        404: {"description": "Project not found"},
+    },
+)
+def get_project_topology(
+    project_id: int,
+    live: bool = Query(default=False, description="Incluir estado en vivo desde Docker"),
+    db: Session = Depends(get_db),
+):
+    project = (
+        db.query(Project)
+        .options(
+            selectinload(Project.services.and_(Service.deleted_at.is_(None)))
+            .selectinload(Service.containers.and_(Container.deleted_at.is_(None))),
+            selectinload(
+                Project.containers.and_(
+                    Container.deleted_at.is_(None),
+                    Container.service_id.is_(None),
+                )
+            ),
+        )
+        .filter(Project.id == project_id, Project.deleted_at.is_(None))
+        .first()
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    topology = ProjectTopology.model_validate(project)
+    if not live:
+        return topology
+
+    containers = topology.containers + [c for svc in topology.services for c in svc.containers]
+    if not containers:
+        topology.docker = True
+        return topology
+
+    try:
+        found = dk.list_containers(all_=True, filters={"id": [c.docker_id for c in containers]})
+    except Exception:
+        topology.docker = False
+        return topology
+
+    by_id = {info["Id"]: info for info in found}
+    for c in containers:
+        info = by_id.get(c.docker_id)
+        c.live = (
+            ContainerLiveState(state=info.get("State", "unknown"), status=info.get("Status"))
+            if info
+            else ContainerLiveState(state="missing")
+        )
+    topology.docker = True
+    return topology
+
+
+@router.post(
+    "/{project_id}/apply",
+    response_model=ApplyResult,
+    summary="Aplicar un stack declarativo (YAML)",
+    description=(
+        "Recibe un YAML con `services` (image, ports, env, resources, labels, replicas, "
+        "depends_on), lo compara con lo que ya existe y crea/actualiza por olas según "
+        "`depends_on`: cada ola corre en paralelo. Con `dry_run=true` solo devuelve el plan. "
+        "No borra services ni contenedores que no estén en el YAML. Un service con puertos "
+        "del host admite `replicas` 0 o 1: todas las réplicas publicarían el mismo puerto."
+    ),
+    responses={
+        404: {"description": "Project not found"},
+        409: {"description": "Puertos del host en conflicto (detail por service)"},
+        422: {"description": "YAML inválido, dependencia desconocida, ciclo o replicas > 1 con puertos del host"},
+    },
+)
+def apply_project(
+    project_id: int,
+    spec: str = Body(
+        ...,
+        media_type="application/yaml",
+        examples=[
+            "services:\n"
+            "  db:\n"
+            "    image: postgres:16\n"
+            "    ports: [{host: 5432, container: 5432}]\n"
+            "  api:\n"
+            "    image: ghcr.io/acme/api:1.4\n"
+            "    replicas: 2\n"
+            "    depends_on: [db]\n"
+            "  proxy:\n"
+            "    image: nginx:latest\n"
+            "    ports: [{host: 0, container: 80}]\n"
+            "    depends_on: [api]\n"
+        ],
+    ),
+    dry_run: bool = Query(default=False, description="Solo calcular el plan"),
+    db: Session = Depends(get_db),
+):
+    _ensure_project_exists(db, project_id)
+    try:
+        plan = apply.plan(db, project_id, apply.parse_spec(spec, project_id))
+    except SpecError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    if dry_run:
+        return plan.result(dry_run=True)
+    if plan.conflicts:
+        raise HTTPException(status_code=409, detail=plan.conflicts)
+    # cada service se aplica con su propia sesión: soltamos la lectura de esta
+    db.rollback()
+    return apply.execute(plan)
+
+
+@router.post(
+    "/{project_id}/redeploy",
+    response_model=RedeployResult,
+    summary="Reemplazar solo los contenedores desactualizados",
+    description=(
+        "Compara el `spec_hash` de cada contenedor con el de su service y reemplaza "
+        "(crear el nuevo, borrar el viejo; con puertos del host, detener el viejo primero) "
+        "solo los que difieren y están corriendo. "
+        "Los detenidos desactualizados se informan pero no se tocan. Con `dry_run=true` "
+        "solo devuelve qué se reemplazaría."
+    ),
+    responses={404: {"description": "Project not found"}},
+)
+def redeploy_project(
+    project_id: int,
+    service_id: Optional[List[int]] = Query(default=None, description="Limitar a estos services"),
+    dry_run: bool = Query(default=False, description="Solo calcular qué cambia"),
+    db: Session = Depends(get_db),
+):
+    _ensure_project_exists(db, project_id)
+    result = redeploy.plan(db, project_id, service_id)
+    if dry_run:
+        return result
+    # cada service se reemplaza con su propia sesión
+    db.rollback()
+    return redeploy.execute(result)
+
+
+@router.get(
+    "/{project_id}/stats",
+    response_model=StatsSummary,
+    summary="Historial de CPU y memoria del project",
+    description=(
+        "avg/p95/max de CPU (%) y memoria (MB) entre `since` y `until` (por defecto la "
+        "última hora). La resolución se elige sola según el rango, o con `tier`. "
+        "Requiere `STATS_ENABLED`."
+    ),
+    responses={404: {"description": "No encontrado o recolección de stats deshabilitada"}},
+)
+def project_stats(
+    project_id: int,
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    tier: Optional[str] = Query(default=None, pattern=stats.TIER_PATTERN),
+    db: Session = Depends(get_db),
+):
+    if not settings.STATS_ENABLED:
+        raise HTTPException(status_code=404, detail="Stats collection is disabled")
+    _ensure_project_exists(db, project_id)
+    ids = [cid for (cid,) in db.query(Container.id).filter(Container.project_id == project_id)]
+    return stats.summarize("project", project_id, ids, since, until, tier)
+
+
+@router.get(
+    "/{project_id}/quota",
+    response_model=ProjectQuotaRead,
+    summary="Cuota y uso del Project",
+    description=(
+        "Límites configurados y uso actual (contadores incrementales). Si el project no "
+        "tiene cuota, los límites salen en null y el uso se calcula sumando contenedores."
+    ),
+    responses={404: {"description": "Project not found"}},
+)
+def get_project_quota(project_id: int, db: Session = Depends(get_db)):
+    _ensure_project_exists(db, project_id)
+    quota = db.get(ProjectQuota, project_id)
+    if quota is not None:
+        return quota
+    return ProjectQuotaRead(project_id=project_id, **quotas.usage(db, project_id))
+
+
+@router.put(
+    "/{project_id}/quota",
+    response_model=ProjectQuotaRead,
+    summary="Definir la cuota del Project",
+    description=(
+        "Límites de CPU, memoria y cantidad de contenedores (null = sin tope). Se aplican "
+        "a nuevos contenedores; los que ya existen no se detienen si quedan por encima."
+    ),
+    responses={
+        404: {"description": "Project not found"},
+        422: {"description": "Error de validación"},
+    },
+)
+def set_project_quota(
+    project_id: int,
+    payload: ProjectQuotaUpdate,
+    db: Session = Depends(get_db),
+):
+    _ensure_project_exists(db, project_id)
+    return quotas.set_limits(
+        db,
+        project_id,
+        max_cpu=payload.max_cpu,
+        max_memory_mb=payload.max_memory_mb,
+        max_containers=payload.max_containers,
+    )
+
+
 @router.patch(
     "/{project_id}",
     response_model=ProjectRead,
@@ -185,19 +554,20 @@ def update_project(
     project = _ensure_project_exists(db, project_id)
 
     if payload.name is not None:
+        # como en create_project: el índice único de name incluye a los soft-deleted
         conflict = (
-            db.query(Project)
-            .filter(
-                Project.name == payload.name,
-                Project.id != project.id,
-                Project.deleted_at.is_(None),
-            )
+            db.query(Project.deleted_at)
+            .filter(Project.name == payload.name, Project.id != project.id)
             .first()
         )
         if conflict:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
-                detail="Project name must be unique",
+                detail=(
+                    "Project name is still held by a deleted project"
+                    if conflict.deleted_at is not None
+                    else "Project name must be unique"
+                ),
             )
         project.name = payload.name
 
@@ -206,6 +576,7 @@ def update_project(
 
     if payload.labels is not None:
         project.labels = payload.labels
+        sync_labels(db, KIND_PROJECT, project.id, payload.labels)
 
     project.updated_at = datetime.utcnow()
     db.commit()
@@ -217,7 +588,10 @@ def update_project(
     "/{project_id}",
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Eliminar Project (soft-delete)",
-    description="Marca el proyecto como eliminado mediante deleted_at.",
+    description=(
+        "Marca el proyecto y sus services como eliminados mediante deleted_at. "
+        "Sus contenedores los elimina el GC en segundo plano en la siguiente pasada."
+    ),
     responses={
         204: {"description": "Project eliminado (soft-delete)"},
         404: {"description": "Project not found"},
@@ -225,6 +599,16 @@ def update_project(
 )
 def delete_project(project_id: int, db: Session = Depends(get_db)):
     project = _ensure_project_exists(db, project_id)
-    project.deleted_at = datetime.utcnow()
+    now = datetime.utcnow()
+    project.deleted_at = now
+    service_ids = list(db.scalars(
+        update(Service)
+        .where(Service.project_id == project.id, Service.deleted_at.is_(None))
+        .values(deleted_at=now)
+        .returning(Service.id)
+        .execution_options(synchronize_session=False)
+    ))
     db.commit()
+    for service_id in service_ids:
+        host_ports.allocator().release(host_ports.service_owner(service_id))
     return None
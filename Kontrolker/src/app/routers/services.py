@@ -2,17 +2,38 @@
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, Body
+from pydantic import ValidationError
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
-from ..schemas import ServiceCreate, ServiceRead, ServiceUpdate
+from ..schemas import (
+    BulkCreate,
+    BulkItemError,
+    RolloutRequest,
+    RolloutStatus,
+    ServiceBulkResult,
+    ServiceCreate,
+    ServiceRead,
+    ServiceUpdate,
+    StatsSummary,
+)
+from ..core.profiling import ProfiledRoute
+from ..core.config import settings
+from ..core.serialization import Fields, item_response, list_response, sparse_fields
 from ..db.deps import get_db
+from ..models.containers import Container
 from ..models.service import Service
 from ..models.project import Project
+from ..services import ports as host_ports
+from ..services import rollout, specs, stats
+from ..services.ports import PortUnavailable
+from ..services.labels import KIND_SERVICE, apply_selector, index_new_labels, sync_labels
 # app/routers/services.py
 
 
 router = APIRouter(
+    route_class=ProfiledRoute,
     prefix="/services",
     tags=["Services"],
 )
@@ -75,7 +96,7 @@ def _ensure_service_exists(db: Session, service_id: int) -> Service:
             },
         },
         404: {"description": "Project not found"},
-        409: {"description": "Service name must be unique within project"},
+        409: {"description": "Nombre repetido en el project o puerto del host ocupado"},
         422: {"description": "Error de validación (puertos, imagen, recursos, env...)"},
     },
 )
@@ -148,21 +169,174 @@ def create_service(
         ports=[p.model_dump() for p in payload.ports],
         env=payload.env,
         resources=payload.resources.model_dump() if payload.resources else None,
+        labels=payload.labels,
         created_at=now,
         updated_at=now,
         deleted_at=None,
     )
     db.add(svc)
-    db.commit()
+    db.flush()
+    owner = host_ports.service_owner(svc.id)
+    svc.ports = host_ports.claim_mappings(owner, svc.ports)
+    specs.stamp(svc)
+    try:
+        index_new_labels(db, KIND_SERVICE, {svc.id: svc.labels})
+        db.commit()
+    except Exception:
+        host_ports.allocator().release(owner)
+        raise
     db.refresh(svc)
     return svc
 
 
+@router.post(
+    "/bulk",
+    response_model=ServiceBulkResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Crear varios Services en una sola transacción",
+    description=(
+        "Valida todo el lote, comprueba projects y conflictos de nombre con una consulta "
+        "cada uno e inserta los ítems válidos con un único INSERT. Los ítems inválidos se "
+        "devuelven en `errors` con su índice. Con `atomic=true` cualquier error cancela el lote (422); "
+        "si ningún ítem es válido también se responde 422."
+    ),
+    responses={
+        422: {"description": "Lote inválido o sin ningún ítem creable (errores por ítem en detail)"},
+    },
+)
+def create_services_bulk(
+    payload: BulkCreate,
+    atomic: bool = Query(default=False, description="Todo o nada"),
+    db: Session = Depends(get_db),
+):
+    errors: List[BulkItemError] = []
+    valid: List[tuple[int, ServiceCreate]] = []
+    seen: set[tuple[int, str]] = set()
+
+    for index, item in enumerate(payload.items):
+        try:
+            data = ServiceCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append(BulkItemError(
+                index=index,
+                name=item.get("name") if isinstance(item.get("name"), str) else None,
+                detail=e.errors(include_url=False, include_context=False),
+            ))
+            continue
+        key = (data.project_id, data.name)
+        if key in seen:
+            errors.append(BulkItemError(index=index, name=data.name, detail="Duplicated name in batch"))
+            continue
+        seen.add(key)
+        valid.append((index, data))
+
+    project_ids = {data.project_id for _index, data in valid}
+    names = {data.name for _index, data in valid}
+    existing_projects: set[int] = set()
+    taken: set[tuple[int, str]] = set()
+    if valid:
+        existing_projects = {
+            pid
+            for (pid,) in db.query(Project.id).filter(
+                Project.id.in_(project_ids),
+                Project.deleted_at.is_(None),
+            )
+        }
+        # superconjunto (project_id IN ... AND name IN ...) y se filtra por pares
+        taken = {
+            (pid, name)
+            for pid, name in db.query(Service.project_id, Service.name).filter(
+                Service.project_id.in_(project_ids),
+                Service.name.in_(names),
+                Service.deleted_at.is_(None),
+            )
+        }
+
+    remaining: List[tuple[int, ServiceCreate]] = []
+    # puertos reservados con dueño provisorio hasta tener los ids
+    claims: dict[int, tuple[str, list]] = {}
+    for index, data in valid:
+        if data.project_id not in existing_projects:
+            errors.append(BulkItemError(index=index, name=data.name, detail="Project not found"))
+        elif (data.project_id, data.name) in taken:
+            errors.append(BulkItemError(
+                index=index, name=data.name, detail="Service name must be unique within project",
+            ))
+        else:
+            owner = host_ports.pending_owner()
+            try:
+                mappings = host_ports.claim_mappings(owner, [p.model_dump() for p in data.ports])
+            except PortUnavailable as e:
+                errors.append(BulkItemError(index=index, name=data.name, detail=str(e)))
+                continue
+            claims[index] = (owner, mappings)
+            remaining.append((index, data))
+
+    def release_claims():
+        for owner, _mappings in claims.values():
+            host_ports.allocator().release(owner)
+
+    errors.sort(key=lambda err: err.index)
+    if (atomic and errors) or not remaining:
+        release_claims()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[err.model_dump() for err in errors],
+        )
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "project_id": data.project_id,
+            "name": data.name,
+            "image": data.image,
+            "ports": claims[index][1],
+            "env": data.env,
+            "resources": data.resources.model_dump() if data.resources else None,
+            "labels": data.labels,
+            "spec_hash": specs.spec_hash(
+                image=data.image,
+                ports=claims[index][1],
+                env=data.env,
+                resources=data.resources.model_dump() if data.resources else None,
+            ),
+            "created_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+        }
+        for index, data in remaining
+    ]
+    try:
+        # se leen antes del commit para no re-consultar cada fila expirada;
+        # sin sort_by_parameter_order para que SQLite no degrade a un INSERT por fila
+        by_key = {
+            (svc.project_id, svc.name): ServiceRead.model_validate(svc)
+            for svc in db.scalars(insert(Service).returning(Service), rows)
+        }
+        index_new_labels(db, KIND_SERVICE, {svc.id: svc.labels for svc in by_key.values()})
+        db.commit()
+    except Exception:
+        release_claims()
+        raise
+    for index, data in remaining:
+        host_ports.allocator().rename(
+            claims[index][0],
+            host_ports.service_owner(by_key[(data.project_id, data.name)].id),
+        )
+    return ServiceBulkResult(
+        created=[by_key[(data.project_id, data.name)] for _index, data in remaining],
+        errors=errors,
+    )
+
+
 @router.get(
     "",
     response_model=List[ServiceRead],
     summary="Listar Services",
-    description="Lista services, opcionalmente filtrando por project_id.",
+    description=(
+        "Lista services, opcionalmente filtrando por project_id y selector de labels. "
+        "Con `Accept: application/x-ndjson` responde en streaming, un service por línea."
+    ),
     responses={
         200: {
             "description": "Listado de services",
@@ -195,17 +369,29 @@ def create_service(
     },
 )
 def list_services(
+    request: Request,
     project_id: Optional[int] = Query(
         default=None,
         description="Filtrar por project_id",
         examples=[1],
     ),
+    selector: Optional[str] = Query(
+        default=None,
+        description="Selector de labels: `tier=db,env!=dev,role in (a,b),team,!legacy`",
+        examples=["tier=db"],
+    ),
+    fields: Fields = Depends(sparse_fields(ServiceRead)),
     db: Session = Depends(get_db),
 ):
     q = db.query(Service).filter(Service.deleted_at.is_(None))
     if project_id is not None:
         q = q.filter(Service.project_id == project_id)
-    return q.all()
+    if selector:
+        try:
+            q = apply_selector(q, Service.id, KIND_SERVICE, selector)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return list_response(request, q, Service, ServiceRead, fields)
 
 
 @router.get(
@@ -217,7 +403,17 @@ def list_services(
         404: {"description": "Service not found"},
     },
 )
-def get_service(service_id: int, db: Session = Depends(get_db)):
+def get_service(
+    service_id: int,
+    fields: Fields = Depends(sparse_fields(ServiceRead)),
+    db: Session = Depends(get_db),
+):
+    if fields:
+        q = db.query(Service).filter(Service.id == service_id, Service.deleted_at.is_(None))
+        response = item_response(q, Service, ServiceRead, fields)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Service not found")
+        return response
     svc = _ensure_service_exists(db, service_id)
     return svc
 
@@ -229,7 +425,7 @@ def get_service(service_id: int, db: Session = Depends(get_db)):
     responses={
         200: {"description": "Service actualizado"},
         404: {"description": "Service not found"},
-        409: {"description": "Service name must be unique within project"},
+        409: {"description": "Nombre repetido en el project o puerto del host ocupado"},
         422: {"description": "Error de validación"},
     },
 )
@@ -261,8 +457,12 @@ def update_service(
     if payload.image is not None:
         svc.image = payload.image
 
+    owner = host_ports.service_owner(svc.id)
+    previous_ports = list(svc.ports or [])
     if payload.ports is not None:
-        svc.ports = [p.model_dump() for p in payload.ports]
+        svc.ports = host_ports.claim_mappings(
+            owner, [p.model_dump() for p in payload.ports], replace=True,
+        )
 
     if payload.env is not None:
         svc.env = payload.env
@@ -270,12 +470,110 @@ def update_service(
     if payload.resources is not None:
         svc.resources = payload.resources.model_dump()
 
+    if payload.labels is not None:
+        svc.labels = payload.labels
+        sync_labels(db, KIND_SERVICE, svc.id, payload.labels)
+
+    specs.stamp(svc)
     svc.updated_at = datetime.utcnow()
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        if payload.ports is not None:
+            host_ports.allocator().replace(owner, host_ports.service_hosts(previous_ports))
+        raise
+    specs.cache.invalidate(svc.id)
     db.refresh(svc)
     return svc
 
 
+@router.get(
+    "/{service_id}/stats",
+    response_model=StatsSummary,
+    summary="Historial de CPU y memoria del service (todas sus réplicas)",
+    description=(
+        "avg/p95/max de CPU (%) y memoria (MB) entre `since` y `until` (por defecto la "
+        "última hora). La resolución se elige sola según el rango, o con `tier`. "
+        "Requiere `STATS_ENABLED`."
+    ),
+    responses={404: {"description": "No encontrado o recolección de stats deshabilitada"}},
+)
+def service_stats(
+    service_id: int,
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    tier: Optional[str] = Query(default=None, pattern=stats.TIER_PATTERN),
+    db: Session = Depends(get_db),
+):
+    if not settings.STATS_ENABLED:
+        raise HTTPException(status_code=404, detail="Stats collection is disabled")
+    _ensure_service_exists(db, service_id)
+    ids = [cid for (cid,) in db.query(Container.id).filter(Container.service_id == service_id)]
+    return stats.summarize("service", service_id, ids, since, until, tier)
+
+
+@router.post(
+    "/{service_id}/rollout",
+    response_model=RolloutStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Rolling update de los contenedores del Service",
+    description=(
+        "Reemplaza por lotes los contenedores corriendo que no coinciden con la spec actual "
+        "(p.ej. después de cambiar la imagen con PATCH). Cada lote crea hasta `max_surge` "
+        "contenedores de más y detiene hasta `max_unavailable` antes de tener reemplazo; "
+        "sigue cuando los nuevos están running/healthy. Al llegar a `failure_threshold` "
+        "fallas, con `rollback=true` borra los nuevos y vuelve a arrancar los viejos. "
+        "Si el service publica puertos del host no hay surge: cada lote detiene primero "
+        "(`max_unavailable` 1 si no se indica). "
+        "Corre en segundo plano: responde 202 con el estado y su URL en `Location`. "
+        "Un rollout por service a la vez: un pedido con los mismos parámetros recibe el "
+        "que ya corre; con otros parámetros, 409."
+    ),
+    responses={
+        404: {"description": "Service not found"},
+        409: {"description": "Ya corre un rollout del service con otros parámetros"},
+        422: {"description": "max_surge y max_unavailable en 0, o max_unavailable=0 con puertos del host"},
+    },
+)
+def rollout_service(
+    service_id: int,
+    request: Request,
+    response: Response,
+    payload: RolloutRequest = Body(default_factory=RolloutRequest),
+    db: Session = Depends(get_db),
+):
+    svc = _ensure_service_exists(db, service_id)
+    try:
+        # los límites imposibles se rechazan acá y no en el hilo del rollout
+        rollout.batch_limits(specs.cache.get(svc), payload)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        job, _started = rollout.tracker.start(svc.id, payload)
+    except rollout.RolloutConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    response.headers["Location"] = str(request.url_for("get_rollout", service_id=svc.id, rollout_id=job.id))
+    return job
+
+
+@router.get(
+    "/{service_id}/rollouts/{rollout_id}",
+    response_model=RolloutStatus,
+    summary="Estado de un rollout",
+    description=(
+        "`state` pasa de `running` a `finished` (el detalle queda en `result`) o a `failed` "
+        "si el rollout no pudo ejecutarse. Se guardan los últimos `ROLLOUT_HISTORY` "
+        "rollouts terminados, en la réplica que los ejecutó."
+    ),
+    responses={404: {"description": "Rollout not found"}},
+)
+def get_rollout(service_id: int, rollout_id: str):
+    job = rollout.tracker.get(rollout_id)
+    if job is None or job.service_id != service_id:
+        raise HTTPException(status_code=404, detail="Rollout not found")
+    return job
+
+
 @router.delete(
     "/{service_id}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -289,4 +587,6 @@ def delete_service(service_id: int, db: Session = Depends(get_db)):
     svc = _ensure_service_exists(db, service_id)
     svc.deleted_at = datetime.utcnow()
     db.commit()
+    host_ports.allocator().release(host_ports.service_owner(svc.id))
+    specs.cache.invalidate(svc.id)
     return None
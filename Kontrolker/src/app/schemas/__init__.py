@@ -1,6 +1,14 @@
 # src/app/schemas/__init__.py
 
-from .project import ProjectCreate, ProjectRead, ProjectUpdate
+from .bulk import BulkCreate, BulkItemError
+from .project import (
+    ProjectBulkResult,
+    ProjectCreate,
+    ProjectQuotaRead,
+    ProjectQuotaUpdate,
+    ProjectRead,
+    ProjectUpdate,
+)
 from .services import (
     PortMapping,
     ResourceSpec,
@@ -8,24 +16,63 @@ from .services import (
     ServiceCreate,
     ServiceUpdate,
     ServiceRead,
+    ServiceBulkResult,
 )
 from .containers import (
     ContainerCreateFromService,
     ContainerCreateInline,
     ContainerRead,
 )
+from .events import ContainerEventCounts, ContainerEventRead
+from .logs import ContainerLogs, LogLine
+from .apply import ApplyResult, ApplyServiceSpec, ApplyStep
+from .redeploy import RedeployReplacement, RedeployResult, RedeployService
+from .rollout import RolloutBatch, RolloutRequest, RolloutResult, RolloutStatus
+from .stats import StatsAggregate, StatsSummary
+from .topology import (
+    ContainerLiveState,
+    ContainerTopology,
+    ServiceTopology,
+    ProjectTopology,
+)
 
 __all__ = [
+    "BulkCreate",
+    "BulkItemError",
     "ProjectCreate",
     "ProjectRead",
     "ProjectUpdate",
+    "ProjectBulkResult",
+    "ProjectQuotaRead",
+    "ProjectQuotaUpdate",
     "PortMapping",
     "ResourceSpec",
     "ServiceBase",
     "ServiceCreate",
     "ServiceUpdate",
     "ServiceRead",
+    "ServiceBulkResult",
     "ContainerCreateFromService",
     "ContainerCreateInline",
     "ContainerRead",
+    "ContainerLiveState",
+    "ContainerTopology",
+    "ServiceTopology",
+    "ProjectTopology",
+    "ContainerEventRead",
+    "ContainerEventCounts",
+    "ContainerLogs",
+    "LogLine",
+    "ApplyServiceSpec",
+    "ApplyStep",
+    "ApplyResult",
+    "RedeployReplacement",
+    "RedeployService",
+    "RedeployResult",
+    "RolloutRequest",
+    "RolloutBatch",
+    "RolloutResult",
+    "RolloutStatus",
+    "StatsAggregate",
+    "StatsSummary",
 ]
@@ -0,0 +1,39 @@
+# app/schemas/apply.py
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, validator
+
+from .services import ServiceBase
+
+
+class ApplyServiceSpec(ServiceBase):
+    """Un service dentro del YAML de apply (nombre y project salen del contexto)."""
+    replicas: int = Field(default=1, ge=0, le=50, description="Contenedores que deben existir")
+    depends_on: List[str] = Field(default_factory=list, description="Services que van en una ola anterior")
+
+    @validator("replicas")
+    def single_replica_with_host_ports(cls, v: int, values: dict) -> int:
+        # todas las réplicas publicarían el mismo puerto del host
+        if v > 1 and values.get("ports"):
+            raise ValueError("replicas > 1 is not allowed for a service that publishes host ports")
+        return v
+
+
+class ApplyStep(BaseModel):
+    service: str
+    wave: int
+    action: str = Field(..., description="create | update | unchanged")
+    changes: List[str] = Field(default_factory=list, description="Campos que cambian")
+    containers_to_create: int = 0
+    status: str = Field(default="planned", description="planned | applied | failed | skipped")
+    service_id: Optional[int] = None
+    container_ids: List[int] = Field(default_factory=list)
+    error: Optional[str] = None
+
+
+class ApplyResult(BaseModel):
+    project_id: int
+    dry_run: bool
+    waves: List[List[str]]
+    steps: List[ApplyStep]
+    duration_ms: Optional[float] = None
@@ -0,0 +1,20 @@
+# app/schemas/bulk.py
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+BULK_MAX_ITEMS = 500
+
+
+class BulkCreate(BaseModel):
+    """
+    Lote de ítems a crear. Los ítems se validan uno por uno en el endpoint
+    para poder reportar errores por índice en lugar de rechazar todo el lote.
+    """
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkItemError(BaseModel):
+    index: int = Field(..., description="Posición del ítem dentro de items")
+    name: Optional[str] = None
+    detail: Any
@@ -1,6 +1,8 @@
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
+
+from .labels import coerce_labels
 
 class ContainerCreateFromService(BaseModel):
     service_id: int
@@ -10,11 +12,26 @@ class ContainerCreateInline(BaseModel):
     service_id: Optional[int] = None
     name: Optional[str] = None
     image: str
-    ports: Dict[str, int] = Field(default_factory=dict)
+    ports: Dict[str, int] = Field(default_factory=dict, description='{"80/tcp": 8080}; host 0 = puerto libre automático')
     env: Dict[str, str] = Field(default_factory=dict)
     cpu: Optional[float] = None
     memory_mb: Optional[int] = None
     mounts: List[Tuple[str, str]] = Field(default_factory=list)
+    labels: Dict[str, str] = Field(default_factory=dict)
+
+    @validator("labels", pre=True)
+    def labels_keys_values_are_strings(cls, v):
+        return coerce_labels(v)
+
+    @validator("ports")
+    def host_ports_unique(cls, v: Dict[str, int]) -> Dict[str, int]:
+        for host in v.values():
+            if not 0 <= host <= 65535:
+                raise ValueError(f"Host port {host} out of range (0-65535)")
+        hosts = [host for host in v.values() if host]  # los 0 (auto) pueden repetirse
+        if len(hosts) != len(set(hosts)):
+            raise ValueError("Host port duplicated within container")
+        return v
 
 class ContainerRead(BaseModel):
     id: int
@@ -24,6 +41,9 @@ class ContainerRead(BaseModel):
     status: str
     project_id: Optional[int]
     service_id: Optional[int]
+    labels: Dict[str, str] = Field(default_factory=dict)
+    ports: Optional[Dict[str, int]] = None
+    spec_hash: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     cli_hint: Optional[str] = None  # 👈 para DX (no se persiste)
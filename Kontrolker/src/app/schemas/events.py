@@ -0,0 +1,27 @@
+# app/schemas/events.py
+from datetime import datetime
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+
+class ContainerEventRead(BaseModel):
+    id: int
+    container_id: Optional[int]
+    docker_id: Optional[str]
+    service_id: Optional[int]
+    project_id: Optional[int]
+    action: str
+    from_status: Optional[str]
+    to_status: Optional[str]
+    source: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ContainerEventCounts(BaseModel):
+    since: Optional[datetime]
+    until: Optional[datetime]
+    counts: Dict[str, int]
@@ -0,0 +1,40 @@
+# app/schemas/labels.py
+import re
+from typing import Any, Dict, Optional
+
+from app.models.labels import ResourceLabel
+from app.services.labels import _KEY, _VALUE
+
+# mismos límites que las columnas de ``resource_labels`` y la misma gramática
+# que los selectores: una label que se guarda siempre se puede seleccionar
+KEY_MAX_LEN = ResourceLabel.__table__.c.key.type.length
+VALUE_MAX_LEN = ResourceLabel.__table__.c.value.type.length
+_KEY_RE = re.compile(rf"^{_KEY}$")
+_VALUE_RE = re.compile(rf"^{_VALUE}$")
+
+
+def coerce_labels(v: Any) -> Optional[Dict[str, str]]:
+    """
+    Validador ``pre`` compartido del campo ``labels``: llaves string y valores
+    escalares convertidos a string (por si mandan ints/bools en JSON), con el
+    largo y los caracteres que acepta la gramática de selectores.
+    Lo que no es un dict sigue de largo y lo rechaza el tipo del campo.
+    """
+    if not isinstance(v, dict):
+        return v
+    coerced: Dict[str, str] = {}
+    for k, val in v.items():
+        if not isinstance(k, str):
+            raise ValueError("label keys must be strings")
+        if isinstance(val, (dict, list)) or val is None:
+            raise ValueError(f"label '{k}' must be a scalar value")
+        val = str(val).lower() if isinstance(val, bool) else str(val)
+        if len(k) > KEY_MAX_LEN or not _KEY_RE.match(k):
+            raise ValueError(
+                f"label key '{k}' must be 1-{KEY_MAX_LEN} characters of [A-Za-z0-9._/-], "
+                "starting and ending with a letter or digit"
+            )
+        if len(val) > VALUE_MAX_LEN or not _VALUE_RE.match(val):
+            raise ValueError(f"label '{k}' value must be at most {VALUE_MAX_LEN} characters of [A-Za-z0-9._/-]")
+        coerced[k] = val
+    return coerced
@@ -0,0 +1,16 @@
+# app/schemas/logs.py
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class LogLine(BaseModel):
+    ts: datetime
+    line: str
+
+
+class ContainerLogs(BaseModel):
+    container_id: int
+    lines: List[LogLine] = Field(default_factory=list)
+    truncated: bool = Field(default=False, description="Se cortó por `limit`: pedir de nuevo con `since`")
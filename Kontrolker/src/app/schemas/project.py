@@ -1,9 +1,12 @@
 # app/schemas/project.py
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, validator
 
+from .bulk import BulkItemError
+from .labels import coerce_labels
+
 
 class ProjectBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100, description="Nombre del proyecto")
@@ -23,18 +26,9 @@ class ProjectBase(BaseModel):
             raise ValueError("name is required")
         return v.strip()
 
-    @validator("labels")
-    def labels_keys_values_are_strings(cls, v: Dict[str, str]) -> Dict[str, str]:
-        """
-        Forzamos que las llaves sean strings y los valores se conviertan a string.
-        Útil por si alguien manda ints/bools en JSON.
-        """
-        coerced: Dict[str, str] = {}
-        for k, val in v.items():
-            if not isinstance(k, str):
-                raise ValueError("label keys must be strings")
-            coerced[k] = str(val)
-        return coerced
+    @validator("labels", pre=True)
+    def labels_keys_values_are_strings(cls, v):
+        return coerce_labels(v)
 
 
 class ProjectCreate(ProjectBase):
@@ -54,16 +48,9 @@ class ProjectUpdate(BaseModel):
             raise ValueError("name cannot be blank")
         return v.strip() if v else v
 
-    @validator("labels")
-    def labels_keys_values_are_strings(cls, v: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
-        if v is None:
-            return v
-        coerced: Dict[str, str] = {}
-        for k, val in v.items():
-            if not isinstance(k, str):
-                raise ValueError("label keys must be strings")
-            coerced[k] = str(val)
-        return coerced
+    @validator("labels", pre=True)
+    def labels_keys_values_are_strings(cls, v):
+        return coerce_labels(v)
 
 
 class ProjectRead(BaseModel):
@@ -76,3 +63,26 @@ class ProjectRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ProjectBulkResult(BaseModel):
+    created: List[ProjectRead]
+    errors: List[BulkItemError]
+
+
+class ProjectQuotaUpdate(BaseModel):
+    """Límites de la cuota; null = sin tope para ese recurso."""
+    max_cpu: Optional[float] = Field(default=None, ge=0, description="CPU cores totales")
+    max_memory_mb: Optional[int] = Field(default=None, ge=0, description="Memoria total en MB")
+    max_containers: Optional[int] = Field(default=None, ge=0, description="Contenedores vivos")
+
+
+class ProjectQuotaRead(ProjectQuotaUpdate):
+    project_id: int
+    used_cpu: float
+    used_memory_mb: int
+    used_containers: int
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
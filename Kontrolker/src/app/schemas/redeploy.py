@@ -0,0 +1,32 @@
+# app/schemas/redeploy.py
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class RedeployReplacement(BaseModel):
+    old_container_id: int
+    new_container_id: Optional[int] = None
+
+
+class RedeployService(BaseModel):
+    service_id: int
+    service: str
+    spec_hash: str
+    unchanged: int = Field(default=0, description="Contenedores que ya coinciden con la spec")
+    stale: List[int] = Field(default_factory=list, description="Contenedores corriendo a reemplazar")
+    stale_stopped: List[int] = Field(
+        default_factory=list, description="Desactualizados pero detenidos: no se tocan",
+    )
+    replaced: List[RedeployReplacement] = Field(default_factory=list)
+    status: str = Field(default="planned", description="planned | unchanged | applied | skipped | failed")
+    error: Optional[str] = None
+
+
+class RedeployResult(BaseModel):
+    project_id: int
+    dry_run: bool
+    services: List[RedeployService]
+    replaced: int = 0
+    unchanged: int = 0
+    duration_ms: Optional[float] = None
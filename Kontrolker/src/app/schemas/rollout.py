@@ -0,0 +1,49 @@
+# app/schemas/rollout.py
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, validator
+
+
+class RolloutRequest(BaseModel):
+    max_surge: int = Field(default=1, ge=0, description="Contenedores nuevos por encima de los actuales")
+    max_unavailable: int = Field(default=0, ge=0, description="Contenedores viejos detenidos antes de tener reemplazo")
+    ready_timeout_sec: float = Field(
+        default=60, gt=0, le=900, description="Espera máxima para que un lote quede running/healthy",
+    )
+    failure_threshold: int = Field(default=1, ge=1, description="Reemplazos fallidos que cortan el rollout")
+    rollback: bool = Field(default=True, description="Al cortar, volver a los contenedores viejos")
+
+    @validator("max_unavailable")
+    def some_progress(cls, v: int, values: dict) -> int:
+        if v == 0 and values.get("max_surge") == 0:
+            raise ValueError("max_surge and max_unavailable cannot both be 0")
+        return v
+
+
+class RolloutBatch(BaseModel):
+    old: List[int] = Field(default_factory=list, description="Contenedores viejos del lote")
+    new: List[int] = Field(default_factory=list, description="Reemplazos que quedaron listos")
+    failed: List[str] = Field(default_factory=list, description="Errores de los reemplazos fallidos")
+
+
+class RolloutResult(BaseModel):
+    service_id: int
+    spec_hash: str
+    status: str = Field(..., description="unchanged | completed | rolled_back | aborted")
+    batches: List[RolloutBatch] = Field(default_factory=list)
+    replaced: int = 0
+    failures: int = 0
+    error: Optional[str] = None
+    duration_ms: Optional[float] = None
+
+
+class RolloutStatus(BaseModel):
+    id: str
+    service_id: int
+    state: str = Field(..., description="running | finished | failed")
+    request: RolloutRequest
+    result: Optional[RolloutResult] = Field(default=None, description="Al terminar")
+    error: Optional[str] = Field(default=None, description="Error inesperado (state=failed)")
+    started_at: datetime
+    finished_at: Optional[datetime] = None
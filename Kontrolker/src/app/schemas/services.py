@@ -4,13 +4,21 @@ from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, validator
 
+from .bulk import BulkItemError
+from .labels import coerce_labels
 
 
 class PortMapping(BaseModel):
-    host: int
+    host: int = Field(..., description="Puerto del host; 0 = asignar uno libre automáticamente")
     container: int
 
-    @validator("host", "container")
+    @validator("host")
+    def host_in_valid_range(cls, v: int) -> int:
+        if not 0 <= v <= 65535:
+            raise ValueError("host port must be between 0 (auto) and 65535")
+        return v
+
+    @validator("container")
     def port_in_valid_range(cls, v: int) -> int:
         if not 1 <= v <= 65535:
             raise ValueError("port must be between 1 and 65535")
@@ -46,6 +54,10 @@ class ServiceBase(BaseModel):
         default=None,
         description="Límites de recursos (CPU y memoria)",
     )
+    labels: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Etiquetas tipo clave:valor, filtrables con selectores",
+    )
 
     @validator("image")
     def image_not_blank(cls, v: str) -> str:
@@ -63,9 +75,13 @@ class ServiceBase(BaseModel):
             coerced[k] = str(val)
         return coerced
 
+    @validator("labels", pre=True)
+    def labels_keys_values_are_strings(cls, v):
+        return coerce_labels(v)
+
     @validator("ports")
     def host_ports_unique(cls, v: List[PortMapping]) -> List[PortMapping]:
-        hosts = [p.host for p in v]
+        hosts = [p.host for p in v if p.host]  # los 0 (auto) pueden repetirse
         if len(hosts) != len(set(hosts)):
             raise ValueError("Host port duplicated within service")
         return v
@@ -85,6 +101,7 @@ class ServiceUpdate(BaseModel):
     ports: Optional[List[PortMapping]] = None
     env: Optional[Dict[str, str]] = None
     resources: Optional[ResourceSpec] = None
+    labels: Optional[Dict[str, str]] = None
 
     @validator("image")
     def image_not_blank(cls, v: Optional[str]) -> Optional[str]:
@@ -103,11 +120,15 @@ class ServiceUpdate(BaseModel):
             coerced[k] = str(val)
         return coerced
 
+    @validator("labels", pre=True)
+    def labels_keys_values_are_strings(cls, v):
+        return coerce_labels(v)
+
     @validator("ports")
     def host_ports_unique(cls, v: Optional[List[PortMapping]]) -> Optional[List[PortMapping]]:
         if v is None:
             return v
-        hosts = [p.host for p in v]
+        hosts = [p.host for p in v if p.host]  # los 0 (auto) pueden repetirse
         if len(hosts) != len(set(hosts)):
             raise ValueError("Host port duplicated within service")
         return v
@@ -121,8 +142,15 @@ class ServiceRead(BaseModel):
     ports: List[PortMapping]
     env: Dict[str, str]
     resources: Optional[ResourceSpec]
+    labels: Dict[str, str] = Field(default_factory=dict)
+    spec_hash: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class ServiceBulkResult(BaseModel):
+    created: List[ServiceRead]
+    errors: List[BulkItemError]
@@ -0,0 +1,23 @@
+# app/schemas/stats.py
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class StatsAggregate(BaseModel):
+    avg: Optional[float] = None
+    p95: Optional[float] = None
+    max: Optional[float] = None
+
+
+class StatsSummary(BaseModel):
+    scope: str = Field(..., description="container | service | project")
+    id: int
+    since: datetime
+    until: datetime
+    tier: str = Field(..., description="Resolución usada: 10s | 1m | 10m")
+    containers: int = Field(..., description="Contenedores con muestras en el rango")
+    samples: int
+    cpu_percent: StatsAggregate
+    memory_mb: StatsAggregate
@@ -0,0 +1,33 @@
+# app/schemas/topology.py
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from .containers import ContainerRead
+from .project import ProjectRead
+from .services import ServiceRead
+
+
+class ContainerLiveState(BaseModel):
+    state: str = Field(..., description="Estado según Docker (running, exited...) o 'missing'")
+    status: Optional[str] = Field(default=None, description="Texto de estado de Docker (Up 5 minutes...)")
+
+
+class ContainerTopology(ContainerRead):
+    live: Optional[ContainerLiveState] = None
+
+
+class ServiceTopology(ServiceRead):
+    containers: List[ContainerTopology] = Field(default_factory=list)
+
+
+class ProjectTopology(ProjectRead):
+    services: List[ServiceTopology] = Field(default_factory=list)
+    containers: List[ContainerTopology] = Field(
+        default_factory=list,
+        description="Contenedores del proyecto que no pertenecen a ningún Service",
+    )
+    docker: Optional[bool] = Field(
+        default=None,
+        description="Resultado de la consulta a Docker cuando live=true (None si no se pidió)",
+    )
@@ -0,0 +1,350 @@
+# src/app/services/apply.py
+"""
+Apply declarativo de un project desde YAML::
+
+    services:
+      db:
+        image: postgres:16
+        ports: [{host: 5432, container: 5432}]
+        env: {POSTGRES_PASSWORD: secret}
+      api:
+        image: ghcr.io/acme/api:1.4
+        replicas: 2
+        depends_on: [db]
+      proxy:
+        image: nginx:latest
+        ports: [{host: 0, container: 80}]
+        depends_on: [api]
+
+Se compara contra los ``Service``/``Container`` vivos del project, se arma el
+DAG de ``depends_on`` y se ejecuta por olas (Kahn): todo lo de una ola corre en
+paralelo y la siguiente arranca cuando termina la anterior, así el tiempo total
+es el de la cadena de dependencias más larga y no la suma de todos los services.
+
+Solo crea y actualiza: los services que no aparecen en el YAML no se tocan, los
+contenedores que sobran respecto a ``replicas`` no se borran y los existentes
+no se recrean al cambiar la definición.
+
+Los puertos del host son del service (todos sus contenedores publican los
+mismos), así que un service con ``ports`` admite ``replicas`` 0 o 1; con más,
+el YAML se rechaza (422) en vez de fallar en Docker con la segunda réplica.
+"""
+import contextvars
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import yaml
+from pydantic import ValidationError
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.containers import Container
+from app.models.service import Service
+from app.schemas.apply import ApplyResult, ApplyServiceSpec, ApplyStep
+from app.services import deploy, specs
+from app.services import ports as host_ports
+from app.services.labels import KIND_SERVICE, index_new_labels, sync_labels
+
+log = logging.getLogger("services.apply")
+
+CREATE = "create"
+UPDATE = "update"
+UNCHANGED = "unchanged"
+
+
+class SpecError(ValueError):
+    """YAML inválido; ``errors`` va tal cual en el detail del 422."""
+
+    def __init__(self, errors: list):
+        self.errors = errors
+        super().__init__(str(errors))
+
+
+@dataclass
+class Plan:
+    project_id: int
+    waves: List[List[str]]
+    steps: Dict[str, ApplyStep]
+    specs: Dict[str, ApplyServiceSpec]
+    ports: Dict[str, List[dict]] = field(default_factory=dict)  # con los host 0 ya resueltos si existían
+
+    def result(self, *, dry_run: bool, duration_ms: Optional[float] = None) -> ApplyResult:
+        return ApplyResult(
+            project_id=self.project_id,
+            dry_run=dry_run,
+            waves=self.waves,
+            steps=[self.steps[name] for wave in self.waves for name in wave],
+            duration_ms=duration_ms,
+        )
+
+    @property
+    def conflicts(self) -> List[dict]:
+        return [
+            {"service": step.service, "detail": step.error}
+            for step in self.steps.values() if step.error
+        ]
+
+
+def parse_spec(text: str, project_id: int) -> Dict[str, ApplyServiceSpec]:
+    try:
+        doc = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise SpecError([{"service": None, "detail": f"Invalid YAML: {e}"}])
+    if not isinstance(doc, dict) or not isinstance(doc.get("services"), dict) or not doc["services"]:
+        raise SpecError([{"service": None, "detail": "Spec must contain a non-empty 'services' mapping"}])
+
+    specs: Dict[str, ApplyServiceSpec] = {}
+    errors: list = []
+    for name, entry in doc["services"].items():
+        if not isinstance(entry, dict):
+            errors.append({"service": str(name), "detail": "Service entry must be a mapping"})
+            continue
+        try:
+            specs[str(name)] = ApplyServiceSpec.model_validate(
+                {**entry, "project_id": project_id, "name": str(name)}
+            )
+        except ValidationError as e:
+            errors.append({
+                "service": str(name),
+                "detail": e.errors(include_url=False, include_context=False, include_input=False),
+            })
+    if errors:
+        raise SpecError(errors)
+    return specs
+
+
+def build_waves(specs: Dict[str, ApplyServiceSpec]) -> List[List[str]]:
+    """Orden topológico por niveles (Kahn). Cada ola depende solo de olas anteriores."""
+    errors = []
+    dependents: Dict[str, List[str]] = defaultdict(list)
+    pending: Dict[str, int] = {}
+    for name, spec in specs.items():
+        deps = set(spec.depends_on)
+        for dep in sorted(deps):
+            if dep == name:
+                errors.append({"service": name, "detail": "Service cannot depend on itself"})
+            elif dep not in specs:
+                errors.append({"service": name, "detail": f"Unknown dependency '{dep}'"})
+            else:
+                dependents[dep].append(name)
+        pending[name] = len(deps)
+    if errors:
+        raise SpecError(errors)
+
+    waves: List[List[str]] = []
+    ready = sorted(name for name, count in pending.items() if count == 0)
+    while ready:
+        waves.append(ready)
+        following = []
+        for name in ready:
+            for child in dependents[name]:
+                pending[child] -= 1
+                if pending[child] == 0:
+                    following.append(child)
+        ready = sorted(following)
+
+    placed = sum(len(wave) for wave in waves)
+    if placed < len(specs):
+        done = {name for wave in waves for name in wave}
+        cycle = sorted(set(specs) - done)
+        raise SpecError([{"service": None, "detail": f"Dependency cycle between: {', '.join(cycle)}"}])
+    return waves
+
+
+def _resolve_auto_ports(wanted: List[dict], current: List[dict]) -> List[dict]:
+    """Un ``host: 0`` conserva el puerto ya asignado al mismo puerto del contenedor."""
+    assigned = {p["container"]: p["host"] for p in current}
+    return [
+        {**p, "host": assigned.get(p["container"], 0)} if p["host"] == 0 else p
+        for p in wanted
+    ]
+
+
+def _changes(svc: Service, spec: ApplyServiceSpec, ports: List[dict]) -> List[str]:
+    changes = []
+    if svc.image != spec.image:
+        changes.append("image")
+    if (svc.ports or []) != ports:
+        changes.append("ports")
+    if (svc.env or {}) != spec.env:
+        changes.append("env")
+    resources = spec.resources.model_dump() if spec.resources else None
+    if (svc.resources or None) != resources:
+        changes.append("resources")
+    if (svc.labels or {}) != spec.labels:
+        changes.append("labels")
+    return changes
+
+
+def plan(db: Session, project_id: int, specs: Dict[str, ApplyServiceSpec]) -> Plan:
+    """Diff contra la DB + olas. No escribe nada."""
+    waves = build_waves(specs)
+    existing = {
+        svc.name: svc
+        for svc in db.query(Service).filter(
+            Service.project_id == project_id,
+            Service.name.in_(list(specs)),
+            Service.deleted_at.is_(None),
+        )
+    }
+    running = dict(
+        db.query(Container.service_id, func.count(Container.id))
+        .filter(
+            Container.service_id.in_([svc.id for svc in existing.values()]),
+            Container.deleted_at.is_(None),
+        )
+        .group_by(Container.service_id)
+    ) if existing else {}
+
+    result = Plan(project_id=project_id, waves=waves, steps={}, specs=specs)
+    alloc = host_ports.allocator()
+    seen_ports: Dict[int, str] = {}
+    for wave_index, wave in enumerate(waves):
+        for name in wave:
+            spec = specs[name]
+            svc = existing.get(name)
+            wanted = [p.model_dump() for p in spec.ports]
+            if svc is None:
+                step = ApplyStep(service=name, wave=wave_index, action=CREATE, containers_to_create=spec.replicas)
+                ports = wanted
+            else:
+                ports = _resolve_auto_ports(wanted, svc.ports or [])
+                changes = _changes(svc, spec, ports)
+                step = ApplyStep(
+                    service=name,
+                    wave=wave_index,
+                    action=UPDATE if changes else UNCHANGED,
+                    changes=changes,
+                    containers_to_create=max(spec.replicas - running.get(svc.id, 0), 0),
+                    service_id=svc.id,
+                )
+            result.ports[name] = ports
+
+            # choques de puertos contra otros services/contenedores y dentro del YAML
+            own = host_ports.service_owner(svc.id) if svc else None
+            for port in (p["host"] for p in ports if p["host"]):
+                holder = alloc.owner_of(port)
+                if port in seen_ports:
+                    step.error = f"Host port {port} also requested by service '{seen_ports[port]}'"
+                elif holder is not None and holder != own:
+                    step.error = f"Host port {port} already in use by {holder}"
+                seen_ports.setdefault(port, name)
+            result.steps[name] = step
+    return result
+
+
+def _create_service(db: Session, project_id: int, name: str, spec: ApplyServiceSpec, ports: List[dict]) -> Service:
+    now = datetime.utcnow()
+    svc = Service(
+        project_id=project_id,
+        name=name,
+        image=spec.image,
+        ports=[],
+        env=spec.env,
+        resources=spec.resources.model_dump() if spec.resources else None,
+        labels=spec.labels,
+        created_at=now,
+        updated_at=now,
+        deleted_at=None,
+    )
+    db.add(svc)
+    db.flush()
+    owner = host_ports.service_owner(svc.id)
+    svc.ports = host_ports.claim_mappings(owner, ports)
+    specs.stamp(svc)
+    try:
+        index_new_labels(db, KIND_SERVICE, {svc.id: svc.labels})
+        db.commit()
+    except Exception:
+        host_ports.allocator().release(owner)
+        raise
+    db.refresh(svc)
+    return svc
+
+
+def _update_service(db: Session, svc: Service, spec: ApplyServiceSpec, ports: List[dict], changes: List[str]) -> None:
+    owner = host_ports.service_owner(svc.id)
+    previous_ports = list(svc.ports or [])
+    if "image" in changes:
+        svc.image = spec.image
+    if "ports" in changes:
+        svc.ports = host_ports.claim_mappings(owner, ports, replace=True)
+    if "env" in changes:
+        svc.env = spec.env
+    if "resources" in changes:
+        svc.resources = spec.resources.model_dump() if spec.resources else None
+    if "labels" in changes:
+        svc.labels = spec.labels
+        sync_labels(db, KIND_SERVICE, svc.id, spec.labels)
+    specs.stamp(svc)
+    svc.updated_at = datetime.utcnow()
+    try:
+        db.commit()
+    except Exception:
+        if "ports" in changes:
+            host_ports.allocator().replace(owner, host_ports.service_hosts(previous_ports))
+        raise
+    specs.cache.invalidate(svc.id)
+    db.refresh(svc)
+
+
+def _run_step(plan_: Plan, name: str) -> None:
+    step, spec, ports = plan_.steps[name], plan_.specs[name], plan_.ports[name]
+    with SessionLocal() as db:
+        if step.action == CREATE:
+            svc = _create_service(db, plan_.project_id, name, spec, ports)
+            step.service_id = svc.id
+        else:
+            svc = db.get(Service, step.service_id)
+            if step.action == UPDATE:
+                _update_service(db, svc, spec, ports, step.changes)
+        for _ in range(step.containers_to_create):
+            step.container_ids.append(deploy.create_from_service(db, svc).id)
+
+
+def execute(plan_: Plan) -> ApplyResult:
+    """
+    Corre las olas en orden; dentro de cada una, los services en paralelo (cada
+    uno con su propia sesión). Si un service falla, sus dependientes se saltan
+    y el resto sigue.
+    """
+    started = time.perf_counter()
+    failed: Set[str] = set()
+    widest = max(len(wave) for wave in plan_.waves)
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(settings.APPLY_MAX_PARALLEL, widest)),
+        thread_name_prefix="apply",
+    ) as pool:
+        for wave in plan_.waves:
+            futures = {}
+            for name in wave:
+                step = plan_.steps[name]
+                blocked = sorted(dep for dep in plan_.specs[name].depends_on if dep in failed)
+                if blocked:
+                    step.status = "skipped"
+                    step.error = f"Dependency failed: {', '.join(blocked)}"
+                    failed.add(name)
+                elif step.action == UNCHANGED and not step.containers_to_create:
+                    step.status = "applied"
+                else:
+                    # copia del contexto para conservar el request_id en los logs
+                    ctx = contextvars.copy_context()
+                    futures[name] = pool.submit(ctx.run, _run_step, plan_, name)
+            for name, future in futures.items():
+                step = plan_.steps[name]
+                try:
+                    future.result()
+                    step.status = "applied"
+                except Exception as e:
+                    log.warning("Apply of service '%s' failed: %s", name, e)
+                    step.status = "failed"
+                    step.error = str(e) or type(e).__name__
+                    failed.add(name)
+    return plan_.result(dry_run=False, duration_ms=round((time.perf_counter() - started) * 1000, 1))
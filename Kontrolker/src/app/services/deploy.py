@@ -0,0 +1,133 @@
+# src/app/services/deploy.py
+"""
+Ciclo de vida de contenedores compartido entre el router de contenedores, el
+apply declarativo, el redeploy y el rollout: llamada a Docker bajo admission
+control + cambios en la DB con la cuota en la misma transacción.
+"""
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.admission import admission
+from app.engines import docker as dk
+from app.models.containers import Container
+from app.models.service import Service
+from app.services import events, logstore, quotas, specs
+from app.services import ports as host_ports
+from app.services.labels import KIND_CONTAINER, index_new_labels
+from app.services.quotas import QuotaExceeded
+
+log = logging.getLogger("services.deploy")
+
+
+def save_created(db: Session, row: Container, port_owner: Optional[str] = None) -> Container:
+    """
+    Reserva la cuota y guarda el contenedor recién creado en una sola transacción.
+    Si otra petición ganó el último cupo entre el pre-chequeo y aquí, se borra el
+    contenedor de Docker para no dejarlo huérfano. ``port_owner`` es el dueño
+    provisorio de los puertos inline, que pasan a nombre del contenedor.
+    """
+    try:
+        quotas.reserve(db, row.project_id, row.cpu, row.memory_mb)
+    except QuotaExceeded:
+        db.rollback()
+        if port_owner:
+            host_ports.allocator().release(port_owner)
+        try:
+            dk.remove(row.docker_id, force=True)
+        except Exception:
+            log.exception("Could not remove container %s after quota rejection", row.docker_id)
+        raise
+    db.add(row)
+    db.flush()
+    index_new_labels(db, KIND_CONTAINER, {row.id: row.labels})
+    db.commit()
+    if port_owner:
+        host_ports.allocator().rename(port_owner, host_ports.container_owner(row.id))
+    db.refresh(row)
+    events.record(row, "create")
+    return row
+
+
+def create_from_service(db: Session, svc: Service) -> Container:
+    """
+    Crea y arranca un contenedor con la spec compilada del service (cacheada por
+    revisión, ver ``services.specs``). Los errores de validación del engine
+    salen como ``ValueError``; cuota, puertos y admission con sus propias
+    excepciones.
+    """
+    compiled = specs.cache.get(svc)
+    quotas.check(db, svc.project_id, compiled.cpu, compiled.memory_mb)
+
+    with admission.acquire("create", project_id=svc.project_id):
+        res = dk.create_from_spec(compiled.spec)
+
+    now = datetime.utcnow()
+    row = Container(
+        docker_id=res.docker_id,
+        name=res.name,
+        image=svc.image,
+        status=res.status,
+        project_id=svc.project_id,
+        service_id=svc.id,
+        labels=dict(compiled.labels),
+        cpu=compiled.cpu,
+        memory_mb=compiled.memory_mb,
+        spec_hash=compiled.spec.spec_hash,
+        created_at=now,
+        updated_at=now,
+        deleted_at=None,
+    )
+    return save_created(db, row)
+
+
+def stop_container(db: Session, row: Container) -> None:
+    with admission.acquire("stop", project_id=row.project_id):
+        dk.stop(row.docker_id)
+    host_ports.allocator().release(host_ports.container_owner(row.id))
+    previous = row.status
+    row.status = "exited"
+    row.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(row)
+    events.record(row, "stop", from_status=previous)
+
+
+def start_container(db: Session, row: Container) -> None:
+    """Arranca un contenedor detenido; los puertos inline se reservan de nuevo."""
+    owner = host_ports.container_owner(row.id)
+    alloc = host_ports.allocator()
+    ports = list((row.ports or {}).values())
+    held = all(alloc.owner_of(port) == owner for port in ports)
+    alloc.claim(owner, ports)
+    try:
+        with admission.acquire("start", project_id=row.project_id):
+            dk.start(row.docker_id)
+    except BaseException:
+        if not held:
+            alloc.release(owner)
+        raise
+    previous = row.status
+    row.status = "running"
+    row.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(row)
+    events.record(row, "start", from_status=previous)
+
+
+def remove_container(db: Session, row: Container, *, force: bool = False) -> None:
+    """
+    Borra el contenedor en Docker y lo da de baja: puertos, cuota y evento.
+    Con ``force`` lo detiene si está corriendo y no falla si Docker ya no lo tiene.
+    """
+    previous = row.status
+    logstore.drain(row)
+    with admission.acquire("remove", project_id=row.project_id):
+        dk.remove(row.docker_id, force=force, missing_ok=force)
+    host_ports.allocator().release(host_ports.container_owner(row.id))
+    row.deleted_at = datetime.utcnow()
+    quotas.release(db, row.project_id, row.cpu, row.memory_mb)
+    db.commit()
+    events.record(row, "remove", from_status=previous, to_status="removed")
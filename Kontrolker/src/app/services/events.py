@@ -0,0 +1,369 @@
+# src/app/services/events.py
+"""
+Historial de eventos de contenedores.
+
+Los routers y el watcher de Docker no escriben en la DB directamente: encolan
+eventos en ``writer``, que hace group-commit en lotes desde su propio hilo. Así
+un start/stop no paga un INSERT + commit extra y miles de eventos de Docker se
+escriben con unos pocos INSERT multi-fila.
+
+Con ``EVENTS_DOCKER_WATCH`` cada acción de la API también llega por `docker
+events` (un stop se ve como kill, die y stop). Un evento de Docker que es el eco
+de una acción registrada por la API o el GC para el mismo contenedor (ver
+``API_ECHOES``) dentro de ``EVENTS_DEDUPE_WINDOW_SEC`` no se guarda. Así los
+conteos no cuentan dos veces. Los de Docker esperan esa ventana en el writer
+antes de escribirse, porque el evento de la API puede encolarse después.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+
+from app.core.config import settings
+from app.core.leases import manager as leases
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.engines import docker as dk
+from app.models.containers import Container
+from app.models.events import ContainerEvent
+
+log = logging.getLogger("services.events")
+
+SOURCE_API = "api"
+SOURCE_DOCKER = "docker"
+SOURCE_GC = "gc"
+
+# acciones de `docker events` que nos interesan como transiciones
+DOCKER_ACTIONS = {
+    "create": "created",
+    "start": "running",
+    "restart": "running",
+    "pause": "paused",
+    "unpause": "running",
+    "stop": "exited",
+    "die": "exited",
+    "kill": None,
+    "oom": None,
+    "destroy": "removed",
+}
+
+# lo que `docker events` muestra por cada acción que registra la API (o el GC)
+API_ECHOES = {
+    "create": {"create", "start"},
+    "start": {"start"},
+    "stop": {"kill", "die", "stop"},
+    "restart": {"kill", "die", "stop", "start", "restart"},
+    "remove": {"kill", "die", "stop", "destroy"},
+}
+
+RETENTION_BATCH = 5_000
+
+
+class EventWriter:
+    """Buffer en memoria + hilo que escribe en lotes (group commit)."""
+
+    def __init__(self, batch_size: int, flush_interval_sec: float, max_queue: int, dedupe_window_sec: float = 0):
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.dedupe_window_sec = dedupe_window_sec
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._held: List[dict] = []   # eventos de Docker dentro de la ventana de dedupe
+        self._held_lock = threading.Lock()
+        self.dropped = 0
+        self.echoes = 0
+
+    def put(self, event: dict) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # nunca bloqueamos un request por el historial
+            self.dropped += 1
+            log.warning("Event queue full, dropping event: %s", event.get("action"))
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Escribe todo lo pendiente (también lo retenido); devuelve cuántos eventos se guardaron."""
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            written += self._write(self._ready(batch))
+        held = self._ready([], force=True)
+        if held:
+            written += self._write(held)
+        return written
+
+    def _ready(self, batch: List[dict], force: bool = False) -> List[dict]:
+        """Lo que se puede escribir ya: los de Docker esperan a que pase la ventana de dedupe."""
+        if self.dedupe_window_sec <= 0:
+            return batch
+        cutoff = datetime.utcnow() - timedelta(seconds=self.dedupe_window_sec)
+        own = [e for e in batch if e["source"] != SOURCE_DOCKER]
+        with self._held_lock:
+            held = self._held + [e for e in batch if e["source"] == SOURCE_DOCKER]
+            ready = [e for e in held if force or e["created_at"] <= cutoff]
+            self._held = [e for e in held if not (force or e["created_at"] <= cutoff)]
+        return own + ready
+
+    def _drain(self, limit: int) -> List[dict]:
+        batch: List[dict] = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval_sec
+            batch: List[dict] = []
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            batch = self._ready(batch)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[dict]) -> int:
+        if not batch:
+            return 0
+        try:
+            with SessionLocal() as db:
+                rows = _resolve_docker_ids(db, batch)
+                if self.dedupe_window_sec > 0:
+                    kept = _drop_echoes(db, rows, timedelta(seconds=self.dedupe_window_sec))
+                    self.echoes += len(rows) - len(kept)
+                    rows = kept
+                if rows:
+                    db.execute(insert(ContainerEvent), rows)
+                    db.commit()
+                return len(rows)
+        except Exception:
+            log.exception("Could not write %s container events", len(batch))
+            return 0
+
+
+def _resolve_docker_ids(db, batch: List[dict]) -> List[dict]:
+    """
+    Completa container/service/project de eventos que solo traen docker_id
+    (los de Docker) con una sola consulta; descarta los de contenedores que
+    no gestiona Kontrolker.
+    """
+    pending = {e["docker_id"] for e in batch if e.get("container_id") is None and e.get("docker_id")}
+    known: Dict[str, tuple] = {}
+    if pending:
+        known = {
+            docker_id: (cid, sid, pid)
+            for cid, docker_id, sid, pid in db.execute(
+                select(Container.id, Container.docker_id, Container.service_id, Container.project_id)
+                .where(Container.docker_id.in_(pending))
+            )
+        }
+    rows = []
+    for e in batch:
+        if e.get("container_id") is None:
+            ids = known.get(e.get("docker_id"))
+            if ids is None:
+                continue
+            e = {**e, "container_id": ids[0], "service_id": ids[1], "project_id": ids[2]}
+        rows.append(e)
+    return rows
+
+
+def _drop_echoes(db, rows: List[dict], window: timedelta) -> List[dict]:
+    """
+    Descarta los eventos de Docker que repiten una acción de la API/GC del mismo
+    contenedor a menos de ``window``. Compara contra el lote y contra lo ya
+    guardado (una consulta por el índice ``container_id, created_at``).
+    """
+    docker_rows = [r for r in rows if r["source"] == SOURCE_DOCKER]
+    if not docker_rows:
+        return rows
+    actions = defaultdict(list)   # container_id -> [(acción, ts)] de la API/GC
+    for r in rows:
+        if r["source"] != SOURCE_DOCKER:
+            actions[r["container_id"]].append((r["action"], r["created_at"]))
+    lo = min(r["created_at"] for r in docker_rows) - window
+    hi = max(r["created_at"] for r in docker_rows) + window
+    stored = db.execute(
+        select(ContainerEvent.container_id, ContainerEvent.action, ContainerEvent.created_at).where(
+            ContainerEvent.container_id.in_({r["container_id"] for r in docker_rows}),
+            ContainerEvent.source != SOURCE_DOCKER,
+            ContainerEvent.created_at.between(lo, hi),
+        )
+    )
+    for container_id, action, ts in stored:
+        actions[container_id].append((action, ts))
+
+    def echo(r: dict) -> bool:
+        return any(
+            r["action"] in API_ECHOES.get(action, ()) and abs(ts - r["created_at"]) <= window
+            for action, ts in actions.get(r["container_id"], ())
+        )
+
+    return [r for r in rows if r["source"] != SOURCE_DOCKER or not echo(r)]
+
+
+writer = EventWriter(
+    batch_size=settings.EVENTS_BATCH_SIZE,
+    flush_interval_sec=settings.EVENTS_FLUSH_INTERVAL_SEC,
+    max_queue=settings.EVENTS_QUEUE_MAX,
+    # sin watcher no hay ecos que descartar ni motivo para retener nada
+    dedupe_window_sec=settings.EVENTS_DEDUPE_WINDOW_SEC if settings.EVENTS_DOCKER_WATCH else 0,
+)
+
+
+def record(
+    row: Container,
+    action: str,
+    *,
+    from_status: Optional[str] = None,
+    to_status: Optional[str] = None,
+    source: str = SOURCE_API,
+) -> None:
+    """Encola una transición de ``row``. No toca la sesión del request."""
+    writer.put({
+        "container_id": row.id,
+        "docker_id": row.docker_id,
+        "service_id": row.service_id,
+        "project_id": row.project_id,
+        "action": action,
+        "from_status": from_status,
+        "to_status": to_status if to_status is not None else row.status,
+        "source": source,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def purge_expired(retention_days: int = settings.EVENTS_RETENTION_DAYS) -> int:
+    """
+    Retención rodante: borra eventos más viejos que ``retention_days`` en lotes
+    pequeños (cada lote es su propia transacción) para no bloquear escrituras.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            ids = select(ContainerEvent.id).where(ContainerEvent.created_at < cutoff).limit(RETENTION_BATCH)
+            deleted = db.execute(delete(ContainerEvent).where(ContainerEvent.id.in_(ids))).rowcount
+            leases.fence(db, "events-retention")
+            db.commit()
+            total += deleted
+            if deleted < RETENTION_BATCH:
+                break
+    if total:
+        log.info("Purged %s container events older than %s", total, cutoff.isoformat())
+    return total
+
+
+retention = PeriodicTask(
+    "events-retention",
+    settings.EVENTS_RETENTION_INTERVAL_SEC,
+    purge_expired,
+    gate=leases.gate("events-retention"),
+)
+
+
+class DockerEventWatcher:
+    """Consume `docker events` (solo contenedores) y los encola en ``writer``."""
+
+    RECONNECT_BACKOFF_SEC = 5.0
+
+    LEASE = "docker-events"
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stream = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        # con varias réplicas, solo la que tiene el lease consume el stream
+        leases.register(self.LEASE)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="docker-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not leases.is_leader(self.LEASE):
+                self._stop.wait(settings.LEASE_RENEW_SEC)
+                continue
+            try:
+                self._stream = dk.events(filters={"type": "container", "event": list(DOCKER_ACTIONS)})
+                for ev in self._stream:
+                    if self._stop.is_set() or not leases.is_leader(self.LEASE):
+                        break
+                    self._handle(ev)
+            except Exception as e:
+                if not self._stop.is_set():
+                    log.warning("Docker events stream failed: %s", e)
+            finally:
+                stream, self._stream = self._stream, None
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+            self._stop.wait(self.RECONNECT_BACKOFF_SEC)
+
+    def _handle(self, ev: dict) -> None:
+        action = (ev.get("Action") or ev.get("status") or "").split(":")[0]
+        if action not in DOCKER_ACTIONS:
+            return
+        ts = ev.get("timeNano")
+        created_at = datetime.utcfromtimestamp(ts / 1e9) if ts else datetime.utcnow()
+        writer.put({
+            "container_id": None,
+            "docker_id": ev.get("id") or (ev.get("Actor") or {}).get("ID"),
+            "service_id": None,
+            "project_id": None,
+            "action": action,
+            "from_status": None,
+            "to_status": DOCKER_ACTIONS[action],
+            "source": SOURCE_DOCKER,
+            "created_at": created_at,
+        })
+
+
+docker_watcher = DockerEventWatcher()
@@ -0,0 +1,226 @@
+# src/app/services/gc.py
+"""
+Garbage collection en segundo plano. Cada pasada, en orden:
+
+1. Contenedores de projects borrados: se eliminan de Docker (force) y se
+   marcan borrados, liberando cuota y puertos.
+2. Contenedores detenidos (``exited``/``dead``) sin cambios hace más de
+   ``GC_EXITED_TTL_HOURS``: se eliminan igual.
+3. Imágenes que usó algún service o contenedor de Kontrolker y que ya no usa
+   ninguno vivo. Solo esas: nunca se tocan imágenes ajenas del host.
+4. Filas soft-deleted más viejas que ``GC_PURGE_AFTER_DAYS``: se borran en
+   lotes de ``GC_BATCH_SIZE`` (cada lote su transacción), junto con sus labels
+   indexadas; con ``GC_ARCHIVE_DIR`` antes se escriben en JSONL.
+
+Cada paso es independiente: si Docker no responde, la purga de filas sigue.
+
+Con varias réplicas el GC corre en todas, pero los pasos 1 y 2 se reparten
+por service (``leases.owns``) y los pasos 3 y 4 solo los hace la réplica con
+el lease ``gc``.
+"""
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Set
+
+import orjson
+from sqlalchemy import delete, exists, select
+
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.leases import manager as leases
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.engines import docker as dk
+from app.models.containers import Container
+from app.models.labels import ResourceLabel
+from app.models.project import Project
+from app.models.quotas import ProjectQuota
+from app.models.service import Service
+from app.services import events, logstore, quotas
+from app.services import ports as host_ports
+from app.services.labels import KIND_CONTAINER, KIND_PROJECT, KIND_SERVICE
+from app.services.operations import OperationConflict, coordinator
+
+log = logging.getLogger("services.gc")
+
+EXITED_STATUSES = ("exited", "dead")
+LEASE = "gc"
+
+# imágenes que ya se intentaron borrar en este proceso (no reintentar cada pasada)
+_images_done: Set[str] = set()
+
+
+def _reap(db, row: Container) -> bool:
+    """Elimina el contenedor de Docker y marca la fila. False si hay otra operación en curso."""
+    def remove():
+        db.refresh(row)
+        if row.deleted_at is not None:
+            return
+        logstore.drain(row)
+        with admission.acquire("remove", project_id=row.project_id):
+            dk.remove(row.docker_id, force=True, missing_ok=True)
+        previous = row.status
+        row.deleted_at = datetime.utcnow()
+        quotas.release(db, row.project_id, row.cpu, row.memory_mb)
+        db.commit()
+        host_ports.allocator().release(host_ports.container_owner(row.id))
+        events.record(row, "remove", from_status=previous, to_status="removed", source=events.SOURCE_GC)
+
+    try:
+        coordinator.run(row.docker_id, "remove", remove)
+    except OperationConflict:
+        return False
+    return True
+
+
+def _mine(candidates) -> List[int]:
+    """De ``(id, service_id)``, los contenedores que le tocan a esta réplica."""
+    ids = [
+        cid for cid, service_id in candidates
+        if leases.owns(("service", service_id) if service_id is not None else ("container", cid))
+    ]
+    return ids[: settings.GC_BATCH_SIZE]
+
+
+def _reap_ids(ids: List[int]) -> int:
+    reaped = 0
+    with SessionLocal() as db:
+        for row in db.scalars(select(Container).where(Container.id.in_(ids))):
+            try:
+                if _reap(db, row):
+                    reaped += 1
+            except Exception:
+                db.rollback()
+                log.exception("GC could not remove container %s", row.docker_id)
+    return reaped
+
+
+def reap_orphaned_containers() -> int:
+    """Contenedores vivos cuyo project fue borrado (cascada del delete de project)."""
+    with SessionLocal() as db:
+        ids = _mine(db.execute(
+            select(Container.id, Container.service_id)
+            .join(Project, Project.id == Container.project_id)
+            .where(Container.deleted_at.is_(None), Project.deleted_at.is_not(None))
+        ))
+    return _reap_ids(ids)
+
+
+def reap_exited_containers(ttl_hours: float = settings.GC_EXITED_TTL_HOURS) -> int:
+    if ttl_hours <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    with SessionLocal() as db:
+        ids = _mine(db.execute(
+            select(Container.id, Container.service_id)
+            .where(
+                Container.deleted_at.is_(None),
+                Container.status.in_(EXITED_STATUSES),
+                Container.updated_at < cutoff,
+            )
+        ))
+    return _reap_ids(ids)
+
+
+def remove_unused_images() -> int:
+    with SessionLocal() as db:
+        in_use = set(db.scalars(select(Service.image).where(Service.deleted_at.is_(None)).distinct()))
+        in_use |= set(db.scalars(select(Container.image).where(Container.deleted_at.is_(None)).distinct()))
+        known = set(db.scalars(select(Service.image).where(Service.deleted_at.is_not(None)).distinct()))
+        known |= set(db.scalars(select(Container.image).where(Container.deleted_at.is_not(None)).distinct()))
+    # si una imagen vuelve a usarse y se deja de usar, se intenta de nuevo
+    _images_done.intersection_update(known - in_use)
+    removed = 0
+    for image in sorted(known - in_use - _images_done)[: settings.GC_BATCH_SIZE]:
+        with admission.acquire("remove"):
+            if dk.remove_image(image):
+                removed += 1
+        _images_done.add(image)
+    return removed
+
+
+def _archive(table: str, rows: List[dict]) -> None:
+    if not settings.GC_ARCHIVE_DIR or not rows:
+        return
+    path = Path(settings.GC_ARCHIVE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / f"{table}.jsonl", "ab") as fh:
+        fh.write(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+
+
+def _purge(model, kind: str, cutoff: datetime, *extra) -> int:
+    """Borra filas soft-deleted antes de ``cutoff`` en lotes, con sus labels."""
+    total = 0
+    table = model.__table__
+    with SessionLocal() as db:
+        while True:
+            rows = [
+                dict(row._mapping)
+                for row in db.execute(
+                    select(table)
+                    .where(model.deleted_at.is_not(None), model.deleted_at < cutoff, *extra)
+                    .order_by(model.id)
+                    .limit(settings.GC_BATCH_SIZE)
+                )
+            ]
+            if not rows:
+                break
+            ids = [row["id"] for row in rows]
+            _archive(table.name, rows)
+            db.execute(delete(ResourceLabel).where(
+                ResourceLabel.kind == kind, ResourceLabel.resource_id.in_(ids),
+            ))
+            if model is Project:
+                db.execute(delete(ProjectQuota).where(ProjectQuota.project_id.in_(ids)))
+            db.execute(delete(model).where(model.id.in_(ids)))
+            leases.fence(db, LEASE)
+            db.commit()
+            total += len(ids)
+            if len(ids) < settings.GC_BATCH_SIZE:
+                break
+    return total
+
+
+def purge_soft_deleted(retention_days: float = settings.GC_PURGE_AFTER_DAYS) -> Dict[str, int]:
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    # de hijos a padres; un padre se queda mientras alguna fila lo referencie
+    return {
+        "containers": _purge(Container, KIND_CONTAINER, cutoff),
+        "services": _purge(
+            Service, KIND_SERVICE, cutoff,
+            ~exists().where(Container.service_id == Service.id),
+        ),
+        "projects": _purge(
+            Project, KIND_PROJECT, cutoff,
+            ~exists().where(Service.project_id == Project.id),
+            ~exists().where(Container.project_id == Project.id),
+        ),
+    }
+
+
+def collect() -> Dict[str, object]:
+    """Una pasada completa del GC; devuelve lo que hizo cada paso."""
+    leader = leases.is_leader(LEASE)
+    steps = [
+        ("orphaned_containers", reap_orphaned_containers),
+        ("exited_containers", reap_exited_containers),
+        ("images", remove_unused_images if settings.GC_IMAGES and leader else None),
+        ("purged", purge_soft_deleted if leader else None),
+    ]
+    report: Dict[str, object] = {}
+    for name, fn in steps:
+        if fn is None:
+            continue
+        try:
+            report[name] = fn()
+        except Exception as e:
+            log.exception("GC step %s failed", name)
+            report[name] = {"error": str(e) or type(e).__name__}
+    if any(any(v.values()) if isinstance(v, dict) else v for v in report.values()):
+        log.info("GC pass: %s", report)
+    return report
+
+
+leases.register(LEASE)
+collector = PeriodicTask("gc", settings.GC_INTERVAL_SEC, collect)
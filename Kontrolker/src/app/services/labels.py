@@ -0,0 +1,205 @@
+# src/app/services/labels.py
+"""
+Selectores de labels estilo Kubernetes resueltos en la DB.
+
+Sintaxis (requisitos separados por coma, todos deben cumplirse)::
+
+    env=prod            env==prod        env!=prod
+    tier in (web,api)   tier notin (db)
+    owner               !owner
+
+Los selectores se traducen a subconsultas sobre ``resource_labels``, que se
+mantiene sincronizada con la columna JSON ``labels`` en cada escritura
+mediante ``sync_labels`` / ``index_new_labels``. Las filas anteriores a la
+tabla se indexan una vez con ``backfill_labels`` (desde ``init_db``).
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Mapping, Tuple
+
+from sqlalchemy import String, cast, delete, func, insert, select
+from sqlalchemy.orm import Query, Session, aliased
+
+from app.models.containers import Container
+from app.models.labels import ResourceLabel
+from app.models.project import Project
+from app.models.service import Service
+
+KIND_PROJECT = "project"
+KIND_SERVICE = "service"
+KIND_CONTAINER = "container"
+
+# tope de filas al estimar la selectividad de cada requisito
+ESTIMATE_CAP = 1000
+BACKFILL_BATCH = 500
+
+_KEY = r"[A-Za-z0-9]([A-Za-z0-9._/-]*[A-Za-z0-9])?"
+_VALUE = r"[A-Za-z0-9._/-]*"
+_SET_RE = re.compile(rf"^({_KEY})\s+(in|notin)\s+\(([^)]*)\)$")
+_EQ_RE = re.compile(rf"^({_KEY})\s*(==|!=|=)\s*({_VALUE})$")
+_EXISTS_RE = re.compile(rf"^(!?)\s*({_KEY})$")
+
+
+@dataclass(frozen=True)
+class Requirement:
+    key: str
+    op: str                     # in | notin | exists | !exists
+    values: Tuple[str, ...] = ()
+
+
+def _split(selector: str) -> List[str]:
+    """Separa por comas ignorando las que están dentro de paréntesis."""
+    parts, depth, current = [], 0, []
+    for ch in selector:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_selector(selector: str) -> List[Requirement]:
+    """Convierte el texto del selector en requisitos; ValueError si es inválido."""
+    reqs: List[Requirement] = []
+    for part in _split(selector):
+        m = _SET_RE.match(part)
+        if m:
+            values = tuple(v.strip() for v in m.group(4).split(",") if v.strip())
+            if not values:
+                raise ValueError(f"Empty value set in selector: '{part}'")
+            reqs.append(Requirement(m.group(1), m.group(3), values))
+            continue
+        m = _EQ_RE.match(part)
+        if m:
+            op = "notin" if m.group(3) == "!=" else "in"
+            reqs.append(Requirement(m.group(1), op, (m.group(4),)))
+            continue
+        m = _EXISTS_RE.match(part)
+        if m:
+            reqs.append(Requirement(m.group(2), "!exists" if m.group(1) else "exists"))
+            continue
+        raise ValueError(f"Invalid label selector: '{part}'")
+    return reqs
+
+
+def _conditions(label, kind: str, req: Requirement) -> list:
+    conds = [label.kind == kind, label.key == req.key]
+    if req.op in ("in", "notin"):
+        conds.append(label.value.in_(req.values))
+    return conds
+
+
+def _estimate(db: Session, kind: str, req: Requirement) -> int:
+    """Cuántas filas toca el requisito (acotado), para elegir el más selectivo."""
+    capped = (
+        select(ResourceLabel.resource_id)
+        .where(*_conditions(ResourceLabel, kind, req))
+        .limit(ESTIMATE_CAP)
+        .subquery()
+    )
+    return db.execute(select(func.count()).select_from(capped)).scalar_one()
+
+
+def apply_selector(query: Query, id_column, kind: str, selector: str) -> Query:
+    """
+    Filtra ``query`` por el selector.
+
+    El requisito positivo más selectivo (``=``, ``in``, ``key``) recorre el índice
+    ``kind, key, value`` y el resto se comprueba con sondas correlacionadas
+    sobre ``(kind, resource_id, key)``, así el costo depende de las filas que
+    cumplen y no del tamaño de la tabla. Los requisitos negativos (``!=``,
+    ``notin``, ``!key``) siguen la semántica de Kubernetes: también cumplen si
+    la llave no existe.
+    """
+    reqs = parse_selector(selector)
+    positives = [r for r in reqs if r.op in ("in", "exists")]
+
+    if not positives:
+        for req in reqs:
+            excluded = select(ResourceLabel.resource_id).where(*_conditions(ResourceLabel, kind, req))
+            query = query.filter(id_column.not_in(excluded))
+        return query
+
+    driver = min(positives, key=lambda r: _estimate(query.session, kind, r))
+    base = aliased(ResourceLabel)
+    candidates = select(base.resource_id).where(*_conditions(base, kind, driver))
+    for req in reqs:
+        if req is driver:
+            continue
+        other = aliased(ResourceLabel)
+        probe = (
+            select(other.id)
+            .where(other.resource_id == base.resource_id, *_conditions(other, kind, req))
+            .exists()
+        )
+        candidates = candidates.where(probe if req in positives else ~probe)
+    return query.filter(id_column.in_(candidates))
+
+
+def _rows(kind: str, resource_id: int, labels: Mapping[str, str]) -> List[dict]:
+    return [
+        {"kind": kind, "resource_id": resource_id, "key": k, "value": str(v)}
+        for k, v in (labels or {}).items()
+    ]
+
+
+def sync_labels(db: Session, kind: str, resource_id: int, labels: Mapping[str, str]) -> None:
+    """Reemplaza las labels indexadas de un recurso. No hace commit."""
+    db.execute(
+        delete(ResourceLabel).where(
+            ResourceLabel.kind == kind,
+            ResourceLabel.resource_id == resource_id,
+        )
+    )
+    rows = _rows(kind, resource_id, labels)
+    if rows:
+        db.execute(insert(ResourceLabel), rows)
+
+
+def index_new_labels(db: Session, kind: str, labels_by_id: Mapping[int, Mapping[str, str]]) -> None:
+    """Indexa labels de recursos recién creados (sin borrar nada). No hace commit."""
+    rows = [row for rid, labels in labels_by_id.items() for row in _rows(kind, rid, labels)]
+    if rows:
+        db.execute(insert(ResourceLabel), rows)
+
+
+
+def backfill_labels(db: Session) -> int:
+    """
+    Indexa recursos con ``labels`` que no tienen ninguna fila en
+    ``resource_labels`` (creados antes de la tabla). Idempotente: una vez
+    indexados, la consulta ya no los encuentra. Hace commit por lote.
+    """
+    total = 0
+    for kind, model in ((KIND_PROJECT, Project), (KIND_SERVICE, Service), (KIND_CONTAINER, Container)):
+        indexed = (
+            select(ResourceLabel.id)
+            .where(ResourceLabel.kind == kind, ResourceLabel.resource_id == model.id)
+            .exists()
+        )
+        last_id = 0
+        while True:
+            batch = db.execute(
+                select(model.id, model.labels)
+                .where(
+                    model.id > last_id,
+                    model.labels.is_not(None),
+                    cast(model.labels, String).not_in(("{}", "null")),
+                    ~indexed,
+                )
+                .order_by(model.id)
+                .limit(BACKFILL_BATCH)
+            ).all()
+            if not batch:
+                break
+            index_new_labels(db, kind, {rid: labels for rid, labels in batch})
+            db.commit()
+            total += len(batch)
+            last_id = batch[-1][0]
+    return total
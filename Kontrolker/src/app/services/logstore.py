@@ -0,0 +1,386 @@
+# src/app/services/logstore.py
+"""
+Almacén de logs de contenedores (opt-in con ``LOGS_ENABLED``).
+
+Cada pasada del colector pide a Docker las líneas nuevas de los contenedores
+corriendo (``since`` = último timestamp guardado) y las agrega comprimidas al
+segmento activo del contenedor::
+
+    LOGS_DIR/<container_id>/<primer_ts_ns>.seg
+
+Un segmento es una secuencia de bloques ``FRAME`` (cabecera + zlib). La
+cabecera lleva el primer y último timestamp del bloque: es el índice disperso.
+Se arma leyendo solo las cabeceras (sin descomprimir) y se guarda en memoria
+por segmento; un bloque a medio escribir al final (caída) se ignora al leer y
+se recorta antes de la siguiente escritura. Al pasar ``LOGS_SEGMENT_BYTES`` se
+abre un segmento nuevo.
+
+Una consulta descarta segmentos y bloques fuera del rango por timestamp,
+lee el resto con mmap y solo descomprime los bloques que pueden tener líneas
+del rango (y, con ``grep``, solo si el texto aparece en el bloque).
+
+La retención borra segmentos enteros: los que terminan antes de
+``LOGS_RETENTION_DAYS`` y los más viejos mientras el contenedor pase de
+``LOGS_MAX_BYTES_PER_CONTAINER``. Los logs sobreviven al borrado del
+contenedor: ``deploy.remove_container`` y el GC bajan lo pendiente antes.
+
+Con varias réplicas cada contenedor lo recolecta una sola (``leases.owns``);
+``LOGS_DIR`` tiene que ser compartido para que cualquiera pueda consultarlos.
+"""
+import bisect
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.leases import manager as leases
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.engines import docker as dk
+from app.models.containers import Container
+
+log = logging.getLogger("services.logstore")
+
+# primer ts, último ts (ns desde epoch), bytes comprimidos, bytes sin comprimir
+FRAME = struct.Struct("<qqII")
+SEGMENT_SUFFIX = ".seg"
+# "2024-05-01T12:00:00.123456789Z línea": nanosegundos que datetime no parsea
+_DOCKER_TS = re.compile(rb"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d) ?")
+
+
+def _parse_docker_line(line: bytes) -> Optional[Tuple[int, bytes]]:
+    m = _DOCKER_TS.match(line)
+    if m is None:
+        return None
+    base = datetime.fromisoformat(m.group(1).decode() + (m.group(3).decode().replace("Z", "+00:00")))
+    frac = (m.group(2) or b"0")[:9].ljust(9, b"0")
+    return int(base.timestamp()) * 1_000_000_000 + int(frac), line[m.end():]
+
+
+def to_ns(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1_000_000) * 1000
+
+
+def from_ns(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts / 1e9, tz=timezone.utc)
+
+
+@dataclass
+class _Index:
+    size: int                                  # bytes del archivo ya indexados
+    first: List[int]                           # primer ts de cada bloque
+    last: List[int]                            # último ts acumulado (no decreciente)
+    spans: List[Tuple[int, int]]               # (offset del payload, bytes comprimidos)
+
+
+class LogStore:
+    def __init__(self, root: str, segment_bytes: int, block_bytes: int):
+        self.root = Path(root)
+        self.segment_bytes = segment_bytes
+        self.block_bytes = block_bytes
+        self._lock = threading.Lock()
+        self._writers: Dict[int, threading.Lock] = {}
+        self._indexes: Dict[Path, _Index] = {}
+
+    def _dir(self, container_id: int) -> Path:
+        return self.root / str(container_id)
+
+    def _writer_lock(self, container_id: int) -> threading.Lock:
+        with self._lock:
+            return self._writers.setdefault(container_id, threading.Lock())
+
+    def segments(self, container_id: int) -> List[Path]:
+        folder = self._dir(container_id)
+        if not folder.is_dir():
+            return []
+        return sorted(folder.glob(f"*{SEGMENT_SUFFIX}"), key=lambda p: int(p.stem))
+
+    # ---- índice disperso ----
+
+    def _index(self, path: Path) -> _Index:
+        """Índice de bloques del segmento; incremental si el archivo creció."""
+        size = path.stat().st_size
+        with self._lock:
+            idx = self._indexes.get(path)
+            if idx is None:
+                idx = self._indexes[path] = _Index(0, [], [], [])
+            if idx.size >= size:
+                return idx
+            with open(path, "rb") as f:
+                offset = idx.size
+                while offset + FRAME.size <= size:
+                    f.seek(offset)
+                    first, last, clen, _rlen = FRAME.unpack(f.read(FRAME.size))
+                    end = offset + FRAME.size + clen
+                    if end > size:
+                        break  # bloque incompleto al final
+                    idx.first.append(first)
+                    idx.last.append(max(last, idx.last[-1]) if idx.last else last)
+                    idx.spans.append((offset + FRAME.size, clen))
+                    offset = end
+                idx.size = offset
+            return idx
+
+    def _forget(self, path: Path) -> None:
+        with self._lock:
+            self._indexes.pop(path, None)
+
+    # ---- escritura ----
+
+    def _repair_tail(self, segments: List[Path]) -> List[Path]:
+        """
+        Recorta un bloque incompleto al final del último segmento (caída a mitad
+        de escritura): lo que se agregara detrás quedaría fuera del índice.
+        Con el writer lock tomado.
+        """
+        while segments:
+            path = segments[-1]
+            idx = self._index(path)
+            if path.stat().st_size == idx.size:
+                break
+            log.warning("Truncating torn log block in %s at byte %d", path, idx.size)
+            if idx.size:
+                os.truncate(path, idx.size)
+                break
+            path.unlink()
+            self._forget(path)
+            segments = segments[:-1]
+        return segments
+
+    def _last_ts(self, segments: List[Path]) -> Optional[int]:
+        for path in reversed(segments):
+            idx = self._index(path)
+            if idx.last:
+                return idx.last[-1]
+        return None
+
+    def append(self, container_id: int, entries: List[Tuple[int, bytes]]) -> int:
+        """
+        Agrega ``(ts_ns, texto)`` ordenadas por ts, en bloques de ``block_bytes``.
+        Descarta las que no son posteriores a lo ya guardado: dos recolecciones
+        del mismo contenedor (``drain`` y ``sync``) pueden traer la misma ventana.
+        Devuelve cuántas líneas se guardaron.
+        """
+        if not entries:
+            return 0
+        written = 0
+        with self._writer_lock(container_id):
+            folder = self._dir(container_id)
+            folder.mkdir(parents=True, exist_ok=True)
+            segments = self._repair_tail(self.segments(container_id))
+            path = segments[-1] if segments else None
+            last = self._last_ts(segments)
+            if last is not None:
+                entries = [entry for entry in entries if entry[0] > last]
+                if not entries:
+                    return 0
+
+            block: List[bytes] = []
+            block_size = 0
+            block_first = entries[0][0]
+            block_last = block_first
+
+            def flush():
+                nonlocal path, written
+                raw = b"".join(block)
+                payload = zlib.compress(raw, 6)
+                if path is None or path.stat().st_size >= self.segment_bytes:
+                    path = folder / f"{block_first}{SEGMENT_SUFFIX}"
+                with open(path, "ab") as f:
+                    f.write(FRAME.pack(block_first, block_last, len(payload), len(raw)) + payload)
+                written += len(block)
+
+            for ts, text in entries:
+                line = b"%d %s\n" % (ts, text.rstrip(b"\n"))
+                if block and block_size + len(line) > self.block_bytes:
+                    flush()
+                    block, block_size, block_first = [], 0, ts
+                block.append(line)
+                block_size += len(line)
+                block_last = ts
+            flush()
+        return written
+
+    def last_ts(self, container_id: int) -> Optional[int]:
+        return self._last_ts(self.segments(container_id))
+
+    # ---- lectura ----
+
+    def query(
+        self,
+        container_id: int,
+        *,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        grep: Optional[str] = None,
+        limit: int = 1000,
+    ) -> Tuple[List[Tuple[int, str]], bool]:
+        """Líneas ``(ts_ns, texto)`` en ``[since, until]``; el bool indica si se cortó por ``limit``."""
+        lo = since if since is not None else -(2 ** 63)
+        hi = until if until is not None else 2 ** 63 - 1
+        needle = grep.encode() if grep else None
+        out: List[Tuple[int, str]] = []
+
+        segments = self.segments(container_id)
+        for pos, path in enumerate(segments):
+            # el siguiente segmento empieza después de que termina este
+            if pos + 1 < len(segments) and int(segments[pos + 1].stem) < lo:
+                continue
+            if int(path.stem) > hi:
+                break
+            idx = self._index(path)
+            if not idx.spans:
+                continue
+            count = len(idx.spans)
+            start = bisect.bisect_left(idx.last, lo, 0, count)
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), idx.size, access=mmap.ACCESS_READ) as mm:
+                for i in range(start, count):
+                    if idx.first[i] > hi:
+                        break
+                    offset, clen = idx.spans[i]
+                    raw = zlib.decompress(mm[offset:offset + clen])
+                    if needle is not None and needle not in raw:
+                        continue
+                    for line in raw.splitlines():
+                        ts_raw, _, text = line.partition(b" ")
+                        ts = int(ts_raw)
+                        if ts < lo or ts > hi or (needle is not None and needle not in text):
+                            continue
+                        if len(out) >= limit:
+                            return out, True
+                        out.append((ts, text.decode("utf-8", errors="replace")))
+        return out, False
+
+    # ---- retención ----
+
+    def enforce_retention(self, max_age_sec: float, max_bytes: int) -> int:
+        """Borra segmentos viejos o que sobran; devuelve cuántos se borraron."""
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time_ns() - int(max_age_sec * 1e9) if max_age_sec > 0 else None
+        removed = 0
+        for folder in self.root.iterdir():
+            if not folder.is_dir() or not folder.name.isdigit():
+                continue
+            container_id = int(folder.name)
+            with self._writer_lock(container_id):
+                segments = self.segments(container_id)
+                sizes = {path: path.stat().st_size for path in segments}
+                total = sum(sizes.values())
+                for pos, path in enumerate(segments):
+                    idx = self._index(path)
+                    expired = cutoff is not None and idx.last and idx.last[-1] < cutoff
+                    over = max_bytes > 0 and total > max_bytes and pos < len(segments) - 1
+                    if not (expired or over):
+                        continue
+                    path.unlink(missing_ok=True)
+                    self._forget(path)
+                    total -= sizes[path]
+                    removed += 1
+                if not any(folder.iterdir()):
+                    folder.rmdir()
+                    with self._lock:
+                        self._writers.pop(container_id, None)
+        return removed
+
+    def snapshot(self) -> dict:
+        if not self.root.is_dir():
+            return {"containers": 0, "segments": 0, "bytes": 0}
+        containers = segments = size = 0
+        for folder in self.root.iterdir():
+            if folder.is_dir():
+                containers += 1
+                for path in folder.glob(f"*{SEGMENT_SUFFIX}"):
+                    segments += 1
+                    size += path.stat().st_size
+        return {"containers": containers, "segments": segments, "bytes": size}
+
+
+store = LogStore(settings.LOGS_DIR, settings.LOGS_SEGMENT_BYTES, settings.LOGS_BLOCK_BYTES)
+
+
+# ---- recolección ----
+
+def collect_container(container_id: int, docker_id: str) -> int:
+    """Baja de Docker las líneas nuevas del contenedor; devuelve cuántas se guardaron."""
+    last = store.last_ts(container_id)
+    if last is not None:
+        since = last / 1e9
+    elif settings.LOGS_RETENTION_DAYS > 0:
+        # sin nada guardado (contenedor nuevo o todo vencido): no más viejo que la retención
+        since = time.time() - settings.LOGS_RETENTION_DAYS * 86400
+    else:
+        since = None
+    raw = dk.logs(docker_id, since=since)
+    entries = []
+    for line in raw.splitlines():
+        parsed = _parse_docker_line(line)
+        # ``since`` de Docker tiene resolución de segundos: se filtra lo ya guardado
+        if parsed is not None and (last is None or parsed[0] > last):
+            entries.append(parsed)
+    entries.sort(key=lambda entry: entry[0])
+    # ``append`` vuelve a filtrar contra lo guardado con el lock tomado: otra
+    # recolección del mismo contenedor pudo guardar esta ventana mientras tanto
+    return store.append(container_id, entries)
+
+
+def drain(row: Container) -> None:
+    """Últimas líneas antes de borrar el contenedor de Docker; nunca falla."""
+    if not settings.LOGS_ENABLED:
+        return
+    try:
+        collect_container(row.id, row.docker_id)
+    except Exception:
+        log.warning("Could not drain logs of container %s", row.id, exc_info=True)
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def sync() -> None:
+    """Una pasada: todos los contenedores corriendo de esta réplica, en paralelo."""
+    global _pool
+    with SessionLocal() as db:
+        candidates = (
+            db.query(Container.id, Container.docker_id)
+            .filter(Container.deleted_at.is_(None), Container.status == "running")
+            .all()
+        )
+    mine = [(cid, docker_id) for cid, docker_id in candidates if leases.owns(("container", cid))]
+    if not mine:
+        return
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.LOGS_COLLECT_WORKERS, thread_name_prefix="logs")
+    futures = {cid: _pool.submit(collect_container, cid, docker_id) for cid, docker_id in mine}
+    lines = 0
+    for cid, future in futures.items():
+        try:
+            lines += future.result()
+        except Exception as e:
+            log.warning("Log collection of container %s failed: %s", cid, e)
+    if lines:
+        log.debug("Collected %d log lines from %d containers", lines, len(mine))
+
+
+def _retention() -> None:
+    removed = store.enforce_retention(
+        settings.LOGS_RETENTION_DAYS * 86400, settings.LOGS_MAX_BYTES_PER_CONTAINER,
+    )
+    if removed:
+        log.info("Log retention removed %d segments", removed)
+
+
+collector = PeriodicTask("logs-collector", settings.LOGS_SYNC_INTERVAL_SEC, sync, initial_delay_sec=0)
+retention = PeriodicTask("logs-retention", settings.LOGS_RETENTION_INTERVAL_SEC, _retention)
@@ -0,0 +1,96 @@
+# src/app/services/operations.py
+"""
+Coordinación de operaciones de ciclo de vida por contenedor (por ``docker_id``).
+
+- Misma operación en curso (p.ej. dos ``restart`` por doble click): la segunda
+  petición no llama a Docker, espera y comparte el resultado de la primera.
+- Operaciones contradictorias (``start`` vs ``stop``, cualquier cosa vs
+  ``remove``...): la que llega después se rechaza con ``OperationConflict``.
+- Cualquier otra combinación se serializa: espera su turno sobre el mismo
+  contenedor en lugar de correr en paralelo contra el daemon.
+"""
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Tuple
+
+CONFLICTS = {
+    frozenset({"start", "stop"}),
+    frozenset({"stop", "restart"}),
+}
+
+
+def conflicts(a: str, b: str) -> bool:
+    if a == b:
+        return False
+    if "remove" in (a, b):
+        return True
+    return frozenset({a, b}) in CONFLICTS
+
+
+class OperationConflict(Exception):
+    def __init__(self, key: str, running: str, requested: str):
+        self.key = key
+        self.running = running
+        self.requested = requested
+        super().__init__(
+            f"Cannot {requested} container while a '{running}' operation is in progress"
+        )
+
+
+@dataclass
+class _KeyState:
+    lock: threading.Lock = field(default_factory=threading.Lock)  # serializa la ejecución
+    ops: Dict[str, Future] = field(default_factory=dict)            # en cola o corriendo
+    refs: int = 0
+
+
+class OperationCoordinator:
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._keys: Dict[str, _KeyState] = {}
+
+    def run(self, key: str, op: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta ``fn`` como la operación ``op`` sobre ``key``.
+        Devuelve ``(resultado, leader)``; ``leader`` es False si se reutilizó
+        el resultado de una petición idéntica concurrente.
+        """
+        with self._mutex:
+            state = self._keys.setdefault(key, _KeyState())
+            shared = state.ops.get(op)
+            if shared is None:
+                for pending in state.ops:
+                    if conflicts(pending, op):
+                        raise OperationConflict(key, pending, op)
+                shared = state.ops[op] = Future()
+                leader = True
+            else:
+                leader = False
+            state.refs += 1
+
+        try:
+            if not leader:
+                return shared.result(), False
+            with state.lock:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    shared.set_exception(e)
+                    raise
+                shared.set_result(result)
+                return result, True
+        finally:
+            with self._mutex:
+                if leader:
+                    state.ops.pop(op, None)
+                state.refs -= 1
+                if state.refs == 0:
+                    self._keys.pop(key, None)
+
+    def in_flight(self) -> Dict[str, list]:
+        with self._mutex:
+            return {key: sorted(state.ops) for key, state in self._keys.items() if state.ops}
+
+
+coordinator = OperationCoordinator()
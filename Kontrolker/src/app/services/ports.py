@@ -0,0 +1,260 @@
+# src/app/services/ports.py
+"""
+Asignación de puertos del host.
+
+Cada nodo (daemon de Docker) tiene un bitmap de 65536 bits (8 KB) con los
+puertos tomados y un índice dueño -> puertos para liberar de una vez. Se
+reconstruye desde la DB al arrancar, así un choque se detecta al crear el
+service o el contenedor y no cuando Docker falla al hacer el bind, después
+del pull.
+
+- Los services reservan sus puertos mientras existen (sus contenedores los usan).
+- Los contenedores inline los reservan mientras corren: ``stop`` y ``delete``
+  los liberan y ``start``/``restart`` los vuelven a pedir.
+- ``host = 0`` pide un puerto libre del rango ``PORTS_AUTO_RANGE_*``.
+
+El bitmap vive en memoria de cada proceso: con varios workers cada uno ve
+sus propias reservas más lo que había en la DB al arrancar.
+"""
+import logging
+import re
+import threading
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.containers import Container
+from app.models.service import Service
+
+log = logging.getLogger("services.ports")
+
+MAX_PORT = 65535
+_NOT_FULL = re.compile(rb"[^\xff]")
+
+
+def service_owner(service_id: int) -> str:
+    return f"service:{service_id}"
+
+
+def container_owner(container_id: int) -> str:
+    return f"container:{container_id}"
+
+
+class PortUnavailable(Exception):
+    def __init__(self, port: Optional[int], owner: Optional[str], message: str):
+        self.port = port
+        self.owner = owner
+        super().__init__(message)
+
+
+class PortAllocator:
+    """Bitmap de puertos tomados en un nodo + dueño de cada reserva."""
+
+    def __init__(self, node: str, auto_start: int, auto_end: int):
+        self.node = node
+        self.auto_start = auto_start
+        self.auto_end = auto_end
+        self._bits = bytearray((MAX_PORT + 1) // 8)
+        self._owner_of: Dict[int, str] = {}
+        self._ports_of: Dict[str, Set[int]] = {}
+        self._cursor = auto_start  # next-fit: no volver a escanear lo recién dado
+        self._lock = threading.RLock()
+
+    # -- bitmap --
+
+    def _taken(self, port: int) -> bool:
+        return bool(self._bits[port >> 3] & (1 << (port & 7)))
+
+    def _set(self, port: int, owner: str) -> None:
+        self._bits[port >> 3] |= 1 << (port & 7)
+        self._owner_of[port] = owner
+        self._ports_of.setdefault(owner, set()).add(port)
+
+    def _clear(self, port: int) -> None:
+        self._bits[port >> 3] &= ~(1 << (port & 7)) & 0xFF
+        owner = self._owner_of.pop(port, None)
+        if owner is not None:
+            ports = self._ports_of.get(owner)
+            if ports is not None:
+                ports.discard(port)
+                if not ports:
+                    del self._ports_of[owner]
+
+    def _scan(self, lo: int, hi: int, skip: Set[int]) -> Optional[int]:
+        """Primer puerto libre en [lo, hi]; salta bytes llenos con una búsqueda en C."""
+        pos = lo >> 3
+        end = (hi >> 3) + 1
+        while pos < end:
+            m = _NOT_FULL.search(self._bits, pos, end)
+            if m is None:
+                return None
+            byte_index = m.start()
+            for bit in range(8):
+                port = (byte_index << 3) | bit
+                if lo <= port <= hi and not self._taken(port) and port not in skip:
+                    return port
+            pos = byte_index + 1
+        return None
+
+    def _find_free(self, skip: Set[int]) -> Optional[int]:
+        port = self._scan(self._cursor, self.auto_end, skip)
+        if port is None and self._cursor > self.auto_start:
+            port = self._scan(self.auto_start, self._cursor - 1, skip)
+        return port
+
+    # -- API --
+
+    def claim(self, owner: str, hosts: Iterable[int]) -> List[int]:
+        """
+        Reserva ``hosts`` para ``owner`` (todo o nada). Los ``0`` se reemplazan
+        por puertos libres del rango automático; devuelve la lista resuelta en
+        el mismo orden. Los puertos que ya son de ``owner`` no cuentan como choque.
+        """
+        hosts = list(hosts)
+        with self._lock:
+            wanted = {p for p in hosts if p}
+            for port in wanted:
+                current = self._owner_of.get(port)
+                if current is not None and current != owner:
+                    raise PortUnavailable(port, current, f"Host port {port} already in use by {current}")
+            resolved: List[int] = []
+            picked: Set[int] = set()
+            for port in hosts:
+                if not port:
+                    port = self._find_free(wanted | picked)
+                    if port is None:
+                        raise PortUnavailable(
+                            None, None,
+                            f"No free host ports left in {self.auto_start}-{self.auto_end}",
+                        )
+                    picked.add(port)
+                resolved.append(port)
+            for port in resolved:
+                self._set(port, owner)
+            if picked:
+                self._cursor = max(picked) + 1 if max(picked) < self.auto_end else self.auto_start
+            return resolved
+
+    def replace(self, owner: str, hosts: Iterable[int]) -> List[int]:
+        """Cambia las reservas de ``owner`` por ``hosts``; si hay choque no toca nada."""
+        with self._lock:
+            previous = set(self._ports_of.get(owner, ()))
+            for port in previous:
+                self._clear(port)
+            try:
+                return self.claim(owner, hosts)
+            except PortUnavailable:
+                for port in previous:
+                    self._set(port, owner)
+                raise
+
+    def release(self, owner: str) -> None:
+        with self._lock:
+            for port in list(self._ports_of.get(owner, ())):
+                self._clear(port)
+
+    def rename(self, old: str, new: str) -> None:
+        """Pasa las reservas a otro dueño (p.ej. de un id provisorio al id de la fila)."""
+        with self._lock:
+            for port in list(self._ports_of.get(old, ())):
+                self._clear(port)
+                self._set(port, new)
+
+    def owner_of(self, port: int) -> Optional[str]:
+        return self._owner_of.get(port)
+
+    def load(self, claims: Iterable[Tuple[str, Iterable[int]]]) -> None:
+        """Reemplaza todo el estado con las reservas dadas (reconstrucción)."""
+        with self._lock:
+            self._bits = bytearray(len(self._bits))
+            self._owner_of.clear()
+            self._ports_of.clear()
+            for owner, hosts in claims:
+                for port in hosts:
+                    if not port:
+                        continue
+                    current = self._owner_of.get(port)
+                    if current is not None and current != owner:
+                        log.warning("Host port %s claimed by %s and %s", port, current, owner)
+                        continue
+                    self._set(port, owner)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            auto_used = sum(1 for p in self._owner_of if self.auto_start <= p <= self.auto_end)
+            return {
+                "node": self.node,
+                "claimed": len(self._owner_of),
+                "auto_range": [self.auto_start, self.auto_end],
+                "auto_free": self.auto_end - self.auto_start + 1 - auto_used,
+            }
+
+
+_nodes: Dict[str, PortAllocator] = {}
+_nodes_lock = threading.Lock()
+
+
+def default_node() -> str:
+    return settings.DOCKER_HOST or "local"
+
+
+def allocator(node: Optional[str] = None) -> PortAllocator:
+    node = node or default_node()
+    with _nodes_lock:
+        alloc = _nodes.get(node)
+        if alloc is None:
+            alloc = _nodes[node] = PortAllocator(
+                node, settings.PORTS_AUTO_RANGE_START, settings.PORTS_AUTO_RANGE_END,
+            )
+        return alloc
+
+
+def service_hosts(ports: Optional[list]) -> List[int]:
+    return [p["host"] for p in (ports or [])]
+
+
+def pending_owner() -> str:
+    """Dueño provisorio mientras la fila todavía no tiene id."""
+    return f"pending:{uuid.uuid4().hex}"
+
+
+def claim_mappings(owner: str, mappings: List[dict], *, replace: bool = False) -> List[dict]:
+    """Reserva los puertos de un service (``[{host, container}]``) y los devuelve resueltos."""
+    alloc = allocator()
+    hosts = (alloc.replace if replace else alloc.claim)(owner, service_hosts(mappings))
+    return [{**m, "host": host} for m, host in zip(mappings, hosts)]
+
+
+def claim_bindings(owner: str, bindings: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Reserva los puertos de un contenedor (``{"80/tcp": 8080}``) y los devuelve resueltos."""
+    bindings = bindings or {}
+    hosts = allocator().claim(owner, bindings.values())
+    return dict(zip(bindings, hosts))
+
+
+def rebuild() -> None:
+    """Carga las reservas desde la DB: services vivos + contenedores inline corriendo."""
+    with SessionLocal() as db:
+        claims: List[Tuple[str, List[int]]] = [
+            (service_owner(sid), service_hosts(ports))
+            for sid, ports in db.execute(
+                select(Service.id, Service.ports).where(Service.deleted_at.is_(None))
+            )
+            if ports
+        ]
+        claims += [
+            (container_owner(cid), list(ports.values()))
+            for cid, ports in db.execute(
+                select(Container.id, Container.ports).where(
+                    Container.deleted_at.is_(None),
+                    Container.status == "running",
+                )
+            )
+            if ports
+        ]
+    alloc = allocator()
+    alloc.load(claims)
+    log.info("Host port map rebuilt: %s claims", alloc.snapshot()["claimed"])
@@ -0,0 +1,222 @@
+# src/app/services/quotas.py
+"""
+Cuotas por project (CPU, memoria y cantidad de contenedores).
+
+El uso no se calcula sumando filas en cada create: vive en contadores de
+``project_quotas`` que se actualizan en la misma transacción que inserta o
+borra el contenedor, con un UPDATE condicional (``used + pedido <= max``) que
+es atómico en la DB. Así admitir un contenedor es una lectura/escritura por
+llave primaria. ``repair`` recalcula los contadores cada tanto por si algo
+escribió contenedores por fuera de este camino.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.leases import manager as leases
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.models.containers import Container
+from app.models.quotas import ProjectQuota
+
+log = logging.getLogger("services.quotas")
+
+# holgura para sumas de CPU en coma flotante (0.1 + 0.2 ...)
+CPU_EPSILON = 1e-6
+
+_LIMITS = (
+    ("cpu", "max_cpu", "used_cpu"),
+    ("memory_mb", "max_memory_mb", "used_memory_mb"),
+    ("containers", "max_containers", "used_containers"),
+)
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, project_id: int, resource: str, limit: float, used: float, requested: float):
+        self.project_id = project_id
+        self.resource = resource
+        self.limit = limit
+        self.used = used
+        self.requested = requested
+        super().__init__(
+            f"Project quota exceeded for {resource}: "
+            f"used {used:g} + requested {requested:g} > limit {limit:g}"
+        )
+
+
+def _demand(cpu: Optional[float], memory_mb: Optional[int]) -> Dict[str, float]:
+    return {"cpu": cpu or 0.0, "memory_mb": memory_mb or 0, "containers": 1}
+
+
+def _raise_if_exceeded(quota: ProjectQuota, demand: Dict[str, float]) -> None:
+    for resource, max_attr, used_attr in _LIMITS:
+        limit = getattr(quota, max_attr)
+        used = getattr(quota, used_attr)
+        if limit is not None and used + demand[resource] > limit + CPU_EPSILON:
+            raise QuotaExceeded(quota.project_id, resource, limit, used, demand[resource])
+
+
+def check(db: Session, project_id: Optional[int], cpu: Optional[float], memory_mb: Optional[int]) -> None:
+    """
+    Pre-chequeo de solo lectura antes de llamar a Docker, para no crear un
+    contenedor que después habría que tirar. No reserva nada.
+    """
+    if project_id is None:
+        return
+    quota = db.get(ProjectQuota, project_id)
+    if quota is not None:
+        _raise_if_exceeded(quota, _demand(cpu, memory_mb))
+
+
+def reserve(db: Session, project_id: Optional[int], cpu: Optional[float], memory_mb: Optional[int]) -> None:
+    """
+    Suma el contenedor a los contadores si entra en la cuota. No hace commit:
+    debe ir en la misma transacción que el INSERT del contenedor.
+    """
+    if project_id is None:
+        return
+    demand = _demand(cpu, memory_mb)
+    fits = [
+        or_(
+            getattr(ProjectQuota, max_attr).is_(None),
+            getattr(ProjectQuota, used_attr) + demand[resource]
+            <= getattr(ProjectQuota, max_attr) + CPU_EPSILON,
+        )
+        for resource, max_attr, used_attr in _LIMITS
+    ]
+    stmt = (
+        update(ProjectQuota)
+        .where(ProjectQuota.project_id == project_id, and_(*fits))
+        .values(
+            used_cpu=ProjectQuota.used_cpu + demand["cpu"],
+            used_memory_mb=ProjectQuota.used_memory_mb + demand["memory_mb"],
+            used_containers=ProjectQuota.used_containers + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(stmt).rowcount:
+        return
+    quota = db.get(ProjectQuota, project_id, populate_existing=True)
+    if quota is None:
+        return  # project sin cuota
+    _raise_if_exceeded(quota, demand)
+    # no debería llegar aquí: el UPDATE falló pero la fila actual entra
+    raise QuotaExceeded(project_id, "containers", quota.max_containers or 0, quota.used_containers, 1)
+
+
+def release(db: Session, project_id: Optional[int], cpu: Optional[float], memory_mb: Optional[int]) -> None:
+    """Devuelve lo reservado por un contenedor borrado. No hace commit."""
+    if project_id is None:
+        return
+    demand = _demand(cpu, memory_mb)
+    db.execute(
+        update(ProjectQuota)
+        .where(ProjectQuota.project_id == project_id)
+        .values(
+            used_cpu=ProjectQuota.used_cpu - demand["cpu"],
+            used_memory_mb=ProjectQuota.used_memory_mb - demand["memory_mb"],
+            used_containers=ProjectQuota.used_containers - 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _usage_query():
+    return (
+        select(
+            Container.project_id,
+            func.coalesce(func.sum(Container.cpu), 0.0),
+            func.coalesce(func.sum(Container.memory_mb), 0),
+            func.count(Container.id),
+        )
+        .where(Container.deleted_at.is_(None))
+        .group_by(Container.project_id)
+    )
+
+
+def usage(db: Session, project_id: int) -> Dict[str, float]:
+    """Uso real sumando contenedores (escaneo; solo para configurar y reparar)."""
+    row = db.execute(_usage_query().where(Container.project_id == project_id)).first()
+    _pid, cpu, memory_mb, containers = row or (project_id, 0.0, 0, 0)
+    return {"used_cpu": round(cpu, 6), "used_memory_mb": memory_mb, "used_containers": containers}
+
+
+def set_limits(
+    db: Session,
+    project_id: int,
+    *,
+    max_cpu: Optional[float],
+    max_memory_mb: Optional[int],
+    max_containers: Optional[int],
+) -> ProjectQuota:
+    """Crea o actualiza la cuota; al crearla se inicializan los contadores. Hace commit."""
+    quota = db.get(ProjectQuota, project_id)
+    if quota is None:
+        quota = ProjectQuota(project_id=project_id, **usage(db, project_id))
+        db.add(quota)
+    quota.max_cpu = max_cpu
+    quota.max_memory_mb = max_memory_mb
+    quota.max_containers = max_containers
+    quota.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(quota)
+    return quota
+
+
+def repair_drift() -> int:
+    """
+    Recalcula los contadores de todos los projects con cuota y corrige los que
+    se desviaron. Una sola consulta agregada para todos. Devuelve cuántos corrigió.
+    """
+    repaired = 0
+    with SessionLocal() as db:
+        quotas = {q.project_id: q for q in db.scalars(select(ProjectQuota))}
+        if not quotas:
+            return 0
+        actual = {
+            pid: (round(cpu, 6), memory_mb, containers)
+            for pid, cpu, memory_mb, containers in db.execute(
+                _usage_query().where(Container.project_id.in_(quotas))
+            )
+        }
+        for pid, quota in quotas.items():
+            expected = actual.get(pid, (0.0, 0, 0))
+            current = (round(quota.used_cpu, 6), quota.used_memory_mb, quota.used_containers)
+            if current == expected:
+                continue
+            # solo si nadie tocó los contadores desde que los leímos; si no, la
+            # próxima pasada lo vuelve a intentar
+            fixed = db.execute(
+                update(ProjectQuota)
+                .where(
+                    ProjectQuota.project_id == pid,
+                    ProjectQuota.used_cpu == quota.used_cpu,
+                    ProjectQuota.used_memory_mb == quota.used_memory_mb,
+                    ProjectQuota.used_containers == quota.used_containers,
+                )
+                .values(
+                    used_cpu=expected[0],
+                    used_memory_mb=expected[1],
+                    used_containers=expected[2],
+                    updated_at=datetime.utcnow(),
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if fixed:
+                log.warning("Quota drift on project %s: counters %s, actual %s", pid, current, expected)
+                repaired += 1
+        leases.fence(db, "quota-repair")
+        db.commit()
+    return repaired
+
+
+repair = PeriodicTask(
+    "quota-repair",
+    settings.QUOTA_REPAIR_INTERVAL_SEC,
+    repair_drift,
+    gate=leases.gate("quota-repair"),
+)
@@ -0,0 +1,324 @@
+# src/app/services/rollout.py
+"""
+Rolling update de un service.
+
+Reemplaza por lotes los contenedores corriendo cuyo ``spec_hash`` no coincide
+con el del service (ver ``services.redeploy``). Cada lote tiene
+``max_surge + max_unavailable`` contenedores:
+
+1. se detienen hasta ``max_unavailable`` viejos;
+2. se crean los reemplazos y se espera que queden running (y healthy, si la
+   imagen tiene healthcheck) hasta ``ready_timeout_sec``;
+3. se detienen tantos viejos como reemplazos listos; los viejos sin reemplazo
+   vuelven a arrancar.
+
+Los viejos quedan detenidos (no borrados) hasta el final: el rollback solo
+borra los nuevos y vuelve a arrancar los viejos, sin necesitar la spec
+anterior. La imagen se baja una vez antes de empezar.
+
+Si el service publica puertos del host, un reemplazo no puede correr junto al
+viejo (pedirían el mismo puerto): ``max_surge`` se toma como 0 y cada lote
+detiene primero. Sin ``max_unavailable`` explícito se usa 1; con
+``max_unavailable=0`` explícito no hay forma de avanzar y es un 422.
+
+``tracker`` corre cada rollout en su propio hilo y guarda su estado para
+consultarlo después (el POST responde 202 enseguida). Un rollout por service
+a la vez: otro pedido con los mismos parámetros recibe el que ya corre; con
+parámetros distintos, ``RolloutConflict`` (409). El estado vive en memoria de
+la réplica que lo ejecuta.
+"""
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.engines import docker as dk
+from app.models.containers import Container
+from app.models.service import Service
+from app.schemas.rollout import RolloutBatch, RolloutRequest, RolloutResult, RolloutStatus
+from app.services import deploy, specs
+from app.services.operations import coordinator
+
+log = logging.getLogger("services.rollout")
+
+
+def _stop(db: Session, row: Container) -> None:
+    coordinator.run(row.docker_id, "stop", lambda: deploy.stop_container(db, row))
+
+
+def _start(db: Session, row: Container) -> None:
+    coordinator.run(row.docker_id, "start", lambda: deploy.start_container(db, row))
+
+
+def _remove(db: Session, row: Container) -> None:
+    coordinator.run(row.docker_id, "remove", lambda: deploy.remove_container(db, row, force=True))
+
+
+def _wait_ready(db: Session, rows: List[Container], timeout: float) -> Tuple[List[Container], List[Tuple[Container, str]]]:
+    """Espera a que ``rows`` queden running/healthy; devuelve (listos, [(fallido, motivo)])."""
+    deadline = time.monotonic() + timeout
+    waiting = list(rows)
+    ready: List[Container] = []
+    failed: List[Tuple[Container, str]] = []
+    while waiting:
+        for row in list(waiting):
+            try:
+                state = dk.inspect(row.docker_id)["State"]
+            except Exception as e:
+                waiting.remove(row)
+                failed.append((row, f"inspect failed: {e}"))
+                continue
+            health = (state.get("Health") or {}).get("Status")
+            if state["Status"] in ("exited", "dead") or health == "unhealthy":
+                waiting.remove(row)
+                failed.append((row, f"container {row.id} is {health or state['Status']}"))
+            elif state["Status"] == "running" and health in (None, "healthy"):
+                waiting.remove(row)
+                ready.append(row)
+                if row.status != "running":
+                    row.status = "running"
+                    db.commit()
+        if not waiting:
+            break
+        if time.monotonic() >= deadline:
+            failed += [(row, f"container {row.id} not ready after {timeout:g}s") for row in waiting]
+            break
+        time.sleep(settings.ROLLOUT_POLL_INTERVAL_SEC)
+    return ready, failed
+
+
+def _rollback(db: Session, created: List[Container], stopped: List[Container]) -> None:
+    """Borra los reemplazos y vuelve a arrancar los viejos; sigue aunque alguno falle."""
+    for row in created:
+        try:
+            _remove(db, row)
+        except Exception:
+            log.exception("Rollback: could not remove container %s", row.id)
+    for row in stopped:
+        try:
+            _start(db, row)
+        except Exception:
+            log.exception("Rollback: could not restart container %s", row.id)
+
+
+def _finish(db: Session, stopped: List[Container]) -> None:
+    for row in stopped:
+        try:
+            _remove(db, row)
+        except Exception:
+            # queda detenido y desactualizado: lo retoma un redeploy o el GC
+            log.exception("Rollout: could not remove old container %s", row.id)
+
+
+def batch_limits(compiled: specs.CompiledService, req: RolloutRequest) -> Tuple[int, int]:
+    """``(max_surge, max_unavailable)`` efectivos; ``ValueError`` si el pedido no es posible."""
+    if not compiled.binds_host_ports or req.max_surge == 0:
+        return req.max_surge, req.max_unavailable
+    if "max_unavailable" not in req.model_fields_set:
+        return 0, 1
+    if req.max_unavailable == 0:
+        raise ValueError(
+            "Service publishes host ports: a replacement cannot run next to the old container, "
+            "use max_surge=0 and max_unavailable>=1"
+        )
+    return 0, req.max_unavailable
+
+
+def rollout(db: Session, svc: Service, req: RolloutRequest) -> RolloutResult:
+    """Ejecuta el rolling update; ``ValueError`` (-> 422) si los límites no son posibles."""
+    started = time.perf_counter()
+    if svc.spec_hash is None:
+        # services creados antes de guardar el hash
+        specs.stamp(svc)
+        db.commit()
+    compiled = specs.cache.get(svc)
+    max_surge, max_unavailable = batch_limits(compiled, req)
+    target = compiled.spec.spec_hash
+    result = RolloutResult(service_id=svc.id, spec_hash=target, status="unchanged")
+
+    pending = (
+        db.query(Container)
+        .filter(
+            Container.service_id == svc.id,
+            Container.deleted_at.is_(None),
+            Container.status == "running",
+            (Container.spec_hash != target) | Container.spec_hash.is_(None),
+        )
+        .order_by(Container.id)
+        .all()
+    )
+    if not pending:
+        return result
+
+    created: List[Container] = []   # reemplazos listos
+    stopped: List[Container] = []   # viejos detenidos, se borran al final
+    try:
+        dk.ensure_image(svc.image)
+        batch_size = max_surge + max_unavailable
+        while pending:
+            batch_old, pending = pending[:batch_size], pending[batch_size:]
+            batch = RolloutBatch(old=[row.id for row in batch_old])
+            result.batches.append(batch)
+
+            down = batch_old[:max_unavailable]
+            for row in down:
+                _stop(db, row)
+                stopped.append(row)
+
+            new_rows: List[Container] = []
+            for _ in batch_old:
+                try:
+                    new_rows.append(deploy.create_from_service(db, svc))
+                except Exception as e:
+                    batch.failed.append(str(e) or type(e).__name__)
+            ready, failed = _wait_ready(db, new_rows, req.ready_timeout_sec)
+            created += ready
+            batch.new = [row.id for row in ready]
+            for row, reason in failed:
+                batch.failed.append(reason)
+                _remove(db, row)
+
+            # cada reemplazo listo cubre primero a un viejo ya detenido
+            up = batch_old[len(down):]
+            for row in up[:max(0, len(ready) - len(down))]:
+                _stop(db, row)
+                stopped.append(row)
+            for row in down[len(ready):]:
+                _start(db, row)
+                stopped.remove(row)
+
+            result.replaced += len(ready)
+            result.failures += len(batch.failed)
+            if result.failures >= req.failure_threshold:
+                result.error = f"{result.failures} replacement(s) failed: {batch.failed[-1]}"
+                break
+    except Exception as e:
+        log.warning("Rollout of service %s failed: %s", svc.id, e)
+        result.failures += 1
+        result.error = str(e) or type(e).__name__
+
+    if result.error is None:
+        result.status = "completed"
+        _finish(db, stopped)
+    elif req.rollback:
+        result.status = "rolled_back"
+        result.replaced = 0
+        _rollback(db, created, stopped)
+    else:
+        # sin rollback se conserva lo ya reemplazado: cada viejo detenido tiene un
+        # reemplazo listo salvo los últimos (un lote cortado por una excepción)
+        result.status = "aborted"
+        _finish(db, stopped[:len(created)])
+        _rollback(db, [], stopped[len(created):])
+    result.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+# ---- ejecución en segundo plano ----
+
+class RolloutConflict(Exception):
+    def __init__(self, service_id: int, running: str):
+        self.service_id = service_id
+        self.running = running
+        super().__init__(
+            f"Rollout {running} of service {service_id} is still running with different parameters"
+        )
+
+
+def fingerprint(req: RolloutRequest) -> str:
+    """Parámetros efectivos del pedido; los campos explícitos cuentan (ver ``batch_limits``)."""
+    data = orjson.dumps(
+        {"fields": sorted(req.model_fields_set), **req.model_dump()}, option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class RolloutTracker:
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, RolloutStatus]" = OrderedDict()
+        self._running: Dict[int, Tuple[str, str]] = {}   # service_id -> (rollout id, fingerprint)
+
+    def start(self, service_id: int, req: RolloutRequest) -> Tuple[RolloutStatus, bool]:
+        """
+        Lanza el rollout o devuelve el que ya corre con los mismos parámetros;
+        el bool es False en ese caso. ``RolloutConflict`` si corre con otros.
+        """
+        fp = fingerprint(req)
+        with self._lock:
+            running = self._running.get(service_id)
+            if running is not None:
+                rollout_id, running_fp = running
+                if running_fp != fp:
+                    raise RolloutConflict(service_id, rollout_id)
+                return self._jobs[rollout_id].model_copy(), False
+            job = RolloutStatus(
+                id=uuid.uuid4().hex,
+                service_id=service_id,
+                state="running",
+                request=req,
+                started_at=datetime.utcnow(),
+            )
+            self._jobs[job.id] = job
+            self._running[service_id] = (job.id, fp)
+            snapshot = job.model_copy()
+        # copia del contexto para conservar el request_id en los logs
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run, job),
+            name=f"rollout-{service_id}",
+            daemon=True,
+        ).start()
+        return snapshot, True
+
+    def _run(self, job: RolloutStatus) -> None:
+        result: Optional[RolloutResult] = None
+        error: Optional[str] = None
+        try:
+            with SessionLocal() as db:
+                svc = db.get(Service, job.service_id)
+                if svc is None or svc.deleted_at is not None:
+                    error = "Service was deleted"
+                else:
+                    result = rollout(db, svc, job.request)
+        except Exception as e:
+            log.exception("Rollout %s of service %s failed", job.id, job.service_id)
+            error = str(e) or type(e).__name__
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.state = "failed" if error is not None else "finished"
+            job.finished_at = datetime.utcnow()
+            self._running.pop(job.service_id, None)
+            # historial acotado: se descartan los terminados más viejos
+            finished = [rid for rid, j in self._jobs.items() if j.state != "running"]
+            for rid in finished[:max(0, len(finished) - self.keep)]:
+                del self._jobs[rid]
+
+    def get(self, rollout_id: str) -> Optional[RolloutStatus]:
+        with self._lock:
+            job = self._jobs.get(rollout_id)
+            return job.model_copy() if job is not None else None
+
+    def wait(self, rollout_id: str, timeout: float) -> Optional[RolloutStatus]:
+        """Espera a que termine (pruebas y scripts); devuelve el último estado."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(rollout_id)
+            if job is None or job.state != "running" or time.monotonic() >= deadline:
+                return job
+            time.sleep(0.01)
+
+
+tracker = RolloutTracker(settings.ROLLOUT_HISTORY)
@@ -0,0 +1,129 @@
+# src/app/services/specs.py
+"""
+Cache de specs compiladas por revisión de Service.
+
+Traducir un Service (puertos, recursos, env, cli_hint, HostConfig) al payload
+de Docker se hace una sola vez por revisión: la clave es ``(id, updated_at)``,
+así cualquier cambio guardado en el Service produce una entrada nueva aunque
+nadie invalide. ``update_service`` y el apply igual invalidan para liberar la
+revisión vieja sin esperar al LRU.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.engines import docker as dk
+from app.models.service import Service
+
+
+@dataclass(frozen=True)
+class CompiledService:
+    spec: dk.ContainerSpec
+    cpu: Optional[float]
+    memory_mb: Optional[int]
+    labels: Dict[str, str]
+
+    @property
+    def binds_host_ports(self) -> bool:
+        """Los puertos del host son del service: dos contenedores suyos no pueden correr a la vez."""
+        return bool(self.spec.host_config_args["port_bindings"])
+
+
+def _container_spec(image: str, ports: Optional[List[dict]], env: Optional[Dict[str, str]],
+                    resources: Optional[dict]) -> dk.ContainerSpec:
+    # mapeo de puertos: list[{host, container}] -> {"<container>/tcp": host}
+    ports_map = {f'{p["container"]}/tcp': p["host"] for p in (ports or [])}
+    return dk.compile_spec(
+        image=image,
+        name=None,
+        ports=ports_map,
+        env=env or {},
+        cpu=(resources or {}).get("cpu"),
+        memory_mb=(resources or {}).get("memory_mb"),
+        mounts=None,
+        privileged=False,
+    )
+
+
+def compile_service(svc: Service) -> CompiledService:
+    """Traduce la fila a spec de Docker; ``ValueError`` si el engine la rechaza."""
+    spec = _container_spec(svc.image, svc.ports, svc.env, svc.resources)
+    return CompiledService(
+        spec=spec,
+        cpu=(svc.resources or {}).get("cpu"),
+        memory_mb=(svc.resources or {}).get("memory_mb"),
+        labels=dict(svc.labels or {}),
+    )
+
+
+def spec_hash(*, image: str, ports: Optional[List[dict]], env: Optional[Dict[str, str]],
+              resources: Optional[dict]) -> str:
+    """
+    Hash de la spec efectiva de un service (lo que se guarda en
+    ``Service.spec_hash``); los contenedores llevan el mismo valor como label.
+    Las labels de Kontrolker no entran: no cambian el contenedor en Docker.
+    """
+    return _container_spec(image, ports, env, resources).spec_hash
+
+
+def stamp(svc: Service) -> None:
+    """Recalcula ``svc.spec_hash`` tras cambiar image, puertos, env o recursos."""
+    svc.spec_hash = spec_hash(image=svc.image, ports=svc.ports, env=svc.env, resources=svc.resources)
+
+
+class SpecCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, Optional[datetime]], CompiledService]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, svc: Service) -> CompiledService:
+        key = (svc.id, svc.updated_at)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        # se compila fuera del lock; dos hilos con la misma revisión a lo sumo
+        # compilan dos veces y gana el último
+        compiled = compile_service(svc)
+        if self.max_entries <= 0:
+            return compiled
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return compiled
+
+    def invalidate(self, service_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == service_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+cache = SpecCache(settings.SPEC_CACHE_SIZE)
@@ -0,0 +1,314 @@
+# src/app/services/stats.py
+"""
+Historial de CPU y memoria por contenedor (opt-in con ``STATS_ENABLED``).
+
+Cada ``STATS_INTERVAL_SEC`` una sola pasada pide ``docker stats`` (one-shot) de
+todos los contenedores corriendo en paralelo. El % de CPU sale de la diferencia
+con la muestra anterior del mismo contenedor, así no hace falta la espera de
+un segundo que Docker usa para calcularlo.
+
+Cada contenedor guarda sus muestras en anillos NumPy de tamaño fijo, uno por
+nivel de ``TIERS``: el primero recibe cada muestra; los siguientes, el
+promedio y el máximo por ventana (1 y 10 minutos), acumulados sobre las
+muestras crudas. Las consultas eligen el nivel más fino que cubre el rango
+(incluida la ventana todavía abierta de los niveles agregados) y calculan
+avg/p95/max vectorizado sobre todas las filas juntas. Los anillos se reservan
+con la primera muestra con datos: la primera lectura solo fija contadores.
+
+NumPy se importa con el primer anillo o la primera consulta, no al importar
+el módulo: con ``STATS_ENABLED`` apagado el arranque de cada worker no lo paga.
+
+Los datos viven en memoria del proceso: con varias réplicas cada una muestrea
+los contenedores que le tocan (``leases.owns``) y solo puede responder por ellos.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from app.core.config import settings
+from app.core.leases import manager as leases
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.engines import docker as dk
+from app.models.containers import Container
+
+log = logging.getLogger("services.stats")
+
+# columnas de cada fila
+TS, CPU_AVG, CPU_MAX, MEM_AVG, MEM_MAX = range(5)
+COLUMNS = 5
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    step_sec: int    # 0 = cada muestra tal cual
+    capacity: int
+
+    def span_sec(self, interval_sec: float) -> float:
+        return (self.step_sec or interval_sec) * self.capacity
+
+
+# 10s x 1h, 1m x 1 día, 10m x 7 días
+TIERS = (Tier("10s", 0, 360), Tier("1m", 60, 1440), Tier("10m", 600, 1008))
+TIER_NAMES = tuple(tier.name for tier in TIERS)
+TIER_PATTERN = "^(" + "|".join(TIER_NAMES) + ")$"
+DEFAULT_WINDOW_SEC = 3600
+
+
+class Ring:
+    """Buffer circular de filas ``COLUMNS`` float64; sin asignaciones al agregar."""
+    __slots__ = ("data", "pos", "full")
+
+    def __init__(self, capacity: int):
+        import numpy as np
+        self.data = np.empty((capacity, COLUMNS), dtype=np.float64)
+        self.pos = 0
+        self.full = False
+
+    def push(self, row: Tuple[float, ...]) -> None:
+        self.data[self.pos] = row
+        self.pos += 1
+        if self.pos == len(self.data):
+            self.pos = 0
+            self.full = True
+
+    def ordered(self) -> np.ndarray:
+        import numpy as np
+        if not self.full:
+            return self.data[:self.pos]
+        return np.concatenate((self.data[self.pos:], self.data[:self.pos]))
+
+    def window(self, lo: float, hi: float) -> np.ndarray:
+        rows = self.ordered()
+        ts = rows[:, TS]
+        return rows[(ts >= lo) & (ts <= hi)]
+
+
+class Series:
+    """Anillos por nivel + acumuladores de las ventanas abiertas de un contenedor."""
+    __slots__ = ("rings", "acc", "prev", "last_ts", "last_seen")
+
+    def __init__(self, now: float):
+        self.rings: Optional[List[Ring]] = None   # se reservan con la primera muestra con datos
+        # por nivel agregado: [inicio de ventana, n, suma cpu, máx cpu, suma mem, máx mem]
+        self.acc = [None] * len(TIERS)
+        self.prev: Optional[Tuple[float, float, int]] = None   # contadores de CPU de la muestra anterior
+        self.last_ts = 0.0       # última muestra con datos
+        self.last_seen = now     # última lectura, aunque solo haya fijado contadores
+
+    def add(self, ts: float, cpu: float, mem: float) -> None:
+        if self.rings is None:
+            self.rings = [Ring(tier.capacity) for tier in TIERS]
+        self.last_ts = ts
+        self.rings[0].push((ts, cpu, cpu, mem, mem))
+        for level in range(1, len(TIERS)):
+            step = TIERS[level].step_sec
+            bucket = ts - ts % step
+            acc = self.acc[level]
+            if acc is not None and acc[0] != bucket:
+                start, n, cpu_sum, cpu_max, mem_sum, mem_max = acc
+                self.rings[level].push((start, cpu_sum / n, cpu_max, mem_sum / n, mem_max))
+                acc = None
+            if acc is None:
+                self.acc[level] = [bucket, 1, cpu, cpu, mem, mem]
+            else:
+                acc[1] += 1
+                acc[2] += cpu
+                acc[3] = max(acc[3], cpu)
+                acc[4] += mem
+                acc[5] = max(acc[5], mem)
+
+    def window(self, level: int, lo: float, hi: float) -> np.ndarray:
+        """Filas del nivel en ``[lo, hi]``; en los agregados, también la ventana abierta."""
+        import numpy as np
+        if self.rings is None:
+            return np.empty((0, COLUMNS))
+        rows = self.rings[level].window(lo, hi)
+        acc = self.acc[level]
+        if acc is not None and lo <= acc[0] <= hi:
+            start, n, cpu_sum, cpu_max, mem_sum, mem_max = acc
+            rows = np.vstack((rows, (start, cpu_sum / n, cpu_max, mem_sum / n, mem_max)))
+        return rows
+
+
+def _cpu_counters(raw: dict) -> Tuple[float, float, int]:
+    cpu = raw.get("cpu_stats") or {}
+    usage = cpu.get("cpu_usage") or {}
+    online = cpu.get("online_cpus") or len(usage.get("percpu_usage") or ()) or 1
+    return float(usage.get("total_usage") or 0), float(cpu.get("system_cpu_usage") or 0), online
+
+
+def _memory_mb(raw: dict) -> float:
+    mem = raw.get("memory_stats") or {}
+    detail = mem.get("stats") or {}
+    # como `docker stats`: sin page cache (cgroup v2: inactive_file, v1: cache)
+    cache = detail.get("inactive_file", detail.get("cache", 0))
+    return max(0.0, float(mem.get("usage") or 0) - cache) / (1024 * 1024)
+
+
+class StatsStore:
+    def __init__(self, interval_sec: float):
+        self.interval_sec = interval_sec
+        self._series: Dict[int, Series] = {}
+        self._lock = threading.Lock()
+
+    def record(self, container_id: int, ts: float, raw: dict) -> None:
+        """Muestra cruda de Docker; la primera de cada contenedor solo fija los contadores."""
+        counters = _cpu_counters(raw)
+        mem = _memory_mb(raw)
+        with self._lock:
+            series = self._series.get(container_id)
+            if series is None:
+                series = self._series[container_id] = Series(ts)
+            series.last_seen = ts
+            prev, series.prev = series.prev, counters
+            if prev is None:
+                return
+            cpu_delta = counters[0] - prev[0]
+            system_delta = counters[1] - prev[1]
+            cpu = (cpu_delta / system_delta) * counters[2] * 100 if system_delta > 0 and cpu_delta >= 0 else 0.0
+            series.add(ts, cpu, mem)
+
+    def prune(self, now: float) -> int:
+        """
+        Olvida contenedores sin muestras en todo el rango del último nivel, y
+        los que solo llegaron a fijar contadores y dejaron de verse (borrados
+        tras una sola pasada: rollouts, redeploys, GC).
+        """
+        horizon = now - TIERS[-1].span_sec(self.interval_sec)
+        unseen = now - 3 * self.interval_sec
+        with self._lock:
+            stale = [
+                cid for cid, series in self._series.items()
+                if series.last_seen < (horizon if series.rings is not None else unseen)
+            ]
+            for cid in stale:
+                del self._series[cid]
+        return len(stale)
+
+    def tier_for(self, since: float, now: float) -> int:
+        """Nivel más fino cuyo rango retenido (hasta ``now``) llega a ``since``."""
+        for level, tier in enumerate(TIERS):
+            if now - since <= tier.span_sec(self.interval_sec):
+                return level
+        return len(TIERS) - 1
+
+    def aggregate(
+        self,
+        container_ids: Iterable[int],
+        since: float,
+        until: float,
+        level: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> dict:
+        """avg/p95/max de CPU (%) y memoria (MB) sobre las muestras de ``container_ids``."""
+        import numpy as np
+        if level is None:
+            level = self.tier_for(since, time.time() if now is None else now)
+        with self._lock:
+            chunks = [
+                series.window(level, since, until)
+                for cid in container_ids
+                if (series := self._series.get(cid)) is not None
+            ]
+        chunks = [chunk for chunk in chunks if len(chunk)]
+        rows = np.concatenate(chunks) if chunks else np.empty((0, COLUMNS))
+        return {
+            "tier": TIERS[level].name,
+            "containers": len(chunks),
+            "samples": int(len(rows)),
+            "cpu_percent": _summary(rows[:, CPU_AVG], rows[:, CPU_MAX]),
+            "memory_mb": _summary(rows[:, MEM_AVG], rows[:, MEM_MAX]),
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            containers = len(self._series)
+            with_rings = sum(1 for series in self._series.values() if series.rings is not None)
+        per_container = sum(tier.capacity for tier in TIERS) * COLUMNS * 8
+        return {"containers": containers, "bytes": with_rings * per_container}
+
+
+def _summary(avg: np.ndarray, peak: np.ndarray) -> dict:
+    import numpy as np
+    if not len(avg):
+        return {"avg": None, "p95": None, "max": None}
+    return {
+        "avg": round(float(avg.mean()), 3),
+        "p95": round(float(np.percentile(avg, 95)), 3),
+        "max": round(float(peak.max()), 3),
+    }
+
+
+store = StatsStore(settings.STATS_INTERVAL_SEC)
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def summarize(
+    scope: str,
+    scope_id: int,
+    container_ids: Iterable[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    tier: Optional[str],
+) -> dict:
+    """Cuerpo de ``StatsSummary``; por defecto la última hora, sin zona = UTC."""
+    now = time.time()
+    hi = _epoch(until) if until else now
+    lo = _epoch(since) if since else hi - DEFAULT_WINDOW_SEC
+    level = TIER_NAMES.index(tier) if tier else None
+    return {
+        "scope": scope,
+        "id": scope_id,
+        "since": datetime.fromtimestamp(lo, tz=timezone.utc),
+        "until": datetime.fromtimestamp(hi, tz=timezone.utc),
+        **store.aggregate(container_ids, lo, hi, level, now=now),
+    }
+
+
+# ---- recolección ----
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def sample() -> None:
+    """Una pasada: stats de todos los contenedores corriendo de esta réplica, en paralelo."""
+    global _pool
+    with SessionLocal() as db:
+        candidates = (
+            db.query(Container.id, Container.docker_id)
+            .filter(Container.deleted_at.is_(None), Container.status == "running")
+            .all()
+        )
+    mine: List[Tuple[int, str]] = [
+        (cid, docker_id) for cid, docker_id in candidates if leases.owns(("container", cid))
+    ]
+    now = time.time()
+    if mine:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.STATS_COLLECT_WORKERS, thread_name_prefix="stats")
+        futures = {cid: _pool.submit(dk.stats, docker_id) for cid, docker_id in mine}
+        for cid, future in futures.items():
+            try:
+                store.record(cid, now, future.result())
+            except Exception as e:
+                log.debug("Stats of container %s failed: %s", cid, e)
+    store.prune(now)
+
+
+collector = PeriodicTask("stats-collector", settings.STATS_INTERVAL_SEC, sample, initial_delay_sec=0)
@@ -0,0 +1,117 @@
+# src/app/tests/conftest.py
+"""
+Fixtures comunes: DB SQLite temporal y un Docker falso con las mismas firmas
+que ``app.engines.docker``, así las pruebas corren sin daemon.
+
+Las variables de entorno se fijan antes de importar ``app``: ``settings`` y el
+engine de la DB se crean al importar.
+"""
+import itertools
+import os
+import tempfile
+import threading
+
+_tmp = tempfile.mkdtemp(prefix="kontrolker-tests-")
+os.environ["DB_URL"] = f"sqlite:///{_tmp}/kontrolker.db"
+os.environ["DB_INIT_LOCK"] = os.path.join(_tmp, "db-init.lock")
+os.environ["LOGS_DIR"] = os.path.join(_tmp, "logs")
+os.environ["LOG_JSON"] = "false"
+
+import pytest  # noqa: E402
+
+
+class FakeDocker:
+    """Registra las llamadas y responde como un daemon sano."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.calls = []
+        self.logs = {}      # docker_id -> bytes que devuelve ``logs``
+        self.fail = {}      # operación -> excepción a lanzar
+
+    def _call(self, op, *args):
+        with self._lock:
+            self.calls.append((op, *args))
+        exc = self.fail.get(op)
+        if exc is not None:
+            raise exc
+
+    def ops(self, op):
+        return [c for c in self.calls if c[0] == op]
+
+    def install(self, monkeypatch):
+        from app.engines import docker as dk
+
+        def create_from_spec(spec):
+            self._call("create", spec)
+            with self._lock:
+                n = next(self._ids)
+            return dk.CreateResult(
+                docker_id=f"{n:064x}",
+                name=spec.name or f"test-{n}",
+                status="running",
+                cli_hint=spec.cli_hint,
+            )
+
+        def logs(container_id, since=None):
+            self._call("logs", container_id, since)
+            return self.logs.get(container_id, b"")
+
+        monkeypatch.setattr(dk, "create_from_spec", create_from_spec)
+        monkeypatch.setattr(dk, "create_and_start", lambda **kw: create_from_spec(dk.compile_spec(**kw)))
+        for op in ("start", "stop", "restart"):
+            monkeypatch.setattr(dk, op, (lambda op: lambda cid: self._call(op, cid))(op))
+        monkeypatch.setattr(dk, "remove", lambda cid, force=False, missing_ok=False: self._call("remove", cid))
+        monkeypatch.setattr(dk, "remove_image", lambda image: False)
+        monkeypatch.setattr(dk, "ping", lambda timeout: None)
+        monkeypatch.setattr(dk, "ensure_image", lambda image: self._call("pull", image))
+        monkeypatch.setattr(dk, "logs", logs)
+        monkeypatch.setattr(dk, "stats", lambda cid: {"cpu_stats": {}, "memory_stats": {}})
+        monkeypatch.setattr(dk, "inspect", lambda cid: {"Id": cid, "State": {"Status": "running"}})
+        monkeypatch.setattr(dk, "list_containers", lambda *, all_=False, filters=None: [
+            {"Id": cid, "State": "running", "Status": "Up"} for cid in (filters or {}).get("id", [])
+        ])
+
+
+@pytest.fixture(scope="session")
+def docker():
+    mp = pytest.MonkeyPatch()
+    fake = FakeDocker()
+    fake.install(mp)
+    yield fake
+    mp.undo()
+
+
+@pytest.fixture(scope="session")
+def _app_client(docker):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services import events
+
+    with TestClient(app) as client:
+        # sin el hilo del writer: las pruebas escriben los eventos con flush()
+        events.writer.stop()
+        yield client
+
+
+@pytest.fixture
+def client(_app_client, docker):
+    """Cliente con la DB vacía y el mapa de puertos/caches reiniciados."""
+    from app.core.leases import manager as leases
+    from app.db.session import engine
+    from app.models import Base
+    from app.services import events, ports, specs
+
+    events.writer.flush()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    leases.tick()  # vuelve a tomar los leases borrados: fence() los pide
+    ports.rebuild()
+    specs.cache.clear()
+    docker.calls.clear()
+    docker.logs.clear()
+    docker.fail.clear()
+    return _app_client
@@ -0,0 +1,81 @@
+# src/app/tests/test_admission.py
+import threading
+
+import pytest
+
+from app.core.admission import AdmissionController, AdmissionRejected
+
+
+def _controller(**overrides):
+    kwargs = dict(limits={"create": 1}, project_limit=1, queue_max=1, timeout_sec=0.05, waiters_max=8)
+    kwargs.update(overrides)
+    return AdmissionController(**kwargs)
+
+
+def test_wait_timeout_and_queue_full():
+    ctl = _controller()
+    with ctl.acquire("create"):
+        with pytest.raises(AdmissionRejected) as exc:
+            with ctl.acquire("create"):
+                pass
+        assert exc.value.status_code == 503
+
+        # la cola (1) ocupada por otro hilo: 429 sin esperar
+        ctl.timeout_sec = 2
+        t = threading.Thread(target=lambda: ctl.acquire("create").__enter__())
+        t.start()
+        while ctl._ops["create"].waiting == 0:
+            pass
+        with pytest.raises(AdmissionRejected) as exc:
+            with ctl.acquire("create"):
+                pass
+        assert exc.value.status_code == 429
+        assert exc.value.reason == "queue full"
+    t.join()
+
+
+def test_global_waiter_budget():
+    ctl = _controller(waiters_max=8)
+    ctl.fit_threadpool(4)
+    assert ctl.waiters.limit == 2
+
+
+def test_idle_project_limiters_are_evicted():
+    ctl = _controller(limits={})
+    for project_id in range(100):
+        with ctl.acquire("create", project_id):
+            assert project_id in ctl._projects
+    assert ctl._projects == {}
+    assert ctl.snapshot()["projects"] == {}
+
+
+def test_project_limiter_is_kept_while_someone_waits():
+    ctl = _controller(limits={}, timeout_sec=2)
+    holding = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def holder():
+        with ctl.acquire("start", 7):
+            holding.set()
+            release.wait(2)
+
+    def waiter():
+        with ctl.acquire("start", 7):
+            results.append(ctl._projects[7].active)
+
+    t1 = threading.Thread(target=holder)
+    t1.start()
+    holding.wait()
+    t2 = threading.Thread(target=waiter)
+    t2.start()
+    while 7 not in ctl._projects or ctl._projects[7].waiting == 0:
+        pass
+    limiter = ctl._projects[7]
+    release.set()
+    t1.join()
+    t2.join()
+    # el que esperaba usó el mismo limitador (límite 1 respetado) y después se descartó
+    assert results == [1]
+    assert limiter.admitted == 2
+    assert 7 not in ctl._projects
@@ -0,0 +1,123 @@
+# src/app/tests/test_apply.py
+import pytest
+
+from app.services import apply
+from app.services.apply import SpecError
+
+STACK = """
+services:
+  db:
+    image: postgres:16
+    ports: [{host: 5432, container: 5432}]
+  cache:
+    image: redis:7
+  api:
+    image: acme/api:1.4
+    replicas: 2
+    depends_on: [db, cache]
+  proxy:
+    image: nginx:latest
+    ports: [{host: 0, container: 80}]
+    depends_on: [api]
+"""
+
+
+def _specs(text):
+    return apply.parse_spec(text, project_id=1)
+
+
+def _project(client, name="p"):
+    return client.post("/api/v1/projects", json={"name": name}).json()["id"]
+
+
+def _apply(client, pid, text, **params):
+    return client.post(
+        f"/api/v1/projects/{pid}/apply", content=text,
+        headers={"content-type": "application/yaml"}, params=params,
+    )
+
+
+def test_waves_follow_dependencies():
+    assert apply.build_waves(_specs(STACK)) == [["cache", "db"], ["api"], ["proxy"]]
+
+
+@pytest.mark.parametrize("text, detail", [
+    ("services:\n  a: {image: x, depends_on: [b]}\n  b: {image: x, depends_on: [a]}\n", "cycle between: a, b"),
+    ("services:\n  a: {image: x, depends_on: [ghost]}\n", "Unknown dependency 'ghost'"),
+    ("services:\n  a: {image: x, depends_on: [a]}\n", "cannot depend on itself"),
+])
+def test_invalid_dependency_graphs(text, detail):
+    with pytest.raises(SpecError) as exc:
+        apply.build_waves(_specs(text))
+    assert detail in exc.value.errors[0]["detail"]
+
+
+@pytest.mark.parametrize("text", [
+    "services: [",
+    "services: {}\n",
+    "services:\n  a: nope\n",
+    "services:\n  a: {image: x, replicas: 2, ports: [{host: 8080, container: 80}]}\n",
+])
+def test_invalid_specs(text):
+    with pytest.raises(SpecError):
+        _specs(text)
+
+
+def test_apply_creates_by_waves_and_is_idempotent(client, docker):
+    pid = _project(client)
+    dry = _apply(client, pid, STACK, dry_run=True).json()
+    assert [s["action"] for s in dry["steps"]] == ["create"] * 4
+    assert client.get("/api/v1/services").json() == []
+
+    r = _apply(client, pid, STACK)
+    assert r.status_code == 200, r.text
+    steps = {s["service"]: s for s in r.json()["steps"]}
+    assert all(s["status"] == "applied" for s in steps.values())
+    assert len(steps["api"]["container_ids"]) == 2
+    assert len(docker.ops("create")) == 5
+    proxy = client.get(f"/api/v1/services/{steps['proxy']['service_id']}").json()
+    auto_port = proxy["ports"][0]["host"]
+    assert auto_port != 0
+
+    again = _apply(client, pid, STACK).json()
+    assert {s["action"] for s in again["steps"]} == {"unchanged"}
+    assert len(docker.ops("create")) == 5
+    # el puerto automático se conserva entre applies
+    proxy = client.get(f"/api/v1/services/{steps['proxy']['service_id']}").json()
+    assert proxy["ports"][0]["host"] == auto_port
+
+    changed = _apply(client, pid, STACK.replace("redis:7", "redis:8")).json()
+    cache = next(s for s in changed["steps"] if s["service"] == "cache")
+    assert (cache["action"], cache["changes"]) == ("update", ["image"])
+
+
+def test_host_port_conflicts_are_409(client):
+    other = _project(client, "other")
+    client.post("/api/v1/services", json={
+        "project_id": other, "name": "pg", "image": "postgres", "ports": [{"host": 5432, "container": 5432}],
+    })
+    pid = _project(client)
+    r = _apply(client, pid, STACK)
+    assert r.status_code == 409
+    assert r.json()["detail"][0]["service"] == "db"
+
+    twice = "services:\n  a: {image: x, ports: [{host: 9000, container: 80}]}\n" \
+            "  b: {image: x, ports: [{host: 9000, container: 81}]}\n"
+    r = _apply(client, pid, twice)
+    assert r.status_code == 409
+    assert "also requested" in r.json()["detail"][0]["detail"]
+
+
+def test_failed_service_skips_its_dependents(client, docker):
+    pid = _project(client)
+    docker.fail["create"] = RuntimeError("no space left")
+    steps = {s["service"]: s for s in _apply(client, pid, STACK).json()["steps"]}
+    assert steps["db"]["status"] == "failed"
+    assert steps["api"]["status"] == "skipped"
+    assert steps["proxy"]["status"] == "skipped"
+    assert "api" in steps["proxy"]["error"]
+
+
+def test_apply_to_missing_project(client):
+    assert _apply(client, 999, STACK).status_code == 404
+    assert _apply(client, _project(client), "services: [").status_code == 422
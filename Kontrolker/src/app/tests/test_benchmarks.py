@@ -0,0 +1,46 @@
+# src/app/tests/test_benchmarks.py
+"""Humo de la suite de benchmarks: corre con un dataset mínimo y detecta regresiones."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+BENCH_API = ROOT / "benchmarks" / "bench_api.py"
+
+
+def _run(tmp_path, name, *args):
+    # cada corrida siembra su propio dataset en una DB nueva
+    env = dict(os.environ)
+    env.update(
+        DB_URL=f"sqlite:///{tmp_path}/{name}.db",
+        DB_INIT_LOCK=str(tmp_path / "init.lock"),
+        LOGS_DIR=str(tmp_path / "logs"),
+    )
+    return subprocess.run(
+        [sys.executable, str(BENCH_API), "--projects", "2", "--services", "2", "--containers", "1",
+         "--requests", "5", "--warmup", "1", "--out", str(tmp_path / f"{name}.json"), *args],
+        env=env, cwd=ROOT, capture_output=True, text=True, timeout=300,
+    )
+
+
+def test_bench_api_runs_every_scenario_and_flags_regressions(tmp_path):
+    proc = _run(tmp_path, "first")
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads((tmp_path / "first.json").read_text())
+    assert report["meta"]["dataset"]["projects"] == 2
+    assert report["results"]
+    for name, result in report["results"].items():
+        assert result["requests"] == 5, name
+        assert result["errors"] == 0, name
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+    # una referencia imposible de igualar: todos los escenarios son regresión
+    for result in report["results"].values():
+        result["p95_ms"] = 0.001
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+    proc = _run(tmp_path, "second", "--baseline", str(baseline))
+    assert proc.returncode == 1
+    assert "REGRESSION" in proc.stdout
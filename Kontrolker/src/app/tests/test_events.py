@@ -0,0 +1,104 @@
+# src/app/tests/test_events.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.session import SessionLocal
+from app.models.events import ContainerEvent
+from app.services import events
+from app.services.events import SOURCE_API, SOURCE_DOCKER, EventWriter
+
+
+@pytest.fixture
+def container(client):
+    r = client.post("/api/v1/containers", json={"image": "nginx"})
+    assert r.status_code == 201, r.text
+    events.writer.flush()
+    with SessionLocal() as db:
+        db.query(ContainerEvent).delete()
+        db.commit()
+    return r.json()
+
+
+def _event(container, action, source, at, to_status=None):
+    return {
+        "container_id": container["id"] if source != SOURCE_DOCKER else None,
+        "docker_id": container["docker_id"],
+        "service_id": None,
+        "project_id": None,
+        "action": action,
+        "from_status": None,
+        "to_status": to_status,
+        "source": source,
+        "created_at": at,
+    }
+
+
+def _stored():
+    with SessionLocal() as db:
+        return sorted(
+            (source, action)
+            for source, action in db.query(ContainerEvent.source, ContainerEvent.action)
+        )
+
+
+def test_docker_echoes_of_api_actions_are_dropped(container, client):
+    writer = EventWriter(batch_size=100, flush_interval_sec=1, max_queue=100, dedupe_window_sec=5)
+    now = datetime.utcnow()
+    # Docker informa antes de que la API registre el stop
+    for action in ("kill", "die", "stop"):
+        writer.put(_event(container, action, SOURCE_DOCKER, now - timedelta(seconds=0.2)))
+    writer.put(_event(container, "stop", SOURCE_API, now))
+    # un crash un minuto después no es eco de nada
+    writer.put(_event(container, "die", SOURCE_DOCKER, now + timedelta(seconds=60)))
+    writer.flush()
+
+    assert _stored() == [(SOURCE_API, "stop"), (SOURCE_DOCKER, "die")]
+    assert writer.echoes == 3
+    counts = client.get("/api/v1/events/counts", params={"container_id": container["id"]}).json()["counts"]
+    assert counts == {"stop": 1, "die": 1}
+
+
+def test_echo_of_an_already_stored_api_event_is_dropped(container):
+    writer = EventWriter(batch_size=100, flush_interval_sec=1, max_queue=100, dedupe_window_sec=5)
+    now = datetime.utcnow()
+    writer.put(_event(container, "restart", SOURCE_API, now))
+    writer.flush()
+    for action in ("kill", "die", "stop", "start", "restart"):
+        writer.put(_event(container, action, SOURCE_DOCKER, now + timedelta(seconds=1)))
+    writer.flush()
+
+    assert _stored() == [(SOURCE_API, "restart")]
+
+
+def test_docker_events_wait_for_the_window(container):
+    writer = EventWriter(batch_size=100, flush_interval_sec=1, max_queue=100, dedupe_window_sec=5)
+    recent = _event(container, "start", SOURCE_DOCKER, datetime.utcnow())
+    old = _event(container, "die", SOURCE_DOCKER, datetime.utcnow() - timedelta(seconds=10))
+    api = _event(container, "stop", SOURCE_API, datetime.utcnow())
+    assert writer._ready([recent, old, api]) == [api, old]
+    assert writer._ready([], force=True) == [recent]
+
+
+def test_without_window_both_sources_are_kept(container):
+    writer = EventWriter(batch_size=100, flush_interval_sec=1, max_queue=100)
+    now = datetime.utcnow()
+    writer.put(_event(container, "start", SOURCE_API, now))
+    writer.put(_event(container, "start", SOURCE_DOCKER, now))
+    writer.flush()
+    assert _stored() == [(SOURCE_API, "start"), (SOURCE_DOCKER, "start")]
+
+
+def test_events_of_unknown_containers_are_discarded(container):
+    writer = EventWriter(batch_size=100, flush_interval_sec=1, max_queue=100)
+    writer.put({**_event(container, "start", SOURCE_DOCKER, datetime.utcnow()), "docker_id": "not-ours"})
+    assert writer.flush() == 0
+
+
+def test_api_transitions_are_recorded(client):
+    cid = client.post("/api/v1/containers", json={"image": "nginx"}).json()["id"]
+    client.post(f"/api/v1/containers/{cid}/stop")
+    client.post(f"/api/v1/containers/{cid}/start")
+    events.writer.flush()
+    r = client.get("/api/v1/events", params={"container_id": cid})
+    assert [e["action"] for e in r.json()] == ["start", "stop", "create"]
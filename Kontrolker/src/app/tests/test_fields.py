@@ -0,0 +1,66 @@
+# src/app/tests/test_fields.py
+from sqlalchemy import event
+
+from app.db.session import engine
+
+
+def _selects(client, url, **params):
+    """Respuesta + SELECTs emitidos para ``url``."""
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        r = client.get(url, params=params)
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+    return r, statements
+
+
+def _seed(client):
+    pid = client.post("/api/v1/projects", json={"name": "p", "labels": {"env": "prod"}}).json()["id"]
+    sid = client.post("/api/v1/services", json={
+        "project_id": pid, "name": "web", "image": "nginx", "env": {"A": "1"},
+    }).json()["id"]
+    cid = client.post("/api/v1/containers", json={"service_id": sid}).json()["id"]
+    return pid, sid, cid
+
+
+def test_unrequested_columns_are_not_read(client):
+    pid, _, _ = _seed(client)
+    r, statements = _selects(client, "/api/v1/projects", fields="id,name")
+    assert r.json() == [{"id": pid, "name": "p"}]
+    projection = [s for s in statements if "FROM projects" in s]
+    assert projection and all("labels" not in s.split("FROM")[0] for s in projection)
+
+
+def test_item_endpoints_accept_fields(client):
+    pid, sid, cid = _seed(client)
+    assert client.get(f"/api/v1/projects/{pid}", params={"fields": "name"}).json() == {"name": "p"}
+    assert client.get(f"/api/v1/services/{sid}", params={"fields": "image,env"}).json() == {
+        "image": "nginx", "env": {"A": "1"},
+    }
+    assert client.get(f"/api/v1/containers/{cid}", params={"fields": "service_id"}).json() == {"service_id": sid}
+    # sin fields la respuesta completa no cambia
+    assert "labels" in client.get(f"/api/v1/projects/{pid}").json()
+    assert client.get("/api/v1/projects/999", params={"fields": "name"}).status_code == 404
+
+
+def test_fields_outside_the_table_use_the_schema_default(client):
+    _, _, cid = _seed(client)
+    r = client.get("/api/v1/containers", params={"fields": "cli_hint"})
+    assert r.json() == [{"cli_hint": None}]
+    assert client.get(f"/api/v1/containers/{cid}", params={"fields": "cli_hint"}).json() == {"cli_hint": None}
+
+
+def test_list_endpoints_accept_fields(client):
+    _, sid, cid = _seed(client)
+    assert client.get("/api/v1/services", params={"fields": "id"}).json() == [{"id": sid}]
+    assert client.get("/api/v1/containers", params={"fields": "id"}).json() == [{"id": cid}]
+    for url in ("/api/v1/services", "/api/v1/containers", f"/api/v1/containers/{cid}"):
+        r = client.get(url, params={"fields": "id,bogus"})
+        assert r.status_code == 422
+        assert "bogus" in r.json()["detail"]
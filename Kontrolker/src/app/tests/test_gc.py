@@ -0,0 +1,121 @@
+# src/app/tests/test_gc.py
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.engines import docker as dk
+from app.models.containers import Container
+from app.models.labels import ResourceLabel
+from app.models.project import Project
+from app.services import gc
+
+
+@pytest.fixture
+def removed_images(monkeypatch):
+    removed = []
+    monkeypatch.setattr(dk, "remove_image", lambda image: removed.append(image) or True)
+    gc._images_done.clear()
+    yield removed
+    gc._images_done.clear()
+
+
+def _project(client, name="p", **extra):
+    return client.post("/api/v1/projects", json={"name": name, **extra}).json()["id"]
+
+
+def _container(client, pid, image="nginx", **extra):
+    r = client.post("/api/v1/containers", json={"image": image, "project_id": pid, **extra})
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def _age(model, row_id, **columns):
+    with SessionLocal() as db:
+        row = db.get(model, row_id)
+        for name, value in columns.items():
+            setattr(row, name, value)
+        db.commit()
+
+
+def test_containers_of_deleted_projects_are_reaped(client, docker):
+    pid = _project(client)
+    c = _container(client, pid)
+    keep = _container(client, _project(client, "other"))
+    assert client.delete(f"/api/v1/projects/{pid}").status_code == 204
+
+    assert gc.reap_orphaned_containers() == 1
+    assert [call[1] for call in docker.ops("remove")] == [c["docker_id"]]
+    assert client.get(f"/api/v1/containers/{c['id']}").status_code == 404
+    assert client.get(f"/api/v1/containers/{keep['id']}").status_code == 200
+    assert gc.reap_orphaned_containers() == 0
+
+
+def test_only_old_exited_containers_are_reaped(client, docker):
+    pid = _project(client)
+    old, recent = _container(client, pid), _container(client, pid)
+    for c in (old, recent):
+        client.post(f"/api/v1/containers/{c['id']}/stop")
+    _age(Container, old["id"], updated_at=datetime.utcnow() - timedelta(hours=settings.GC_EXITED_TTL_HOURS + 1))
+
+    assert gc.reap_exited_containers() == 1
+    assert client.get(f"/api/v1/containers/{old['id']}").status_code == 404
+    assert client.get(f"/api/v1/containers/{recent['id']}").status_code == 200
+    assert gc.reap_exited_containers(ttl_hours=0) == 0
+
+
+def test_only_images_kontrolker_stopped_using_are_removed(client, removed_images):
+    pid = _project(client)
+    gone = _container(client, pid, image="old:1")
+    _container(client, pid, image="shared:1")
+    shared_gone = _container(client, pid, image="shared:1")
+    for c in (gone, shared_gone):
+        client.post(f"/api/v1/containers/{c['id']}/stop")
+        client.delete(f"/api/v1/containers/{c['id']}")
+
+    assert gc.remove_unused_images() == 1
+    assert removed_images == ["old:1"]
+    # no se reintenta en cada pasada
+    assert gc.remove_unused_images() == 0
+
+
+def test_purge_deletes_old_soft_deleted_rows_with_labels(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "GC_ARCHIVE_DIR", str(tmp_path))
+    old = _project(client, "old", labels={"team": "a"})
+    recent = _project(client, "recent", labels={"team": "a"})
+    for pid in (old, recent):
+        client.delete(f"/api/v1/projects/{pid}")
+    _age(Project, old, deleted_at=datetime.utcnow() - timedelta(days=settings.GC_PURGE_AFTER_DAYS + 1))
+
+    assert gc.purge_soft_deleted() == {"containers": 0, "services": 0, "projects": 1}
+    with SessionLocal() as db:
+        assert db.get(Project, old) is None
+        assert db.get(Project, recent) is not None
+        assert {row.resource_id for row in db.query(ResourceLabel)} == {recent}
+    archived = [orjson.loads(line) for line in (tmp_path / "projects.jsonl").read_bytes().splitlines()]
+    assert [row["name"] for row in archived] == ["old"]
+
+
+def test_purge_keeps_parents_still_referenced(client):
+    pid = _project(client)
+    c = _container(client, pid)
+    client.delete(f"/api/v1/projects/{pid}")
+    _age(Project, pid, deleted_at=datetime.utcnow() - timedelta(days=settings.GC_PURGE_AFTER_DAYS + 1))
+    # el contenedor sigue vivo hasta que lo recoja el GC: el project no se purga
+    assert gc.purge_soft_deleted()["projects"] == 0
+
+    gc.reap_orphaned_containers()
+    _age(Container, c["id"], deleted_at=datetime.utcnow() - timedelta(days=settings.GC_PURGE_AFTER_DAYS + 1))
+    assert gc.purge_soft_deleted() == {"containers": 1, "services": 0, "projects": 1}
+
+
+def test_a_failing_step_does_not_stop_the_pass(client, monkeypatch, removed_images):
+    def down():
+        raise RuntimeError("daemon down")
+
+    monkeypatch.setattr(gc, "reap_orphaned_containers", down)
+    report = gc.collect()
+    assert report["orphaned_containers"] == {"error": "daemon down"}
+    assert report["purged"] == {"containers": 0, "services": 0, "projects": 0}
@@ -0,0 +1,60 @@
+# src/app/tests/test_health.py
+from datetime import datetime, timedelta
+
+from app.core import health
+
+
+def _down(timeout=None):
+    raise ConnectionError("daemon unreachable")
+
+
+def test_readiness_needs_a_fresh_probe(docker):
+    prober = health.HealthProber(interval_sec=60, docker_slow_ms=1000, stale_after_sec=30)
+    assert prober.readiness() == (False, "starting")
+
+    prober.probe()
+    assert prober.readiness() == (True, health.OK)
+    assert set(prober.snapshot()) == {"db", "docker"}
+
+    for result in prober._results.values():
+        result.checked_at = datetime.utcnow() - timedelta(seconds=31)
+    assert prober.readiness() == (False, "stale")
+
+
+def test_slow_docker_is_degraded_but_ready(docker):
+    prober = health.HealthProber(interval_sec=60, docker_slow_ms=-1, stale_after_sec=30)
+    prober.probe()
+    assert prober.snapshot()["docker"]["status"] == health.DEGRADED
+    assert prober.readiness() == (True, health.DEGRADED)
+
+
+def test_failed_check_is_down(monkeypatch):
+    monkeypatch.setattr(health, "_check_docker", _down)
+    prober = health.HealthProber(interval_sec=60, docker_slow_ms=1000, stale_after_sec=30)
+    prober.probe()
+    docker = prober.snapshot()["docker"]
+    assert docker["status"] == health.DOWN
+    assert docker["error"] == "daemon unreachable"
+    assert prober.readiness() == (False, "docker down")
+
+
+def test_endpoints_read_the_cache(client, monkeypatch):
+    health.prober.stop()   # sin el hilo, la cache solo cambia con probe()
+    health.prober.probe()
+    assert client.get("/readyz").status_code == 200
+    assert client.get("/health").json()["docker"] is True
+
+    monkeypatch.setattr(health, "_check_docker", _down)
+    try:
+        # sin volver a probar, los endpoints siguen respondiendo lo cacheado
+        assert client.get("/readyz").status_code == 200
+        health.prober.probe()
+        r = client.get("/readyz")
+        assert r.status_code == 503
+        assert r.json()["status"] == "docker down"
+        assert client.get("/health").status_code == 503
+        # liveness no depende de Docker ni de la DB
+        assert client.get("/livez").status_code == 200
+    finally:
+        monkeypatch.undo()
+        health.prober.start()
@@ -0,0 +1,109 @@
+# src/app/tests/test_idempotency.py
+from datetime import datetime, timedelta
+
+from app.core import idempotency
+from app.db.session import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+
+def _post(client, key, body, path="/api/v1/projects"):
+    return client.post(path, json=body, headers={idempotency.HEADER: key})
+
+
+def _keys():
+    with SessionLocal() as db:
+        return {row.key: row.status_code for row in db.query(IdempotencyKey)}
+
+
+def test_same_key_replays_the_stored_response(client):
+    first = _post(client, "k1", {"name": "a"})
+    assert first.status_code == 201, first.text
+    assert idempotency.REPLAYED_HEADER not in first.headers
+
+    again = _post(client, "k1", {"name": "a"})
+    assert again.status_code == 201
+    assert again.headers[idempotency.REPLAYED_HEADER] == "true"
+    assert again.json() == first.json()
+    # no se ejecutó de nuevo: sigue habiendo un solo project
+    assert [p["name"] for p in client.get("/api/v1/projects").json()] == ["a"]
+    assert _keys() == {"k1": 201}
+
+
+def test_same_key_with_another_request_is_rejected(client):
+    assert _post(client, "k1", {"name": "a"}).status_code == 201
+
+    r = _post(client, "k1", {"name": "b"})
+    assert r.status_code == 422
+    assert "different request" in r.json()["detail"]
+    # otra ruta con la misma key tampoco es el mismo request
+    assert _post(client, "k1", {"name": "a"}, path="/api/v1/services").status_code == 422
+    assert [p["name"] for p in client.get("/api/v1/projects").json()] == ["a"]
+
+
+def test_key_in_progress_gets_409(client):
+    body = b'{"name":"a"}'
+    fp = idempotency.fingerprint("POST", "/api/v1/projects", b"", body)
+    assert idempotency.claim("k1", fp) is None   # otro request la tiene tomada
+
+    r = client.post(
+        "/api/v1/projects", content=body,
+        headers={idempotency.HEADER: "k1", "content-type": "application/json"},
+    )
+    assert r.status_code == 409
+    assert r.headers["retry-after"] == "1"
+    assert client.get("/api/v1/projects").json() == []
+
+    # al terminar el original, los reintentos reciben su respuesta
+    idempotency.complete("k1", 201, "application/json", b'{"id":7}')
+    r = client.post(
+        "/api/v1/projects", content=body,
+        headers={idempotency.HEADER: "k1", "content-type": "application/json"},
+    )
+    assert r.status_code == 201
+    assert r.json() == {"id": 7}
+
+
+def test_abandoned_key_can_be_claimed_again(client):
+    fp = idempotency.fingerprint("POST", "/api/v1/projects", b"", b"{}")
+    assert idempotency.claim("k1", fp) is None
+    with SessionLocal() as db:
+        db.get(IdempotencyKey, "k1").expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+    assert idempotency.claim("k1", fp) is None
+
+
+def test_error_responses_release_the_key(client):
+    _post(client, "other", {"name": "taken"})
+    r = _post(client, "k1", {"name": "taken"})
+    assert r.status_code == 409
+    assert "k1" not in _keys()
+
+    # el reintento se vuelve a ejecutar (y con otro body ya no es un 422)
+    r = _post(client, "k1", {"name": "free"})
+    assert r.status_code == 201
+    assert idempotency.REPLAYED_HEADER not in r.headers
+
+
+def test_key_length_is_checked(client):
+    assert _post(client, "x" * 256, {"name": "a"}).status_code == 400
+    assert _post(client, "x" * 255, {"name": "a"}).status_code == 201
+
+
+def test_requests_without_key_or_outside_create_paths_pass_through(client):
+    assert client.post("/api/v1/projects", json={"name": "a"}).status_code == 201
+    pid = client.get("/api/v1/projects").json()[0]["id"]
+    r = client.get(f"/api/v1/projects/{pid}", headers={idempotency.HEADER: "k1"})
+    assert r.status_code == 200
+    assert _keys() == {}
+
+
+def test_purge_removes_only_expired_keys(client):
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.add_all([
+            IdempotencyKey(key="old", fingerprint="f", status_code=201, created_at=now, expires_at=now - timedelta(hours=1)),
+            IdempotencyKey(key="new", fingerprint="f", status_code=201, created_at=now, expires_at=now + timedelta(hours=1)),
+        ])
+        db.commit()
+    assert idempotency.purge_expired() == 1
+    assert _keys() == {"new": 201}
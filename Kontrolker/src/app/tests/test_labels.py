@@ -0,0 +1,75 @@
+# src/app/tests/test_labels.py
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.project import ProjectBase
+from app.services.labels import Requirement, parse_selector
+
+
+@pytest.mark.parametrize("selector, expected", [
+    ("env=prod", [Requirement("env", "in", ("prod",))]),
+    ("env==prod", [Requirement("env", "in", ("prod",))]),
+    ("env!=prod", [Requirement("env", "notin", ("prod",))]),
+    ("tier in (web, api)", [Requirement("tier", "in", ("web", "api"))]),
+    ("tier notin (db)", [Requirement("tier", "notin", ("db",))]),
+    ("owner", [Requirement("owner", "exists")]),
+    ("!owner", [Requirement("owner", "!exists")]),
+    ("app.io/name=web,tier in (a,b), !legacy", [
+        Requirement("app.io/name", "in", ("web",)),
+        Requirement("tier", "in", ("a", "b")),
+        Requirement("legacy", "!exists"),
+    ]),
+])
+def test_parse_selector(selector, expected):
+    assert parse_selector(selector) == expected
+
+
+def test_parse_selector_empty_value():
+    assert parse_selector("env=") == [Requirement("env", "in", ("",))]
+
+
+@pytest.mark.parametrize("selector", ["=prod", "tier in ()", "env=pr od", "-env", "env in (a", "a b"])
+def test_parse_selector_rejects_invalid(selector):
+    with pytest.raises(ValueError):
+        parse_selector(selector)
+
+
+def test_selector_filters_projects(client):
+    for name, labels in [("a", {"env": "prod", "tier": "web"}), ("b", {"env": "dev"}), ("c", {})]:
+        assert client.post("/api/v1/projects", json={"name": name, "labels": labels}).status_code == 201
+
+    def names(selector):
+        r = client.get("/api/v1/projects", params={"selector": selector})
+        assert r.status_code == 200, r.text
+        return sorted(p["name"] for p in r.json())
+
+    assert names("env=prod") == ["a"]
+    assert names("env in (prod,dev)") == ["a", "b"]
+    assert names("env!=prod") == ["b", "c"]
+    assert names("!env") == ["c"]
+    assert names("env,tier=web") == ["a"]
+    assert client.get("/api/v1/projects", params={"selector": "env=="}).status_code == 200
+    assert client.get("/api/v1/projects", params={"selector": "bad key"}).status_code == 422
+
+
+def test_label_values_are_coerced_to_strings():
+    assert ProjectBase(name="x", labels={"on": True, "n": 3}).labels == {"on": "true", "n": "3"}
+
+
+@pytest.mark.parametrize("labels", [
+    {"-bad": "x"},
+    {"bad key": "x"},
+    {"k" * 101: "x"},
+    {"k": "v" * 256},
+    {"k": "has space"},
+    {"k": None},
+    {"k": ["a"]},
+])
+def test_invalid_labels_are_rejected(labels):
+    with pytest.raises(ValidationError):
+        ProjectBase(name="x", labels=labels)
+
+
+def test_invalid_labels_return_422(client):
+    r = client.post("/api/v1/projects", json={"name": "x", "labels": {"k": "v" * 256}})
+    assert r.status_code == 422
@@ -0,0 +1,97 @@
+# src/app/tests/test_leases.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.core.leases import LeaseLost, LeaseManager, manager as global_manager
+from app.core.tasks import PeriodicTask
+from app.db.session import SessionLocal
+from app.models.leases import Lease
+
+JOB = "test-job"
+
+
+@pytest.fixture
+def replicas(client):
+    """Réplicas extra sobre la misma DB; no renuevan solas durante la prueba."""
+    started = []
+
+    def make(name):
+        mgr = LeaseManager(name, ttl_sec=60, renew_sec=20)
+        mgr.register(JOB)
+        mgr.start()
+        started.append(mgr)
+        return mgr
+
+    yield make
+    for mgr in started:
+        mgr.stop()
+    global_manager.tick()   # que la réplica de la app deje de contar a las que se fueron
+
+
+def _expire(name):
+    with SessionLocal() as db:
+        db.execute(update(Lease).where(Lease.name == name).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+
+
+def test_only_one_replica_leads(replicas):
+    a = replicas("a")
+    b = replicas("b")
+    assert a.is_leader(JOB) and not b.is_leader(JOB)
+    assert a.token(JOB) == 1
+    assert {"a", "b"} <= set(b.members())
+
+    # al apagar, a suelta el lease y b lo toma sin esperar el TTL
+    a.stop()
+    b.tick()
+    assert b.is_leader(JOB)
+    assert b.token(JOB) == 2
+
+
+def test_fence_rejects_a_replica_that_lost_the_lease(replicas):
+    a = replicas("a")
+    b = replicas("b")
+    with SessionLocal() as db:
+        a.fence(db, JOB)
+
+    # a queda colgada sin renovar; el lease vence y lo toma b
+    _expire(JOB)
+    b.tick()
+    assert b.is_leader(JOB)
+    with SessionLocal() as db:
+        with pytest.raises(LeaseLost):
+            a.fence(db, JOB)
+        b.fence(db, JOB)
+
+    a.tick()
+    assert not a.is_leader(JOB)
+
+
+def test_keys_are_split_between_live_replicas(replicas):
+    a = replicas("a")
+    b = replicas("b")
+    everyone = [a, b, global_manager]
+    for mgr in everyone:
+        mgr.tick()   # cada una refresca la lista de miembros con las tres
+    owners = [[mgr.owns(("service", n)) for mgr in everyone].count(True) for n in range(100)]
+    assert owners == [1] * 100
+    assert any(a.owns(("service", n)) for n in range(100))
+    assert any(b.owns(("service", n)) for n in range(100))
+
+
+def test_gated_tasks_only_run_on_the_leader(replicas):
+    a = replicas("a")
+    b = replicas("b")
+    ran = []
+    for mgr in (a, b):
+        PeriodicTask(JOB, 60, lambda mgr=mgr: ran.append(mgr.replica_id), gate=mgr.gate(JOB)).run_once()
+    assert ran == ["a"]
+
+
+def test_without_the_manager_running_everything_is_local(client):
+    mgr = LeaseManager("solo", ttl_sec=15, renew_sec=5)
+    assert mgr.is_leader(JOB)
+    with SessionLocal() as db:
+        mgr.fence(db, JOB)
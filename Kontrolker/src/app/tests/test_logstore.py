@@ -0,0 +1,100 @@
+# src/app/tests/test_logstore.py
+import threading
+
+import pytest
+
+from app.services import logstore
+from app.services.logstore import FRAME, LogStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LogStore(str(tmp_path), segment_bytes=1 << 20, block_bytes=64)
+
+
+def _entries(start, count):
+    return [(ts, b"line %d" % ts) for ts in range(start, start + count)]
+
+
+def test_query_by_range_and_grep(store):
+    assert store.append(1, _entries(1, 50)) == 50
+    assert len(store._index(store.segments(1)[0]).spans) > 1  # varios bloques
+
+    lines, truncated = store.query(1, since=10, until=12)
+    assert lines == [(10, "line 10"), (11, "line 11"), (12, "line 12")]
+    assert not truncated
+    lines, _ = store.query(1, grep="line 4")
+    assert [ts for ts, _ in lines] == [4] + list(range(40, 50))
+    lines, truncated = store.query(1, limit=5)
+    assert len(lines) == 5 and truncated
+
+
+def test_append_drops_entries_already_stored(store):
+    store.append(1, _entries(1, 10))
+    assert store.append(1, _entries(5, 10)) == 4
+    lines, _ = store.query(1)
+    assert [ts for ts, _ in lines] == list(range(1, 15))
+
+
+def test_concurrent_collections_do_not_duplicate(store, monkeypatch, docker):
+    raw = b"".join(b"2024-05-01T12:00:%02d.000000001Z hello %d\n" % (i, i) for i in range(30))
+    docker.logs["d1"] = raw
+    monkeypatch.setattr(logstore, "store", store)
+
+    barrier = threading.Barrier(4)
+    original = store.last_ts
+
+    def last_ts(container_id):
+        # todos leen el último ts antes de que nadie escriba
+        value = original(container_id)
+        barrier.wait(timeout=5)
+        return value
+
+    monkeypatch.setattr(store, "last_ts", last_ts)
+    threads = [threading.Thread(target=logstore.collect_container, args=(1, "d1")) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    lines, _ = store.query(1)
+    assert len(lines) == 30
+    assert [text for _, text in lines] == [f"hello {i}" for i in range(30)]
+
+
+def test_torn_tail_block_is_truncated_before_appending(store):
+    store.append(1, _entries(1, 3))
+    path = store.segments(1)[-1]
+    good_size = path.stat().st_size
+    with open(path, "ab") as f:  # caída a mitad de un bloque
+        f.write(FRAME.pack(4, 5, 1000, 2000) + b"partial")
+
+    assert store.append(1, _entries(4, 3)) == 3
+    lines, _ = store.query(1)
+    assert [ts for ts, _ in lines] == [1, 2, 3, 4, 5, 6]
+    assert path.stat().st_size > good_size
+
+    # un índice nuevo (otro proceso) lee lo mismo
+    fresh = LogStore(str(store.root), store.segment_bytes, store.block_bytes)
+    assert [ts for ts, _ in fresh.query(1)[0]] == [1, 2, 3, 4, 5, 6]
+
+
+def test_torn_first_block_removes_the_segment(store):
+    store.append(1, _entries(1, 3))
+    torn = store.root / "1" / "99.seg"
+    torn.write_bytes(FRAME.pack(99, 99, 500, 500))
+
+    store.append(1, _entries(4, 1))
+    assert not torn.exists()
+    assert [ts for ts, _ in store.query(1)[0]] == [1, 2, 3, 4]
+
+
+def test_retention_by_size_keeps_the_active_segment(tmp_path):
+    store = LogStore(str(tmp_path), segment_bytes=100, block_bytes=64)
+    for start in range(1, 200, 10):
+        store.append(1, _entries(start, 10))
+    assert len(store.segments(1)) > 2
+    removed = store.enforce_retention(0, 300)
+    assert removed > 0
+    assert sum(p.stat().st_size for p in store.segments(1)) <= 300 or len(store.segments(1)) == 1
+    assert store.last_ts(1) == 200
@@ -0,0 +1,121 @@
+# src/app/tests/test_migrations.py
+"""Arranque sobre una DB creada con el esquema original (antes de labels, spec_hash, etc.)."""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.db import migrations
+from app.models.project import Project
+from app.services.labels import KIND_PROJECT, apply_selector, backfill_labels
+
+# esquema tal como lo dejaba create_all antes de las columnas nuevas
+BASELINE_DDL = """
+CREATE TABLE projects (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, description TEXT, labels JSON NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, deleted_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_projects_name ON projects (name);
+CREATE TABLE services (
+    id INTEGER NOT NULL, project_id INTEGER NOT NULL, name VARCHAR(100) NOT NULL,
+    image VARCHAR(255) NOT NULL, ports JSON NOT NULL, env JSON NOT NULL, resources JSON,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, deleted_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(project_id) REFERENCES projects (id)
+);
+CREATE TABLE containers (
+    id INTEGER NOT NULL, docker_id VARCHAR(128), name VARCHAR(255), image VARCHAR(255) NOT NULL,
+    project_id INTEGER, service_id INTEGER, status VARCHAR(64) NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, deleted_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(project_id) REFERENCES projects (id),
+    FOREIGN KEY(service_id) REFERENCES services (id)
+);
+"""
+
+LEGACY_ROWS = """
+INSERT INTO projects (id, name, labels, created_at, updated_at)
+    VALUES (1, 'legacy', '{"env": "prod"}', '2024-01-01', '2024-01-01');
+INSERT INTO services (id, project_id, name, image, ports, env, created_at, updated_at)
+    VALUES (1, 1, 'web', 'nginx', '[{"host": 8080, "container": 80}]', '{}', '2024-01-01', '2024-01-01');
+INSERT INTO containers (id, docker_id, name, image, project_id, service_id, status, created_at, updated_at)
+    VALUES (1, 'abc', 'web-1', 'nginx', 1, 1, 'running', '2024-01-01', '2024-01-01');
+"""
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        for stmt in (BASELINE_DDL + LEGACY_ROWS).split(";"):
+            if stmt.strip():
+                conn.execute(text(stmt))
+    yield engine
+    engine.dispose()
+
+
+def _columns(engine, table):
+    return {c["name"] for c in inspect(engine).get_columns(table)}
+
+
+def test_migrate_adds_label_columns_with_defaults(legacy_engine):
+    applied = migrations.migrate(legacy_engine)
+
+    assert {"029_services_labels", "029_containers_labels"} <= set(applied)
+    assert "labels" in _columns(legacy_engine, "services")
+    assert "labels" in _columns(legacy_engine, "containers")
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT labels FROM services")).scalar_one() == "{}"
+        assert conn.execute(text("SELECT labels FROM containers")).scalar_one() == "{}"
+
+
+def test_migrate_adds_resource_columns_as_null(legacy_engine):
+    migrations.migrate(legacy_engine)
+
+    assert {"cpu", "memory_mb", "ports"} <= _columns(legacy_engine, "containers")
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT cpu, memory_mb, ports FROM containers")).one() == (None, None, None)
+
+
+def test_migrate_is_idempotent(legacy_engine):
+    migrations.migrate(legacy_engine)
+    assert migrations.migrate(legacy_engine) == []
+
+
+def test_backfill_after_migrate_indexes_legacy_labels(legacy_engine):
+    from app.models import Base
+
+    Base.metadata.create_all(bind=legacy_engine)  # resource_labels
+    migrations.migrate(legacy_engine)
+    with Session(legacy_engine) as db:
+        assert backfill_labels(db) == 1
+        found = apply_selector(db.query(Project.id), Project.id, KIND_PROJECT, "env=prod").all()
+        assert [row.id for row in found] == [1]
+        assert backfill_labels(db) == 0
+
+
+def test_upgrade_from_baseline_schema(legacy_engine):
+    from app.models.containers import Container
+    from app.models.service import Service
+
+    assert migrations.upgrade(legacy_engine) == 1  # labels del project viejo
+    assert migrations.missing_columns(legacy_engine) == []
+    assert {"spec_hash"} <= _columns(legacy_engine, "services")
+    assert {"labels", "cpu", "memory_mb", "ports", "spec_hash"} <= _columns(legacy_engine, "containers")
+
+    with Session(legacy_engine) as db:
+        svc = db.get(Service, 1)
+        assert svc.labels == {} and svc.spec_hash is None
+        container = db.get(Container, 1)
+        assert container.labels == {} and container.ports is None and container.spec_hash is None
+
+    # segundo arranque: nada que migrar ni indexar
+    assert migrations.upgrade(legacy_engine) == 0
+    assert migrations.migrate(legacy_engine) == []
+
+
+def test_every_new_column_has_a_migration(legacy_engine):
+    from app.models import Base
+
+    Base.metadata.create_all(bind=legacy_engine)
+    assert migrations.missing_columns(legacy_engine) != []
+    migrations.migrate(legacy_engine)
+    assert migrations.missing_columns(legacy_engine) == []
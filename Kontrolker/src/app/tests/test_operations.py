@@ -0,0 +1,149 @@
+# src/app/tests/test_operations.py
+import threading
+import time
+
+import pytest
+
+from app.services.operations import OperationConflict, OperationCoordinator, conflicts
+
+
+def _background(fn):
+    out = {}
+
+    def target():
+        try:
+            out["result"] = fn()
+        except Exception as e:
+            out["error"] = e
+
+    t = threading.Thread(target=target)
+    t.start()
+    return t, out
+
+
+def _wait_waiters(coord, key, n):
+    """Espera a que ``n`` peticiones estén registradas sobre ``key``."""
+    deadline = time.monotonic() + 5
+    while coord._keys[key].refs < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_conflict_table():
+    assert not conflicts("restart", "restart")
+    assert conflicts("start", "stop")
+    assert conflicts("stop", "restart")
+    assert conflicts("remove", "start")
+    assert not conflicts("start", "restart")
+
+
+def test_identical_operations_share_one_call():
+    coord = OperationCoordinator()
+    entered, proceed = threading.Event(), threading.Event()
+    calls = []
+
+    def restart():
+        calls.append(1)
+        entered.set()
+        proceed.wait(5)
+        return "done"
+
+    t, out = _background(lambda: coord.run("c1", "restart", restart))
+    assert entered.wait(5)
+    follower, out2 = _background(lambda: coord.run("c1", "restart", restart))
+    # el segundo se registra como seguidor antes de liberar al primero
+    _wait_waiters(coord, "c1", 2)
+    proceed.set()
+    t.join(5)
+    follower.join(5)
+    assert out["result"] == ("done", True)
+    assert out2["result"] == ("done", False)
+    assert calls == [1]
+    assert coord.in_flight() == {}
+    assert coord._keys == {}
+
+
+def test_contradictory_operation_is_rejected_while_running():
+    coord = OperationCoordinator()
+    entered, proceed = threading.Event(), threading.Event()
+
+    def stop():
+        entered.set()
+        proceed.wait(5)
+
+    t, _ = _background(lambda: coord.run("c1", "stop", stop))
+    assert entered.wait(5)
+    assert coord.in_flight() == {"c1": ["stop"]}
+    with pytest.raises(OperationConflict) as exc:
+        coord.run("c1", "start", lambda: None)
+    assert exc.value.running == "stop"
+    # otro contenedor no se ve afectado
+    assert coord.run("c2", "start", lambda: "ok") == ("ok", True)
+    proceed.set()
+    t.join(5)
+    assert coord.run("c1", "start", lambda: "ok") == ("ok", True)
+
+
+def test_compatible_operations_are_serialized():
+    coord = OperationCoordinator()
+    entered, proceed = threading.Event(), threading.Event()
+    order = []
+
+    def start():
+        entered.set()
+        proceed.wait(5)
+        order.append("start")
+
+    t, _ = _background(lambda: coord.run("c1", "start", start))
+    assert entered.wait(5)
+    t2, _ = _background(lambda: coord.run("c1", "restart", lambda: order.append("restart")))
+    _wait_waiters(coord, "c1", 2)
+    assert order == []   # restart espera su turno
+    proceed.set()
+    t.join(5)
+    t2.join(5)
+    assert order == ["start", "restart"]
+
+
+def test_errors_reach_every_waiter():
+    coord = OperationCoordinator()
+    entered, proceed = threading.Event(), threading.Event()
+
+    def fail():
+        entered.set()
+        proceed.wait(5)
+        raise RuntimeError("daemon said no")
+
+    t, out = _background(lambda: coord.run("c1", "stop", fail))
+    assert entered.wait(5)
+    t2, out2 = _background(lambda: coord.run("c1", "stop", fail))
+    _wait_waiters(coord, "c1", 2)
+    proceed.set()
+    t.join(5)
+    t2.join(5)
+    assert isinstance(out["error"], RuntimeError)
+    assert out2["error"] is out["error"]
+    assert coord._keys == {}
+
+
+def test_api_rejects_conflicting_lifecycle_calls(client, docker):
+    from app.services.operations import coordinator
+
+    cid = client.post("/api/v1/containers", json={"image": "nginx"}).json()
+    row_id, docker_id = cid["id"], cid["docker_id"]
+    entered, proceed = threading.Event(), threading.Event()
+
+    def slow_stop():
+        entered.set()
+        proceed.wait(5)
+
+    t, _ = _background(lambda: coordinator.run(docker_id, "stop", slow_stop))
+    assert entered.wait(5)
+    try:
+        r = client.post(f"/api/v1/containers/{row_id}/restart")
+        assert r.status_code == 409
+        assert "in progress" in r.json()["detail"]
+    finally:
+        proceed.set()
+        t.join(5)
+    assert docker.ops("restart") == []
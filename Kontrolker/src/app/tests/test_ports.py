@@ -0,0 +1,111 @@
+# src/app/tests/test_ports.py
+import pytest
+
+from app.services import ports
+from app.services.ports import PortAllocator, PortUnavailable
+
+
+@pytest.fixture
+def alloc():
+    return PortAllocator("test", 20000, 20003)
+
+
+def test_claim_conflict_is_all_or_nothing(alloc):
+    assert alloc.claim("a", [8080]) == [8080]
+    with pytest.raises(PortUnavailable) as exc:
+        alloc.claim("b", [9090, 8080])
+    assert exc.value.port == 8080
+    assert exc.value.owner == "a"
+    assert alloc.owner_of(9090) is None
+
+
+def test_claim_own_ports_again_is_not_a_conflict(alloc):
+    alloc.claim("a", [8080])
+    assert alloc.claim("a", [8080]) == [8080]
+
+
+def test_auto_ports_come_from_the_range(alloc):
+    assert alloc.claim("a", [0, 0]) == [20000, 20001]
+    assert alloc.claim("b", [0]) == [20002]
+    alloc.release("a")
+    # next-fit: sigue desde el cursor y después da la vuelta
+    assert alloc.claim("c", [0, 0]) == [20003, 20000]
+    alloc.claim("d", [0])
+    with pytest.raises(PortUnavailable):
+        alloc.claim("e", [0])
+
+
+def test_replace_keeps_previous_claims_on_conflict(alloc):
+    alloc.claim("a", [8080])
+    alloc.claim("b", [9090])
+    with pytest.raises(PortUnavailable):
+        alloc.replace("a", [9090])
+    assert alloc.owner_of(8080) == "a"
+    assert alloc.replace("a", [8081]) == [8081]
+    assert alloc.owner_of(8080) is None
+
+
+def test_rename_moves_claims(alloc):
+    alloc.claim("pending", [8080])
+    alloc.rename("pending", "container:1")
+    assert alloc.owner_of(8080) == "container:1"
+
+
+def test_load_skips_conflicting_claims(alloc):
+    alloc.claim("stale", [7000])
+    alloc.load([("a", [8080, 0]), ("b", [8080, 8081])])
+    assert alloc.owner_of(7000) is None
+    assert alloc.owner_of(8080) == "a"
+    assert alloc.owner_of(8081) == "b"
+    assert alloc.snapshot()["claimed"] == 2
+
+
+def _project(client):
+    return client.post("/api/v1/projects", json={"name": "p"}).json()["id"]
+
+
+def test_service_and_container_port_conflicts(client):
+    pid = _project(client)
+    r = client.post("/api/v1/services", json={
+        "project_id": pid, "name": "web", "image": "nginx", "ports": [{"host": 8080, "container": 80}],
+    })
+    assert r.status_code == 201, r.text
+
+    r = client.post("/api/v1/containers", json={"project_id": pid, "image": "nginx", "ports": {"80/tcp": 8080}})
+    assert r.status_code == 409
+    assert "8080" in r.json()["detail"]
+
+    r = client.post("/api/v1/containers", json={"project_id": pid, "image": "nginx", "ports": {"80/tcp": 0}})
+    assert r.status_code == 201, r.text
+    assert r.json()["ports"]["80/tcp"] != 0
+
+
+def test_duplicate_host_ports_in_container_spec_are_rejected(client, docker):
+    r = client.post("/api/v1/containers", json={
+        "image": "nginx", "ports": {"80/tcp": 8080, "81/tcp": 8080},
+    })
+    assert r.status_code == 422
+    assert docker.ops("create") == []
+    # varios automáticos sí se permiten
+    r = client.post("/api/v1/containers", json={"image": "nginx", "ports": {"80/tcp": 0, "81/tcp": 0}})
+    assert r.status_code == 201, r.text
+    assert len(set(r.json()["ports"].values())) == 2
+
+
+def test_rebuild_restores_claims_from_the_db(client):
+    pid = _project(client)
+    sid = client.post("/api/v1/services", json={
+        "project_id": pid, "name": "web", "image": "nginx", "ports": [{"host": 8080, "container": 80}],
+    }).json()["id"]
+    cid = client.post("/api/v1/containers", json={"image": "nginx", "ports": {"80/tcp": 9090}}).json()["id"]
+
+    alloc = ports.allocator()
+    alloc.load([])
+    ports.rebuild()
+    assert alloc.owner_of(8080) == ports.service_owner(sid)
+    assert alloc.owner_of(9090) == ports.container_owner(cid)
+
+    # un contenedor detenido no retiene sus puertos
+    assert client.post(f"/api/v1/containers/{cid}/stop").status_code == 200
+    ports.rebuild()
+    assert alloc.owner_of(9090) is None
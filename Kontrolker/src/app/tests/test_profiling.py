@@ -0,0 +1,65 @@
+# src/app/tests/test_profiling.py
+import sys
+import threading
+
+import pytest
+
+from app.core import profiling
+from app.core.admin import ADMIN_HEADER
+from app.core.config import settings
+
+ADMIN = {ADMIN_HEADER: "secret"}
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+
+
+def test_requests_are_not_profiled_by_default(client, admin_token):
+    assert profiling.PROFILE_ID_HEADER not in client.get("/api/v1/projects").headers
+    # pedirlo sin token de admin no alcanza
+    r = client.get("/api/v1/projects", headers={profiling.PROFILE_HEADER: "1"})
+    assert profiling.PROFILE_ID_HEADER not in r.headers
+
+
+def test_profiled_request_records_sql_and_timing(client, admin_token):
+    client.post("/api/v1/projects", json={"name": "p"})
+    r = client.get("/api/v1/projects", headers={profiling.PROFILE_HEADER: "1", **ADMIN})
+    assert r.status_code == 200
+    profile_id = r.headers[profiling.PROFILE_ID_HEADER]
+    assert "db;dur=" in r.headers["server-timing"]
+
+    detail = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN).json()
+    assert (detail["method"], detail["path"], detail["status_code"]) == ("GET", "/api/v1/projects", 200)
+    assert detail["sql_count"] >= 1
+    assert any("FROM projects" in q["sql"] for q in detail["sql"])
+    assert profile_id in [p["id"] for p in client.get("/admin/profiles", headers=ADMIN).json()]
+
+
+def test_profiles_need_the_admin_token(client, admin_token):
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles/nope", headers=ADMIN).status_code == 404
+
+
+def test_store_keeps_only_the_latest():
+    store = profiling.ProfileStore(keep=2)
+    for n in range(3):
+        store.add(profiling.RequestProfile(id=str(n), method="GET", path="/"))
+    assert [p.id for p in store.list()] == ["2", "1"]
+    assert store.get("0") is None
+
+
+def test_collapsed_stacks_only_keep_app_code():
+    stack = profiling._collapse(sys._getframe())
+    assert stack.split(";")[-1] == "tests/test_profiling.py:test_collapsed_stacks_only_keep_app_code"
+
+    # un hilo que solo corre código de la stdlib no genera muestras
+    stop = threading.Event()
+    t = threading.Thread(target=stop.wait, args=(5,))
+    t.start()
+    try:
+        assert profiling._collapse(sys._current_frames()[t.ident]) is None
+    finally:
+        stop.set()
+        t.join()
@@ -0,0 +1,56 @@
+# src/app/tests/test_projects.py
+
+
+def _create(client, name, **extra):
+    return client.post("/api/v1/projects", json={"name": name, **extra})
+
+
+def test_create_rejects_duplicate_names(client):
+    assert _create(client, "a").status_code == 201
+    r = _create(client, "a")
+    assert r.status_code == 409
+
+
+def test_names_of_deleted_projects_stay_reserved(client):
+    pid = _create(client, "old").json()["id"]
+    assert client.delete(f"/api/v1/projects/{pid}").status_code == 204
+    assert _create(client, "old").status_code == 409
+
+
+def test_rename_conflicts(client):
+    a = _create(client, "a").json()["id"]
+    _create(client, "b")
+    deleted = _create(client, "gone").json()["id"]
+    client.delete(f"/api/v1/projects/{deleted}")
+
+    r = client.patch(f"/api/v1/projects/{a}", json={"name": "b"})
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Project name must be unique"
+
+    r = client.patch(f"/api/v1/projects/{a}", json={"name": "gone"})
+    assert r.status_code == 409
+    assert "deleted" in r.json()["detail"]
+
+    # mismo nombre que ya tiene: no es conflicto
+    assert client.patch(f"/api/v1/projects/{a}", json={"name": "a"}).status_code == 200
+    r = client.patch(f"/api/v1/projects/{a}", json={"name": "c"})
+    assert r.status_code == 200
+    assert r.json()["name"] == "c"
+
+
+def test_bulk_create_reports_conflicts_per_item(client):
+    _create(client, "taken")
+    items = [{"name": "new"}, {"name": "taken"}, {"name": "new"}]
+    r = client.post("/api/v1/projects/bulk", json={"items": items})
+    assert r.status_code == 201, r.text
+    body = r.json()
+    assert [p["name"] for p in body["created"]] == ["new"]
+    assert sorted(e["index"] for e in body["errors"]) == [1, 2]
+
+
+def test_bulk_create_atomic_rejects_the_whole_batch(client):
+    _create(client, "taken")
+    items = [{"name": "new"}, {"name": "taken"}]
+    r = client.post("/api/v1/projects/bulk", params={"atomic": True}, json={"items": items})
+    assert r.status_code == 422
+    assert [p["name"] for p in client.get("/api/v1/projects").json()] == ["taken"]
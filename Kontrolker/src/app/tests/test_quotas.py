@@ -0,0 +1,48 @@
+# src/app/tests/test_quotas.py
+
+
+def _project(client, name="p"):
+    r = client.post("/api/v1/projects", json={"name": name})
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+def _container(client, project_id, **extra):
+    return client.post("/api/v1/containers", json={"project_id": project_id, "image": "nginx", **extra})
+
+
+def test_quota_rejects_containers_over_the_limit(client):
+    pid = _project(client)
+    r = client.put(f"/api/v1/projects/{pid}/quota", json={"max_cpu": 1.0, "max_memory_mb": 512, "max_containers": 3})
+    assert r.status_code == 200, r.text
+
+    assert _container(client, pid, cpu=0.5, memory_mb=256).status_code == 201
+    assert _container(client, pid, cpu=0.5, memory_mb=256).status_code == 201
+    r = _container(client, pid, cpu=0.1)
+    assert r.status_code == 403
+    assert "cpu" in r.json()["detail"]
+
+    quota = client.get(f"/api/v1/projects/{pid}/quota").json()
+    assert quota["used_cpu"] == 1.0
+    assert quota["used_memory_mb"] == 512
+    assert quota["used_containers"] == 2
+
+
+def test_deleting_a_container_frees_its_quota(client):
+    pid = _project(client)
+    client.put(f"/api/v1/projects/{pid}/quota", json={"max_containers": 1})
+    cid = _container(client, pid).json()["id"]
+    assert _container(client, pid).status_code == 403
+
+    assert client.post(f"/api/v1/containers/{cid}/stop").status_code == 200
+    assert client.delete(f"/api/v1/containers/{cid}").status_code in (200, 204)
+    assert _container(client, pid).status_code == 201
+
+
+def test_usage_without_quota_is_computed(client):
+    pid = _project(client)
+    _container(client, pid, cpu=0.25, memory_mb=64)
+    quota = client.get(f"/api/v1/projects/{pid}/quota").json()
+    assert quota["max_cpu"] is None
+    assert quota["used_cpu"] == 0.25
+    assert quota["used_containers"] == 1
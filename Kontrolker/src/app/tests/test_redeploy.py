@@ -0,0 +1,58 @@
+# src/app/tests/test_redeploy.py
+from datetime import datetime
+
+from app.db.session import SessionLocal
+from app.models.service import Service
+from app.services import redeploy
+
+
+def _service(client, **extra):
+    pid = client.post("/api/v1/projects", json={"name": "p"}).json()["id"]
+    r = client.post("/api/v1/services", json={"project_id": pid, "name": "web", "image": "nginx", **extra})
+    assert r.status_code == 201, r.text
+    return pid, r.json()["id"]
+
+
+def _container(client, sid):
+    r = client.post("/api/v1/containers", json={"service_id": sid})
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+def test_redeploy_replaces_only_stale_containers(client, docker):
+    pid, sid = _service(client, env={"A": "1"})
+    first = _container(client, sid)
+
+    r = client.post(f"/api/v1/projects/{pid}/redeploy")
+    assert r.json()["services"][0]["status"] == "unchanged"
+    assert len(docker.ops("create")) == 1
+
+    assert client.patch(f"/api/v1/services/{sid}", json={"env": {"A": "2"}}).status_code == 200
+    dry = client.post(f"/api/v1/projects/{pid}/redeploy", params={"dry_run": True}).json()
+    assert dry["services"][0]["stale"] == [first]
+
+    r = client.post(f"/api/v1/projects/{pid}/redeploy").json()
+    step = r["services"][0]
+    assert step["status"] == "applied"
+    assert r["replaced"] == 1
+    assert step["replaced"][0]["old_container_id"] == first
+    assert client.get(f"/api/v1/containers/{first}").status_code == 404
+
+
+def test_redeploy_skips_services_deleted_after_the_plan(client, docker):
+    pid, sid = _service(client)
+    cid = _container(client, sid)
+    client.patch(f"/api/v1/services/{sid}", json={"env": {"A": "2"}})
+    with SessionLocal() as db:
+        result = redeploy.plan(db, pid)
+        assert result.services[0].stale == [cid]
+        # borrado entre el plan y la ejecución
+        db.get(Service, sid).deleted_at = datetime.utcnow()
+        db.commit()
+    creates = len(docker.ops("create"))
+
+    result = redeploy.execute(result)
+    step = result.services[0]
+    assert step.status == "skipped"
+    assert step.replaced == []
+    assert len(docker.ops("create")) == creates
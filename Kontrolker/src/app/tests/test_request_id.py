@@ -0,0 +1,59 @@
+# src/app/tests/test_request_id.py
+import logging
+import queue
+import uuid
+
+import orjson
+
+from app.core.logging import JsonFormatter, _ContextQueueHandler
+from app.core.request_id import HEADER, request_id_var
+
+
+def test_incoming_request_id_is_echoed(client):
+    r = client.get("/api/v1/projects", headers={HEADER: "abc-123"})
+    assert r.headers[HEADER] == "abc-123"
+
+
+def test_missing_or_oversized_ids_are_replaced(client):
+    generated = client.get("/api/v1/projects").headers[HEADER]
+    assert uuid.UUID(generated)
+    r = client.get("/api/v1/projects", headers={HEADER: "x" * 129})
+    assert r.headers[HEADER] != "x" * 129
+    assert uuid.UUID(r.headers[HEADER])
+
+
+def test_request_id_reaches_error_and_streaming_responses(client):
+    assert client.get("/api/v1/projects/999", headers={HEADER: "r1"}).headers[HEADER] == "r1"
+    r = client.get("/api/v1/projects", headers={HEADER: "r2", "accept": "application/x-ndjson"})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert r.headers[HEADER] == "r2"
+
+
+def _record(msg, *args, **extra):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_queue_handler_captures_request_id_in_the_logging_thread():
+    q = queue.SimpleQueue()
+    handler = _ContextQueueHandler(q)
+    token = request_id_var.set("rid-1")
+    try:
+        handler.emit(_record("hello %s", "world"))
+    finally:
+        request_id_var.reset(token)
+    handler.emit(_record("outside"))
+
+    inside, outside = q.get_nowait(), q.get_nowait()
+    assert (inside.request_id, inside.msg, inside.args) == ("rid-1", "hello world", None)
+    assert outside.request_id == "-"
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(_record("done", request_id="rid-1", container_id=7))
+    payload = orjson.loads(line)
+    assert payload["request_id"] == "rid-1"
+    assert payload["msg"] == "done"
+    assert payload["container_id"] == 7
+    assert "args" not in payload
@@ -0,0 +1,96 @@
+# src/app/tests/test_resilience.py
+import pytest
+import requests
+
+from app.core.request_id import request_id_var
+from app.engines import resilience
+from app.engines.resilience import CircuitBreaker, CircuitOpen, RetryPolicy
+
+
+class Flaky:
+    def __init__(self, failures, exc=requests.exceptions.ConnectionError):
+        self.failures = failures
+        self.exc = exc
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.exc("boom")
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    clock = [1000.0]
+
+    def sleep(delay):
+        slept.append(delay)
+        clock[0] += delay
+
+    monkeypatch.setattr(resilience.time, "sleep", sleep)
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    # sin jitter: siempre la espera máxima del intento
+    monkeypatch.setattr(resilience.random, "uniform", lambda lo, hi: hi)
+    monkeypatch.setattr(resilience, "breakers", resilience.BreakerRegistry(100, 30))
+    return slept
+
+
+POLICY = RetryPolicy(attempts=6, base_delay_sec=2, max_delay_sec=8, deadline_sec=60)
+
+
+def test_transient_errors_are_retried_with_backoff(sleeps):
+    fn = Flaky(3)
+    assert resilience.call("inspect", fn, retry=POLICY) == "ok"
+    assert fn.calls == 4
+    assert sleeps == [2, 4, 8]
+
+
+def test_permanent_errors_are_not_retried(sleeps):
+    from docker.errors import NotFound
+
+    fn = Flaky(5, exc=NotFound)
+    with pytest.raises(NotFound):
+        resilience.call("inspect", fn, retry=POLICY)
+    assert fn.calls == 1
+    assert sleeps == []
+
+
+def test_request_paths_cap_retries_to_the_admission_budget(sleeps, monkeypatch):
+    monkeypatch.setattr(resilience.settings, "ADMISSION_WAIT_TIMEOUT_SEC", 10)
+    token = request_id_var.set("req-1")
+    try:
+        fn = Flaky(5)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            resilience.call("inspect", fn, retry=POLICY)
+    finally:
+        request_id_var.reset(token)
+    # 2 + 4 = 6s; la siguiente (8s) pasaría de los 10s
+    assert sleeps == [2, 4]
+    assert sum(sleeps) <= 10
+
+    # fuera de un request se usa el presupuesto completo
+    sleeps.clear()
+    fn = Flaky(5)
+    assert resilience.call("inspect", fn, retry=POLICY) == "ok"
+    assert sleeps == [2, 4, 8, 8, 8]
+
+
+def test_breaker_opens_and_half_opens(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("start", failure_threshold=2, reset_timeout_sec=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.on_failure(requests.exceptions.Timeout())
+    with pytest.raises(CircuitOpen) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after == 30
+
+    clock[0] = 31
+    breaker.before_call()  # llamada de prueba
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()  # solo una a la vez
+    breaker.on_success()
+    assert breaker.snapshot()["state"] == "closed"
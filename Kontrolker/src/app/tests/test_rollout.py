@@ -0,0 +1,107 @@
+# src/app/tests/test_rollout.py
+import threading
+
+from app.schemas.rollout import RolloutRequest, RolloutResult
+from app.services import rollout
+
+
+def _service(client, replicas=2, **extra):
+    pid = client.post("/api/v1/projects", json={"name": "p"}).json()["id"]
+    sid = client.post("/api/v1/services", json={
+        "project_id": pid, "name": "web", "image": "nginx:1", **extra,
+    }).json()["id"]
+    ids = [client.post("/api/v1/containers", json={"service_id": sid}).json()["id"] for _ in range(replicas)]
+    return sid, ids
+
+
+def _finished(client, r):
+    assert r.status_code == 202, r.text
+    job = r.json()
+    assert r.headers["location"].endswith(f"/api/v1/services/{job['service_id']}/rollouts/{job['id']}")
+    rollout.tracker.wait(job["id"], timeout=10)
+    r = client.get(f"/api/v1/services/{job['service_id']}/rollouts/{job['id']}")
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_rollout_runs_in_background_and_replaces_stale(client):
+    sid, old = _service(client)
+    client.patch(f"/api/v1/services/{sid}", json={"image": "nginx:2"})
+
+    job = _finished(client, client.post(f"/api/v1/services/{sid}/rollout", json={}))
+    assert job["state"] == "finished"
+    assert job["result"]["status"] == "completed"
+    assert job["result"]["replaced"] == 2
+    for cid in old:
+        assert client.get(f"/api/v1/containers/{cid}").status_code == 404
+
+    # nada desactualizado: unchanged
+    job = _finished(client, client.post(f"/api/v1/services/{sid}/rollout"))
+    assert job["result"]["status"] == "unchanged"
+
+
+def test_concurrent_rollouts_coalesce_only_with_same_parameters(client, monkeypatch):
+    sid, _ = _service(client, replicas=1)
+    release = threading.Event()
+    calls = []
+
+    def slow_rollout(db, svc, req):
+        calls.append(req)
+        release.wait(timeout=10)
+        return RolloutResult(service_id=svc.id, spec_hash="x", status="completed")
+
+    monkeypatch.setattr(rollout, "rollout", slow_rollout)
+    try:
+        first = client.post(f"/api/v1/services/{sid}/rollout", json={"max_surge": 2})
+        assert first.status_code == 202
+        assert first.json()["state"] == "running"
+
+        same = client.post(f"/api/v1/services/{sid}/rollout", json={"max_surge": 2})
+        assert same.status_code == 202
+        assert same.json()["id"] == first.json()["id"]
+
+        other = client.post(f"/api/v1/services/{sid}/rollout", json={"max_surge": 1})
+        assert other.status_code == 409
+        # explícito vs default cuenta como distinto (cambia los límites con puertos del host)
+        assert client.post(f"/api/v1/services/{sid}/rollout", json={"max_surge": 2, "max_unavailable": 0}).status_code == 409
+    finally:
+        release.set()
+    job = _finished(client, first)
+    assert job["state"] == "finished"
+    assert len(calls) == 1
+
+    # terminado el anterior, otros parámetros arrancan uno nuevo
+    r = client.post(f"/api/v1/services/{sid}/rollout", json={"max_surge": 1})
+    assert r.status_code == 202 and r.json()["id"] != first.json()["id"]
+    _finished(client, r)
+
+
+def test_impossible_limits_are_rejected_before_starting(client):
+    sid, _ = _service(client, replicas=0, ports=[{"host": 8080, "container": 80}])
+    r = client.post(f"/api/v1/services/{sid}/rollout", json={"max_surge": 1, "max_unavailable": 0})
+    assert r.status_code == 422
+    r = client.post(f"/api/v1/services/{sid}/rollout", json={"max_surge": 0, "max_unavailable": 0})
+    assert r.status_code == 422
+
+
+def test_unknown_rollout_is_404(client):
+    sid, _ = _service(client, replicas=0)
+    assert client.get(f"/api/v1/services/{sid}/rollouts/nope").status_code == 404
+
+
+def test_fingerprint_includes_explicit_fields():
+    assert rollout.fingerprint(RolloutRequest()) == rollout.fingerprint(RolloutRequest())
+    assert rollout.fingerprint(RolloutRequest()) != rollout.fingerprint(RolloutRequest(max_unavailable=0))
+    assert rollout.fingerprint(RolloutRequest(max_surge=1)) != rollout.fingerprint(RolloutRequest(max_surge=2))
+
+
+def test_history_is_bounded():
+    tracker = rollout.RolloutTracker(keep=2)
+    ids = []
+    for service_id in range(10**6, 10**6 + 4):
+        job, started = tracker.start(service_id, RolloutRequest())
+        assert started
+        ids.append(job.id)
+        tracker.wait(job.id, timeout=5)
+    assert [tracker.get(i) is not None for i in ids] == [False, False, True, True]
+    assert tracker.get(ids[-1]).state == "failed"  # services inexistentes
@@ -0,0 +1,49 @@
+# src/app/tests/test_serialization.py
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.serialization import fetch_rows, parse_fields
+from app.db.session import SessionLocal
+from app.models.project import Project
+from app.schemas.project import ProjectRead
+
+
+class ProjectWithExtras(BaseModel):
+    id: int
+    name: str
+    tags: List[str] = Field(default_factory=list)
+    meta: Dict[str, List[int]] = {"seen": []}
+    hint: Optional[str] = "none"
+
+
+def test_rows_do_not_share_mutable_defaults(client):
+    for name in ("a", "b"):
+        client.post("/api/v1/projects", json={"name": name})
+    with SessionLocal() as db:
+        rows = fetch_rows(db.query(Project).order_by(Project.id), Project, ProjectWithExtras)
+        assert [list(row) for row in rows] == [["id", "name", "tags", "meta", "hint"]] * 2
+        assert rows[0]["hint"] == "none"
+
+        rows[0]["tags"].append("x")
+        rows[0]["meta"]["seen"].append(1)
+        assert rows[1]["tags"] == [] and rows[1]["meta"] == {"seen": []}
+        # ni la plantilla cacheada para la siguiente consulta
+        again = fetch_rows(db.query(Project), Project, ProjectWithExtras)
+        assert again[0]["tags"] == [] and again[0]["meta"] == {"seen": []}
+
+
+def test_sparse_fields(client):
+    client.post("/api/v1/projects", json={"name": "a", "labels": {"env": "prod"}})
+    r = client.get("/api/v1/projects", params={"fields": "name,id"})
+    assert r.json() == [{"id": r.json()[0]["id"], "name": "a"}]
+    assert client.get("/api/v1/projects", params={"fields": "nope"}).status_code == 422
+    assert parse_fields("name, id", ProjectRead) == ("id", "name")
+
+
+def test_ndjson_listing(client):
+    for name in ("a", "b"):
+        client.post("/api/v1/projects", json={"name": name})
+    r = client.get("/api/v1/projects", headers={"Accept": "application/x-ndjson"}, params={"fields": "name"})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert r.text.splitlines() == ['{"name":"a"}', '{"name":"b"}']
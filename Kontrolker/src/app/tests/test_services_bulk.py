@@ -0,0 +1,74 @@
+# src/app/tests/test_services_bulk.py
+from app.schemas.bulk import BULK_MAX_ITEMS
+from app.services import ports
+
+
+def _project(client, name="p"):
+    return client.post("/api/v1/projects", json={"name": name}).json()["id"]
+
+
+def _bulk(client, items, **params):
+    return client.post("/api/v1/services/bulk", json={"items": items}, params=params)
+
+
+def test_bulk_creates_valid_items_and_reports_the_rest(client):
+    pid = _project(client)
+    client.post("/api/v1/services", json={"project_id": pid, "name": "taken", "image": "x"})
+    items = [
+        {"project_id": pid, "name": "web", "image": "nginx", "ports": [{"host": 8080, "container": 80}],
+         "labels": {"tier": "front"}},
+        {"project_id": pid, "name": "taken", "image": "x"},
+        {"project_id": 999, "name": "lost", "image": "x"},
+        {"project_id": pid, "name": "web", "image": "x"},
+        {"project_id": pid, "image": "x"},
+        {"project_id": pid, "name": "api", "image": "acme/api"},
+    ]
+    r = _bulk(client, items)
+    assert r.status_code == 201, r.text
+    body = r.json()
+    assert [s["name"] for s in body["created"]] == ["web", "api"]
+    assert [(e["index"], e["detail"] if isinstance(e["detail"], str) else "invalid") for e in body["errors"]] == [
+        (1, "Service name must be unique within project"),
+        (2, "Project not found"),
+        (3, "Duplicated name in batch"),
+        (4, "invalid"),
+    ]
+    web = body["created"][0]
+    assert web["spec_hash"]
+    # el puerto queda a nombre del service ya creado
+    assert ports.allocator().owner_of(8080) == ports.service_owner(web["id"])
+    r = client.get("/api/v1/services", params={"selector": "tier=front"})
+    assert [s["name"] for s in r.json()] == ["web"]
+
+
+def test_atomic_bulk_rolls_back_and_frees_ports(client):
+    pid = _project(client)
+    items = [
+        {"project_id": pid, "name": "web", "image": "nginx", "ports": [{"host": 8080, "container": 80}]},
+        {"project_id": 999, "name": "lost", "image": "x"},
+    ]
+    r = _bulk(client, items, atomic=True)
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["index"] == 1
+    assert client.get("/api/v1/services").json() == []
+    assert ports.allocator().owner_of(8080) is None
+
+
+def test_bulk_port_conflicts_are_per_item(client):
+    pid = _project(client)
+    items = [
+        {"project_id": pid, "name": "a", "image": "x", "ports": [{"host": 9000, "container": 80}]},
+        {"project_id": pid, "name": "b", "image": "x", "ports": [{"host": 9000, "container": 81}]},
+    ]
+    body = _bulk(client, items).json()
+    assert [s["name"] for s in body["created"]] == ["a"]
+    assert body["errors"][0]["index"] == 1
+
+
+def test_bulk_limits(client):
+    pid = _project(client)
+    assert _bulk(client, []).status_code == 422
+    too_many = [{"project_id": pid, "name": f"s{n}", "image": "x"} for n in range(BULK_MAX_ITEMS + 1)]
+    assert _bulk(client, too_many).status_code == 422
+    # ningún ítem creable también es 422
+    assert _bulk(client, [{"project_id": 999, "name": "a", "image": "x"}]).status_code == 422
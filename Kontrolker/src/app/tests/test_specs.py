@@ -0,0 +1,75 @@
+# src/app/tests/test_specs.py
+from datetime import datetime, timedelta
+
+from app.models.service import Service
+from app.services import specs
+
+
+def _svc(id=1, updated_at=None, **extra):
+    fields = dict(image="nginx", ports=[{"host": 8080, "container": 80}], env={"A": "1"},
+                  resources={"cpu": 0.5, "memory_mb": 128}, labels={"team": "a"})
+    fields.update(extra)
+    return Service(id=id, updated_at=updated_at or datetime(2026, 1, 1), **fields)
+
+
+def test_same_revision_is_compiled_once():
+    cache = specs.SpecCache(max_entries=10)
+    first = cache.get(_svc())
+    assert cache.get(_svc()) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first.spec.host_config_args["port_bindings"] == {"80/tcp": 8080}
+    assert (first.cpu, first.memory_mb, first.labels) == (0.5, 128, {"team": "a"})
+    assert first.binds_host_ports
+
+
+def test_new_revision_gets_a_new_entry_without_invalidation():
+    cache = specs.SpecCache(max_entries=10)
+    old = cache.get(_svc())
+    new = cache.get(_svc(updated_at=datetime(2026, 1, 1) + timedelta(seconds=1), image="nginx:2"))
+    assert new is not old
+    assert new.spec.image == "nginx:2"
+    cache.invalidate(1)
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_lru_eviction_and_disabled_cache():
+    cache = specs.SpecCache(max_entries=2)
+    for sid in (1, 2, 1, 3):
+        cache.get(_svc(id=sid))
+    # el 2 era el menos usado
+    assert cache.snapshot()["evictions"] == 1
+    cache.get(_svc(id=1))
+    assert cache.hits == 2
+
+    off = specs.SpecCache(max_entries=0)
+    assert off.get(_svc()) is not off.get(_svc())
+    assert off.snapshot()["entries"] == 0
+
+
+def test_spec_hash_ignores_labels_but_not_the_spec():
+    base = _svc()
+    specs.stamp(base)
+    relabeled = _svc(labels={"team": "b"})
+    specs.stamp(relabeled)
+    assert relabeled.spec_hash == base.spec_hash
+    for change in ({"image": "nginx:2"}, {"env": {"A": "2"}}, {"ports": []}, {"resources": None}):
+        other = _svc(**change)
+        specs.stamp(other)
+        assert other.spec_hash != base.spec_hash, change
+
+
+def test_service_updates_invalidate_through_the_api(client):
+    pid = client.post("/api/v1/projects", json={"name": "p"}).json()["id"]
+    sid = client.post("/api/v1/services", json={"project_id": pid, "name": "web", "image": "nginx"}).json()["id"]
+    before = specs.cache.snapshot()
+    client.post("/api/v1/containers", json={"service_id": sid})
+    client.post("/api/v1/containers", json={"service_id": sid})
+    after = specs.cache.snapshot()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["entries"] == 1
+
+    client.patch(f"/api/v1/services/{sid}", json={"image": "nginx:2"})
+    assert specs.cache.snapshot()["entries"] == 0
+    r = client.post("/api/v1/containers", json={"service_id": sid})
+    assert r.json()["image"] == "nginx:2"
@@ -0,0 +1,70 @@
+# src/app/tests/test_startup.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect
+
+from app.db.init import SCHEMA_READY_ENV, init_db
+
+SRC = Path(__file__).resolve().parents[2]
+
+
+def _env(tmp_path, **extra):
+    env = dict(os.environ)
+    env.pop(SCHEMA_READY_ENV, None)
+    env.update(
+        DB_URL=f"sqlite:///{tmp_path}/fresh.db",
+        DB_INIT_LOCK=str(tmp_path / "init.lock"),
+        PYTHONPATH=str(SRC),
+        **extra,
+    )
+    return env
+
+
+def _tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/fresh.db")
+    try:
+        return set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+
+
+def test_importing_the_app_does_no_startup_work(tmp_path):
+    code = "import sys, app.main; print('docker' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=_env(tmp_path), cwd=tmp_path,
+        capture_output=True, text=True, timeout=60,
+    )
+    assert out.returncode == 0, out.stderr
+    # el SDK de Docker se importa con el primer cliente, no con la app
+    assert out.stdout.strip() == "False"
+    # el esquema se crea en el lifespan, no al importar
+    assert "projects" not in _tables(tmp_path)
+
+
+def test_concurrent_init_creates_the_schema_once(tmp_path):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "app.db.init"], env=_env(tmp_path), cwd=tmp_path,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(4)
+    ]
+    for proc in procs:
+        _, err = proc.communicate(timeout=60)
+        assert proc.returncode == 0, err
+    assert {"projects", "services", "containers", "resource_labels"} <= _tables(tmp_path)
+
+
+def test_init_is_skipped_when_the_parent_already_did_it(monkeypatch):
+    from app.db import migrations
+
+    calls = []
+    monkeypatch.setattr(migrations, "upgrade", lambda engine: calls.append(engine) or 0)
+    monkeypatch.setenv(SCHEMA_READY_ENV, "1")
+    init_db()
+    assert calls == []
+    init_db(force=True)
+    assert len(calls) == 1
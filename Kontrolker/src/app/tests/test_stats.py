@@ -0,0 +1,119 @@
+# src/app/tests/test_stats.py
+import pytest
+
+from app.core.config import settings
+from app.engines import docker as dk
+from app.services import stats
+
+MB = 1024 * 1024
+T0 = 600 * 10_000.0   # alineado a las ventanas de 1 y 10 minutos
+
+
+def _raw(total, system, usage_mb=0, inactive_mb=0, online=2):
+    return {
+        "cpu_stats": {"cpu_usage": {"total_usage": total}, "system_cpu_usage": system, "online_cpus": online},
+        "memory_stats": {"usage": usage_mb * MB, "stats": {"inactive_file": inactive_mb * MB}},
+    }
+
+
+def _feed(store, cid, cpus, start=T0, step=10, mem=100):
+    """Una muestra cada ``step`` s con el % de CPU pedido (2 CPUs, la primera solo fija contadores)."""
+    total, system = 0.0, 0.0
+    store.record(cid, start - step, _raw(total, system, mem))
+    for n, cpu in enumerate(cpus):
+        total += cpu * 1000 / 200
+        system += 1000
+        store.record(cid, start + n * step, _raw(total, system, mem))
+
+
+def test_ring_wraps_in_order():
+    ring = stats.Ring(3)
+    for n in range(5):
+        ring.push((n, 0, 0, 0, 0))
+    assert ring.ordered()[:, stats.TS].tolist() == [2, 3, 4]
+    assert ring.window(3, 4)[:, stats.TS].tolist() == [3, 4]
+
+
+def test_first_sample_only_sets_counters():
+    store = stats.StatsStore(interval_sec=10)
+    store.record(1, T0, _raw(100, 1000, usage_mb=300, inactive_mb=100))
+    assert store.aggregate([1], T0 - 60, T0, level=0)["samples"] == 0
+    assert store.snapshot() == {"containers": 1, "bytes": 0}
+
+    store.record(1, T0 + 10, _raw(150, 1100, usage_mb=300, inactive_mb=100))
+    result = store.aggregate([1], T0, T0 + 10, level=0)
+    assert result["samples"] == 1
+    # 50 de 100 ticks de sistema con 2 CPUs = 100%; memoria sin page cache
+    assert result["cpu_percent"]["avg"] == 100.0
+    assert result["memory_mb"]["avg"] == 200.0
+    assert store.snapshot()["bytes"] > 0
+
+
+def test_aggregated_tiers_keep_average_and_peak():
+    store = stats.StatsStore(interval_sec=10)
+    # 3 minutos: cada minuto tiene un pico de 90% y el resto 10%
+    cpus = ([90] + [10] * 5) * 3
+    _feed(store, 1, cpus)
+    raw = store.aggregate([1], T0, T0 + 180, level=0)
+    minutes = store.aggregate([1], T0, T0 + 180, level=1)
+    assert raw["samples"] == 18
+    assert minutes["samples"] == 3   # la última ventana todavía abierta también cuenta
+    assert minutes["cpu_percent"]["max"] == 90.0
+    assert minutes["cpu_percent"]["avg"] == pytest.approx(raw["cpu_percent"]["avg"], abs=0.01)
+    assert store.aggregate([1], T0, T0 + 180, level=2)["samples"] == 1
+
+
+def test_tier_for_picks_the_finest_covering_range():
+    store = stats.StatsStore(interval_sec=10)
+    now = T0
+    assert store.tier_for(now - 600, now) == 0
+    assert store.tier_for(now - 7200, now) == 1
+    assert store.tier_for(now - 3 * 86400, now) == 2
+    assert store.tier_for(now - 30 * 86400, now) == 2
+
+
+def test_aggregate_spans_several_containers():
+    store = stats.StatsStore(interval_sec=10)
+    _feed(store, 1, [10, 10])
+    _feed(store, 2, [50, 50])
+    result = store.aggregate([1, 2, 3], T0, T0 + 10, level=0)
+    assert (result["containers"], result["samples"]) == (2, 4)
+    assert result["cpu_percent"]["avg"] == 30.0
+
+
+def test_prune_forgets_gone_containers():
+    store = stats.StatsStore(interval_sec=10)
+    _feed(store, 1, [10])
+    store.record(2, T0, _raw(0, 0))   # visto una sola vez
+    assert store.prune(T0 + 60) == 1
+    assert store.snapshot()["containers"] == 1
+    horizon = stats.TIERS[-1].span_sec(10)
+    assert store.prune(T0 + horizon + 1) == 1
+    assert store.snapshot()["containers"] == 0
+
+
+def test_sample_and_api(client, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_ENABLED", True)
+    monkeypatch.setattr(stats, "store", stats.StatsStore(interval_sec=10))
+    counters = {"total": 0.0, "system": 0.0}
+
+    def fake_stats(docker_id):
+        counters["total"] += 5
+        counters["system"] += 10
+        return _raw(counters["total"], counters["system"], usage_mb=64)
+
+    monkeypatch.setattr(dk, "stats", fake_stats)
+    pid = client.post("/api/v1/projects", json={"name": "p"}).json()["id"]
+    cid = client.post("/api/v1/containers", json={"image": "nginx", "project_id": pid}).json()["id"]
+    stats.sample()   # solo fija contadores
+    stats.sample()
+
+    body = client.get(f"/api/v1/containers/{cid}/stats").json()
+    assert (body["tier"], body["samples"]) == ("10s", 1)
+    assert body["cpu_percent"]["avg"] == 100.0
+    assert body["memory_mb"]["max"] == 64.0
+    assert client.get(f"/api/v1/projects/{pid}/stats").json()["containers"] == 1
+    assert client.get(f"/api/v1/containers/{cid}/stats", params={"tier": "1h"}).status_code == 422
+
+    monkeypatch.setattr(settings, "STATS_ENABLED", False)
+    assert client.get(f"/api/v1/containers/{cid}/stats").status_code == 404
@@ -0,0 +1,93 @@
+# src/app/tests/test_topology.py
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.db.session import engine
+from app.engines import docker as dk
+
+
+@contextmanager
+def _count_queries():
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+
+def _stack(client, services, replicas, name="p"):
+    pid = client.post("/api/v1/projects", json={"name": name}).json()["id"]
+    for n in range(services):
+        sid = client.post(
+            "/api/v1/services", json={"project_id": pid, "name": f"s{n}", "image": "nginx"},
+        ).json()["id"]
+        for _ in range(replicas):
+            assert client.post("/api/v1/containers", json={"service_id": sid}).status_code == 201
+    return pid
+
+
+def test_topology_groups_containers_by_service(client):
+    pid = _stack(client, services=2, replicas=2)
+    loose = client.post("/api/v1/containers", json={"image": "redis", "project_id": pid}).json()["id"]
+    gone = client.get("/api/v1/containers").json()[0]["id"]
+    client.post(f"/api/v1/containers/{gone}/stop")
+    assert client.delete(f"/api/v1/containers/{gone}").status_code == 204
+
+    r = client.get(f"/api/v1/projects/{pid}/topology")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [s["name"] for s in body["services"]] == ["s0", "s1"]
+    assert sorted(len(s["containers"]) for s in body["services"]) == [1, 2]
+    assert [c["id"] for c in body["containers"]] == [loose]
+    assert body["docker"] is None
+    assert all(c["live"] is None for s in body["services"] for c in s["containers"])
+
+
+def test_topology_query_count_does_not_grow_with_the_project(client):
+    small = _stack(client, services=1, replicas=1)
+    with _count_queries() as queries:
+        client.get(f"/api/v1/projects/{small}/topology")
+    baseline = len(queries)
+
+    big = _stack(client, services=5, replicas=3, name="big")
+    with _count_queries() as queries:
+        r = client.get(f"/api/v1/projects/{big}/topology")
+    assert sum(len(s["containers"]) for s in r.json()["services"]) == 15
+    assert len(queries) == baseline
+
+
+def test_topology_live_state(client, monkeypatch):
+    pid = _stack(client, services=1, replicas=2)
+    ids = [c["docker_id"] for c in client.get("/api/v1/containers").json()]
+    calls = []
+
+    def list_containers(*, all_=False, filters=None):
+        calls.append(filters)
+        return [{"Id": ids[0], "State": "exited", "Status": "Exited (0)"}]
+
+    monkeypatch.setattr(dk, "list_containers", list_containers)
+    body = client.get(f"/api/v1/projects/{pid}/topology", params={"live": True}).json()
+    assert body["docker"] is True
+    live = {c["docker_id"]: c["live"]["state"] for c in body["services"][0]["containers"]}
+    assert live == {ids[0]: "exited", ids[1]: "missing"}
+    # una sola llamada filtrada para todo el proyecto
+    assert len(calls) == 1
+    assert sorted(calls[0]["id"]) == sorted(ids)
+
+    def down(**kw):
+        raise RuntimeError("daemon down")
+
+    monkeypatch.setattr(dk, "list_containers", down)
+    body = client.get(f"/api/v1/projects/{pid}/topology", params={"live": True}).json()
+    assert body["docker"] is False
+
+
+def test_topology_of_missing_project(client):
+    assert client.get("/api/v1/projects/999/topology").status_code == 404